@@ -0,0 +1,213 @@
+"""
+core/blob_store.py
+------------------
+
+Content-addressed, compressed storage for large JSON payloads.
+
+Payloads whose serialized size exceeds a threshold are stored once under
+their SHA-256 digest (zlib-compressed) and the row keeps a small reference
+``{"$blob": "<digest>", "size": <bytes>}`` instead of the inline JSON.
+Identical payloads (e.g. repeated device state dumps) share one blob.
+
+Two backends:
+  - ``SQLiteBlobStore``: a ``blobs`` table next to the rows (default)
+  - ``DirBlobStore``: files under a local directory (``$IPAV_BLOB_DIR``)
+
+Offloading is opt-in: set ``$IPAV_BLOB_THRESHOLD_BYTES`` (or pass
+``blob_threshold`` to ``RunStore``).  Readers resolve references with
+``resolve()``, or wrap them in ``LazyBlob`` to defer the load until first use.
+
+Writers that offload inside an open transaction pass its connection
+(``offload(..., conn=session.connection())``).  The SQLite backend then
+writes the blob in that transaction.  A second connection would wait for the
+write lock the caller already holds.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from abc import ABC, abstractmethod
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Column, Integer, LargeBinary, MetaData, String, Table, event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+
+REF_KEY = "$blob"
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class BlobStore(ABC):
+    """Interface: ``put`` compressed bytes under their digest, ``get`` them back."""
+
+    @abstractmethod
+    def put(self, data: bytes, conn: Optional[Connection] = None) -> str:
+        """Store ``data``; SQL backends join ``conn``'s transaction when given."""
+
+    @abstractmethod
+    def get(self, digest: str) -> bytes:
+        """The bytes stored under ``digest``; KeyError if missing."""
+
+    # ---- JSON helpers --------------------------------------------------------
+    def offload(self, value: Any, threshold: Optional[int], conn: Optional[Connection] = None) -> Any:
+        """Return ``value`` or, if its JSON is >= ``threshold`` bytes, a blob reference."""
+        if value is None or not threshold or is_blob_ref(value):
+            return value
+        data = _encode(value)
+        if len(data) < threshold:
+            return value
+        return {REF_KEY: self.put(data, conn), "size": len(data)}
+
+    def load(self, ref: Dict[str, Any]) -> Any:
+        return json.loads(self.get(ref[REF_KEY]))
+
+
+class SQLiteBlobStore(BlobStore):
+    """Blobs in a ``blobs`` table on the given engine (INSERT OR IGNORE dedupes)."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.table = Table(
+            "blobs", MetaData(),
+            Column("digest", String(64), primary_key=True),
+            Column("size", Integer, nullable=False),
+            Column("data", LargeBinary, nullable=False),
+        )
+        self._created = False  # created lazily, on the writing connection
+
+    def _joins(self, conn: Optional[Connection]) -> bool:
+        return conn is not None and str(conn.engine.url) == str(self.engine.url)
+
+    def put(self, data: bytes, conn: Optional[Connection] = None) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        stmt = sqlite_insert(self.table).values(
+            digest=digest, size=len(data), data=zlib.compress(data, 6)
+        ).on_conflict_do_nothing(index_elements=["digest"])
+        if self._joins(conn):
+            if not self._created:
+                if conn.dialect.has_table(conn, self.table.name):
+                    self._created = True
+                else:
+                    # The caller's transaction may still roll back the CREATE.
+                    self.table.create(conn)
+                    event.listen(conn, "commit", self._mark_created, once=True)
+            conn.execute(stmt)
+            return digest
+        with self.engine.begin() as own:
+            if not self._created:
+                self.table.create(own, checkfirst=True)
+            own.execute(stmt)
+        self._created = True
+        return digest
+
+    def _mark_created(self, conn: Connection) -> None:
+        self._created = True
+
+    def get(self, digest: str) -> bytes:
+        with self.engine.connect() as conn:
+            raw = conn.execute(select(self.table.c.data).where(self.table.c.digest == digest)).scalar()
+        if raw is None:
+            raise KeyError(f"blob {digest} not found")
+        return zlib.decompress(raw)
+
+
+class DirBlobStore(BlobStore):
+    """
+    Blobs as ``<root>/<aa>/<digest>.z`` files, written atomically.  Files
+    are not part of the caller's transaction: a put whose rows roll back
+    leaves an unreferenced file.  It is reused if the same payload comes
+    again, and nothing deletes it.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.z"
+
+    def put(self, data: bytes, conn: Optional[Connection] = None) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(zlib.compress(data, 6))
+            os.replace(tmp, path)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        try:
+            return zlib.decompress(self._path(digest).read_bytes())
+        except FileNotFoundError:
+            raise KeyError(f"blob {digest} not found") from None
+
+
+class LazyBlob:
+    """A blob reference that loads (once) on first access to ``.value``."""
+
+    __slots__ = ("_store", "ref", "_value", "_loaded")
+
+    def __init__(self, store: BlobStore, ref: Dict[str, Any]):
+        self._store = store
+        self.ref = ref
+        self._value: Any = None
+        self._loaded = False
+
+    @property
+    def size(self) -> int:
+        return int(self.ref.get("size") or 0)
+
+    @property
+    def value(self) -> Any:
+        if not self._loaded:
+            self._value = self._store.load(self.ref)
+            self._loaded = True
+        return self._value
+
+    def __repr__(self) -> str:
+        return f"<LazyBlob {self.ref[REF_KEY][:12]} size={self.size}>"
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and REF_KEY in value and len(value) <= 2
+
+
+def resolve(value: Any, store: Optional[BlobStore]) -> Any:
+    """Return the payload behind a blob reference (or ``value`` unchanged)."""
+    if isinstance(value, LazyBlob):
+        return value.value
+    if store is not None and is_blob_ref(value):
+        return store.load(value)
+    return value
+
+
+def blob_threshold_from_env() -> Optional[int]:
+    raw = os.getenv("IPAV_BLOB_THRESHOLD_BYTES")
+    try:
+        return int(raw) if raw else None
+    except ValueError:
+        return None
+
+
+_STORES: Dict[str, BlobStore] = {}
+_LOCK = threading.Lock()
+
+
+def blob_store_for(engine: Engine, blob_dir: Optional[Path] = None) -> BlobStore:
+    """Shared blob store: ``blob_dir``/``$IPAV_BLOB_DIR`` if set, else a table on ``engine``."""
+    root = blob_dir or os.getenv("IPAV_BLOB_DIR")
+    key = f"dir:{Path(root).resolve()}" if root else f"db:{engine.url}"
+    with _LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = DirBlobStore(Path(root)) if root else SQLiteBlobStore(engine)
+            _STORES[key] = store
+        return store
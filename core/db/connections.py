@@ -0,0 +1,180 @@
+"""Shared connection factory for the app's SQLite databases.
+
+Every store (``core.db.session`` on ``sma_av_ai_ops.db``, ``RunStore`` and the
+raw ``sqlite3`` helpers in ``core.ipav_shared`` / ``core.orchestrator_store``
+on ``avops.db``) gets its engine here, so each database file has exactly one
+pooled engine per process and every pooled connection is configured once
+with the same profile: WAL, ``synchronous=NORMAL``, ``busy_timeout``, mmap and
+page-cache sizing.  Per-database counters expose lock errors and slow
+(lock-waiting) writes for diagnosing contention between Streamlit sessions.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+__all__ = [
+    "SQLITE_PRAGMAS",
+    "ConnectionStats",
+    "sqlite_url",
+    "get_engine",
+    "raw_connection",
+    "connection_stats",
+    "dispose_engines",
+]
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Applied to every new DBAPI connection, in order.
+SQLITE_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": _env_int("IPAV_SQLITE_BUSY_TIMEOUT_MS", 5000),
+    "mmap_size": _env_int("IPAV_SQLITE_MMAP_BYTES", 256 * 1024 * 1024),
+    "cache_size": -_env_int("IPAV_SQLITE_CACHE_KIB", 64 * 1024),  # negative = KiB
+}
+
+# Write statements slower than this are counted as having waited on a lock.
+LOCK_WAIT_THRESHOLD_MS = float(_env_int("IPAV_SQLITE_LOCK_WAIT_MS", 50))
+
+_WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "BEGIN IMMEDIATE")
+
+
+@dataclass
+class ConnectionStats:
+    connects: int = 0
+    checkouts: int = 0
+    writes: int = 0
+    lock_waits: int = 0
+    lock_wait_ms: float = 0.0
+    lock_errors: int = 0
+
+
+_ENGINES: Dict[str, Engine] = {}
+_STATS: Dict[str, ConnectionStats] = {}
+_LOCK = threading.Lock()
+
+
+def sqlite_url(path: Union[str, Path]) -> str:
+    """Return the canonical SQLAlchemy URL for a SQLite file."""
+    return f"sqlite:///{Path(path).expanduser().resolve()}"
+
+
+def _apply_pragmas(dbapi_conn, pragmas: Dict[str, Any]) -> None:
+    cur = dbapi_conn.cursor()
+    try:
+        for name, value in pragmas.items():
+            cur.execute(f"PRAGMA {name}={value}")
+    finally:
+        cur.close()
+
+
+def _instrument(engine: Engine, stats: ConnectionStats, pragmas: Dict[str, Any]) -> None:
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        _apply_pragmas(dbapi_conn, pragmas)
+        stats.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(_dbapi_conn, _record, _proxy):
+        stats.checkouts += 1
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, _cursor, statement, _params, _context, _many):
+        if statement.lstrip()[:15].upper().startswith(_WRITE_PREFIXES):
+            conn.info["_ipav_write_t0"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, _cursor, _statement, _params, _context, _many):
+        t0 = conn.info.pop("_ipav_write_t0", None)
+        if t0 is None:
+            return
+        stats.writes += 1
+        ms = (time.perf_counter() - t0) * 1000.0
+        if ms >= LOCK_WAIT_THRESHOLD_MS:
+            stats.lock_waits += 1
+            stats.lock_wait_ms += ms
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(ctx):
+        if ctx.connection is not None:
+            ctx.connection.info.pop("_ipav_write_t0", None)
+        msg = str(ctx.original_exception).lower()
+        if "database is locked" in msg or "database is busy" in msg:
+            stats.lock_errors += 1
+
+
+def get_engine(url: str, *, pragmas: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Engine:
+    """Return the process-wide engine for ``url``, creating it on first use.
+
+    SQLite engines get the shared pragma profile (``pragmas`` overrides
+    individual entries) and contention counters.  Other URLs are passed to
+    ``create_engine`` unchanged.  Options only apply on first creation.
+    """
+    engine = _ENGINES.get(url)
+    if engine is not None:
+        return engine
+    with _LOCK:
+        engine = _ENGINES.get(url)
+        if engine is not None:
+            return engine
+        if url.startswith("sqlite"):
+            profile = {**SQLITE_PRAGMAS, **(pragmas or {})}
+            connect_args = {
+                "check_same_thread": False,
+                "timeout": float(profile["busy_timeout"]) / 1000.0,
+                **kwargs.pop("connect_args", {}),
+            }
+            engine = create_engine(url, future=True, connect_args=connect_args, **kwargs)
+            stats = ConnectionStats()
+            _instrument(engine, stats, profile)
+            _STATS[url] = stats
+        else:
+            engine = create_engine(url, future=True, **kwargs)
+        _ENGINES[url] = engine
+        return engine
+
+
+def raw_connection(path: Union[str, Path]):
+    """Borrow a pooled, profile-configured DBAPI connection for a SQLite file.
+
+    Behaves like ``sqlite3.Connection`` (``execute``/``cursor``/``commit``);
+    ``close()`` returns it to the pool instead of closing the file.
+    """
+    Path(path).expanduser().resolve().parent.mkdir(parents=True, exist_ok=True)
+    return get_engine(sqlite_url(path)).raw_connection()
+
+
+def connection_stats(url: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Counters per SQLite URL (or just ``url``), plus the pool status."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for key, stats in list(_STATS.items()):
+        if url is not None and key != url:
+            continue
+        row = asdict(stats)
+        row["pool"] = _ENGINES[key].pool.status()
+        out[key] = row
+    return out
+
+
+def dispose_engines() -> None:
+    """Dispose and forget every cached engine (tests, config reloads)."""
+    with _LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        _ENGINES.clear()
+        _STATS.clear()
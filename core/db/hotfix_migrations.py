@@ -14,6 +14,8 @@ from sqlalchemy.exc import SQLAlchemyError
 __all__ = [
     "ensure_recipes_yaml_column",
     "ensure_agent_config_json_column",
+    "ensure_workflow_claim_columns",
+    "ensure_workflow_trigger_expr_column",
     "run_hotfix_migrations",
 ]
 
@@ -68,10 +70,76 @@ def ensure_agent_config_json_column(engine: Engine) -> None:
         pass
 
 
+def ensure_workflow_claim_columns(engine: Engine) -> None:
+    """Add workflows.claimed_by/claim_expires_at (scheduler claims) if missing."""
+    insp = inspect(engine)
+    if not insp.has_table("workflows"):
+        return
+
+    cols = {c["name"] for c in insp.get_columns("workflows")}
+    missing = [
+        (name, ddl)
+        for name, ddl in (
+            ("claimed_by", "VARCHAR(128)"),
+            ("claim_expires_at", "DATETIME"),
+        )
+        if name not in cols
+    ]
+    if not missing:
+        return
+
+    try:
+        with engine.begin() as conn:
+            for name, ddl in missing:
+                conn.execute(text(f"ALTER TABLE workflows ADD COLUMN {name} {ddl}"))
+    except SQLAlchemyError:
+        # Without the columns tick() falls back to unclaimed (single-replica) mode.
+        pass
+
+
+def ensure_workflow_trigger_expr_column(engine: Engine) -> None:
+    """Add workflows.trigger_expr (cron expressions) if missing."""
+    insp = inspect(engine)
+    if not insp.has_table("workflows"):
+        return
+
+    cols = {c["name"] for c in insp.get_columns("workflows")}
+    if "trigger_expr" in cols:
+        return
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE workflows ADD COLUMN trigger_expr VARCHAR(128)"))
+    except SQLAlchemyError:
+        # Without the column cron triggers are rejected; interval/manual still work.
+        pass
+
+
+def ensure_event_queue_available_at_column(engine: Engine) -> None:
+    """Add event_queue.available_at (retry backoff) if missing."""
+    insp = inspect(engine)
+    if not insp.has_table("event_queue"):
+        return
+
+    cols = {c["name"] for c in insp.get_columns("event_queue")}
+    if "available_at" in cols:
+        return
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE event_queue ADD COLUMN available_at DATETIME"))
+    except SQLAlchemyError:
+        # Usually another dispatcher adding it at the same time.
+        pass
+
+
 def run_hotfix_migrations(engine: Engine) -> None:
     """Run all hotfix migrations against the provided engine."""
     ensure_recipes_yaml_column(engine)
     ensure_agent_config_json_column(engine)
+    ensure_workflow_claim_columns(engine)
+    ensure_workflow_trigger_expr_column(engine)
+    ensure_event_queue_available_at_column(engine)
 
 
 if __name__ == "__main__":
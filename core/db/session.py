@@ -1,14 +1,14 @@
 
 from __future__ import annotations
 from contextlib import contextmanager
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 import os
 
+from core.db.connections import get_engine
 from core.db.hotfix_migrations import run_hotfix_migrations
 
 DB_URL = os.getenv("DATABASE_URL", "sqlite:///sma_av_ai_ops.db")
-engine = create_engine(DB_URL, connect_args={"check_same_thread": False} if DB_URL.startswith("sqlite") else {})
+engine = get_engine(DB_URL)  # shared SQLite profile (WAL, busy_timeout, ...) when sqlite
 run_hotfix_migrations(engine)
 SessionLocal = sessionmaker(
     bind=engine,
@@ -101,6 +101,7 @@ def export_zip(*, include: Iterable[str], recipes_dir: str | Path = "recipes") -
                     "enabled": bool(getattr(wf, "enabled", 1)),
                     "trigger": getattr(wf, "trigger_type", "manual"),
                     "interval_minutes": getattr(wf, "trigger_value", None),
+                    "trigger_expr": getattr(wf, "trigger_expr", None),  # cron expression or event topics
                     "agent_name": agents_by_id.get(getattr(wf, "agent_id", None), ""),
                     "recipe_name": recipes_by_id.get(getattr(wf, "recipe_id", None), ""),
                 })
@@ -321,6 +322,7 @@ def import_zip(
                                 recipe_id=recipe.id,
                                 trigger_type=row.get("trigger", "manual"),
                                 trigger_value=row.get("interval_minutes"),
+                                trigger_expr=row.get("trigger_expr") or row.get("cron"),
                                 enabled=1 if row.get("enabled", True) else 0,
                             )
                         result["updated"]["workflows"] += 1
@@ -335,6 +337,7 @@ def import_zip(
                         recipe_id=recipe.id,
                         trigger_type=row.get("trigger", "manual"),
                         trigger_value=row.get("interval_minutes"),
+                        trigger_expr=row.get("trigger_expr") or row.get("cron"),
                     )
                     if not row.get("enabled", True):
                         update_workflow(db, new_wf.id, enabled=0)
@@ -2,19 +2,24 @@
 # ipav_shared.py
 # Lightweight helpers to integrate with an existing IPAV Streamlit app.
 from __future__ import annotations
-import os, sqlite3, json, time, uuid
+import os, json, time, uuid
 from dataclasses import dataclass, asdict
 from typing import Optional, Dict, Any, List
 
+from core.db.connections import raw_connection
+
 DB_PATH = os.getenv("IPAV_DB_PATH") or os.path.abspath(os.path.join(os.getcwd(), "avops.db"))
 
+_TABLES_READY: set = set()
+
 def _connect():
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA journal_mode=WAL;")
-    return conn
+    # Pooled connection with the shared SQLite profile (WAL etc. applied once per connection);
+    # close() hands it back to the pool.
+    return raw_connection(DB_PATH)
 
 def ensure_tables():
+    if DB_PATH in _TABLES_READY:
+        return
     conn = _connect()
     cur = conn.cursor()
     cur.execute("""
@@ -51,6 +56,7 @@ def ensure_tables():
     """)
     conn.commit()
     conn.close()
+    _TABLES_READY.add(DB_PATH)
 
 def _ts():
     return time.time()
@@ -0,0 +1,168 @@
+"""
+core/latency.py
+---------------
+
+Fixed log-spaced latency buckets shared by the run store.
+
+Durations are mapped to one of ``N_BUCKETS`` geometric buckets (ratio
+``BUCKET_RATIO`` starting at 1 ms), so a quantile can be estimated from a
+handful of ``(bucket, count)`` pairs instead of every raw duration.  The
+relative error of an estimate is bounded by the bucket width (20% for
+``BUCKET_RATIO = 1.2``).  The ratio fixes the bucket indices stored in
+``run_rollup_buckets``, so changing it requires ``RunStore.rebuild_rollups()``.
+
+``LatencySketch`` wraps such a histogram as a mergeable value: the run store
+keeps one per hour/day, workflow and recipe (``run_rollup_buckets``), and
+summing sketches across buckets gives percentiles for any window.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import case, literal
+
+BUCKET_RATIO = 1.2
+# Upper bounds (exclusive) of buckets 0..N-2; the last bucket is open-ended.
+# Bucket 0 holds everything below 1 ms; the top bound is just over 24h.
+BUCKET_BOUNDS_MS: Tuple[float, ...] = tuple(
+    BUCKET_RATIO ** k for k in range(0, int(math.log(86_400_000, BUCKET_RATIO)) + 2)
+)
+N_BUCKETS = len(BUCKET_BOUNDS_MS) + 1
+
+
+def bucket_index(ms: float) -> int:
+    """Return the bucket index for a duration in milliseconds."""
+    return bisect.bisect_right(BUCKET_BOUNDS_MS, float(ms))
+
+
+def bucket_range(idx: int) -> Tuple[float, float]:
+    """Return the ``[lo, hi)`` bounds in ms covered by bucket ``idx``."""
+    lo = 0.0 if idx <= 0 else BUCKET_BOUNDS_MS[idx - 1]
+    hi = BUCKET_BOUNDS_MS[idx] if idx < len(BUCKET_BOUNDS_MS) else lo * BUCKET_RATIO
+    return lo, hi
+
+
+def bucket_sql(col: Any, lo: int = 0, hi: Optional[int] = None) -> Any:
+    """
+    SQL expression mapping a duration column to its bucket index.
+    Built as a balanced CASE tree so each row costs ~log2(N) comparisons.
+    """
+    if hi is None:
+        hi = N_BUCKETS - 1
+    if lo == hi:
+        return literal(lo)
+    mid = (lo + hi) // 2
+    # Buckets lo..mid are all below BUCKET_BOUNDS_MS[mid].
+    return case(
+        (col < BUCKET_BOUNDS_MS[mid], bucket_sql(col, lo, mid)),
+        else_=bucket_sql(col, mid + 1, hi),
+    )
+
+
+def quantile_from_buckets(
+    counts: Mapping[int, int] | Iterable[Tuple[int, int]],
+    q: float,
+    *,
+    lo: Optional[float] = None,
+    hi: Optional[float] = None,
+) -> float:
+    """
+    Estimate the ``q`` quantile from ``{bucket: count}`` pairs, interpolating
+    linearly inside the bucket.  ``lo``/``hi`` (observed min/max) clamp the
+    estimate so the extremes stay exact.
+    """
+    pairs: List[Tuple[int, int]] = sorted(
+        (int(b), int(c)) for b, c in (counts.items() if isinstance(counts, Mapping) else counts) if c
+    )
+    total = sum(c for _, c in pairs)
+    if not total:
+        return 0.0
+    q = min(max(q, 0.0), 1.0)
+    rank = q * total
+    seen = 0
+    est = 0.0
+    for b, c in pairs:
+        if seen + c >= rank:
+            b_lo, b_hi = bucket_range(b)
+            est = b_lo + (b_hi - b_lo) * ((rank - seen) / c)
+            break
+        seen += c
+    else:
+        est = bucket_range(pairs[-1][0])[1]
+    if lo is not None:
+        est = max(est, float(lo))
+    if hi is not None:
+        est = min(est, float(hi))
+    return est
+
+
+def bucket_counts(rows: Iterable[Tuple[Any, Any]]) -> Dict[int, int]:
+    """Collapse ``(bucket, count)`` rows (e.g. a GROUP BY result) into a dict."""
+    out: Dict[int, int] = {}
+    for b, c in rows:
+        out[int(b)] = out.get(int(b), 0) + int(c or 0)
+    return out
+
+
+class LatencySketch:
+    """
+    Mergeable latency histogram over the shared log buckets (HDR-style).
+    Merging is exact (bucket counts add), so sketches for adjacent time
+    buckets, workflows or recipes combine without losing accuracy.
+    """
+
+    __slots__ = ("counts",)
+
+    def __init__(self, counts: Optional[Mapping[int, int]] = None):
+        self.counts: Dict[int, int] = {int(b): int(c) for b, c in (counts or {}).items() if c}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[Any, Any]]) -> "LatencySketch":
+        """Build from ``(bucket, count)`` rows, e.g. a rollup GROUP BY."""
+        return cls(bucket_counts(rows))
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, ms: float, n: int = 1) -> None:
+        b = bucket_index(ms)
+        self.counts[b] = self.counts.get(b, 0) + int(n)
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        """Add ``other``'s counts into this sketch (in place) and return it."""
+        for b, c in other.counts.items():
+            self.counts[b] = self.counts.get(b, 0) + c
+        return self
+
+    def __add__(self, other: "LatencySketch") -> "LatencySketch":
+        return LatencySketch(self.counts).merge(other)
+
+    def quantile(self, q: float) -> float:
+        return quantile_from_buckets(self.counts, q)
+
+    def percentiles(self, qs: Iterable[float] = (0.5, 0.95, 0.99)) -> Dict[str, float]:
+        """``{"p50_ms": ..., "p95_ms": ..., "p99_ms": ...}`` for the given quantiles."""
+        return {percentile_key(q): self.quantile(q) for q in qs}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"ratio": BUCKET_RATIO, "counts": {str(b): c for b, c in sorted(self.counts.items())}}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "LatencySketch":
+        if float(data.get("ratio", BUCKET_RATIO)) != BUCKET_RATIO:
+            raise ValueError("Sketch was built with a different bucket ratio")
+        return cls({int(b): c for b, c in (data.get("counts") or {}).items()})
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, LatencySketch) and self.counts == other.counts
+
+    def __repr__(self) -> str:
+        return f"<LatencySketch n={self.count}>"
+
+
+def percentile_key(q: float) -> str:
+    """0.95 -> "p95_ms", 0.999 -> "p99.9_ms"."""
+    return f"p{q * 100:g}_ms"
@@ -1,16 +1,21 @@
 from __future__ import annotations
-import os, sqlite3, time, uuid, json
+import os, time, uuid, json
 from typing import List, Dict, Any, Optional
 
+from core.db.connections import raw_connection
+
 DB_PATH = os.getenv("IPAV_DB_PATH") or os.path.abspath(os.path.join(os.getcwd(), "avops.db"))
 
+_TABLES_READY: set = set()
+
 def _connect():
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA journal_mode=WAL;")
-    return conn
+    # Pooled connection with the shared SQLite profile (WAL etc. applied once per connection);
+    # close() hands it back to the pool.
+    return raw_connection(DB_PATH)
 
 def ensure_tables():
+    if DB_PATH in _TABLES_READY:
+        return
     conn = _connect()
     cur = conn.cursor()
     cur.execute("""
@@ -24,6 +29,7 @@ def ensure_tables():
     """)
     conn.commit()
     conn.close()
+    _TABLES_READY.add(DB_PATH)
 
 def save_orchestration(name: str, data: Dict[str,Any], *, id: Optional[str]=None) -> str:
     ensure_tables()
@@ -1,3 +1,3 @@
 # core/recipes/__init__.py
 """Recipes utilities: save/load YAML, attach to agents, validators, compilers."""
-__all__ = ["service", "attach"]
+__all__ = ["service", "attach", "cache", "compiler"]
@@ -0,0 +1,177 @@
+# core/recipes/cache.py
+"""
+Process-wide cache of parsed recipes, used by ``load_recipe_dict()``.
+
+Entries are keyed on ``("file", resolved path, mtime_ns, size)`` for recipe
+files and ``("text", sha1)`` for inline YAML.  An edited file therefore
+misses on its next load and is re-parsed, and stale entries age out of the
+LRU.  Parsed recipes are returned as ``FrozenDict`` / ``FrozenList`` views
+that share one copy between callers.  They behave like ``dict`` / ``list``
+for reading, JSON and ``yaml.safe_dump``, but raise ``TypeError`` on
+mutation.  Use ``thaw()`` for a private, mutable deep copy.
+
+YAML is parsed with libyaml's ``CSafeLoader`` when PyYAML was built with
+it, else with the pure-Python ``SafeLoader``.  Size: ``$IPAV_RECIPE_CACHE_SIZE``
+(default 256 entries).
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import yaml
+
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+__all__ = [
+    "FrozenDict",
+    "FrozenList",
+    "RecipeCache",
+    "RecipeCacheStats",
+    "RECIPE_CACHE",
+    "file_key",
+    "text_key",
+    "freeze",
+    "thaw",
+    "parse_yaml",
+]
+
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is read-only (cached recipe); use thaw() for a mutable copy")
+
+
+class FrozenDict(dict):
+    """Read-only dict view of a cached recipe mapping."""
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self):  # type: ignore[override]
+        return hash(tuple(sorted(self.items(), key=lambda kv: str(kv[0]))))
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """Read-only list view of a cached recipe sequence."""
+    __slots__ = ()
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+    def __hash__(self):  # type: ignore[override]
+        return hash(tuple(self))
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+# yaml.safe_dump only represents exact dict/list types.
+yaml.SafeDumper.add_representer(FrozenDict, yaml.SafeDumper.represent_dict)
+yaml.SafeDumper.add_representer(FrozenList, yaml.SafeDumper.represent_list)
+
+
+def freeze(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return FrozenDict((k, freeze(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return FrozenList(freeze(v) for v in obj)
+    return obj
+
+
+def thaw(obj: Any) -> Any:
+    """Mutable deep copy of a (possibly frozen) recipe value."""
+    if isinstance(obj, dict):
+        return {k: thaw(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [thaw(v) for v in obj]
+    return obj
+
+
+def parse_yaml(text: str) -> Any:
+    return yaml.load(text, Loader=YAML_LOADER)
+
+
+def file_key(path: Path) -> Optional[Tuple[Hashable, ...]]:
+    """Cache key for a recipe file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return ("file", str(Path(path).resolve()), st.st_mtime_ns, st.st_size)
+
+
+def text_key(text: str) -> Tuple[Hashable, ...]:
+    return ("text", hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+
+@dataclass(frozen=True)
+class RecipeCacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class RecipeCache:
+    """Thread-safe LRU of frozen parsed recipes; see the module docstring."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = max(1, int(maxsize))
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Cached value for ``key``; on a miss ``load()`` is parsed, frozen and stored."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+            self._misses += 1
+        value = freeze(load())  # outside the lock; a concurrent miss parses twice at worst
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def stats(self) -> RecipeCacheStats:
+        with self._lock:
+            return RecipeCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._entries),
+                maxsize=self.maxsize,
+            )
+
+
+def _maxsize_from_env() -> int:
+    try:
+        return int(os.getenv("IPAV_RECIPE_CACHE_SIZE", "256"))
+    except ValueError:
+        return 256
+
+
+RECIPE_CACHE = RecipeCache(_maxsize_from_env())
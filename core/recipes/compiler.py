@@ -0,0 +1,862 @@
+# core/recipes/compiler.py
+"""
+Compile a parsed recipe into an immutable ``RecipePlan``.
+
+Recipes carry ``{{ ... }}`` templates (``{{inputs.reporter}}``,
+``{{s.sev}}``, ``{{inputs.details|default("n/a")}}``,
+``{{ 'OK' if s.ok else 'Issues' }}``), JSONPath extractions in ``saves:``
+(``{sev: $.sev}``), tool names in ``using:`` / ``tool:`` and typed
+``inputs:``.  ``compile_recipe()`` does all the parsing once:
+
+- templates become closures over a whitelisted expression AST (names,
+  attribute/index access, literals, comparisons, ``and``/``or``/``not``,
+  ``x if c else y``, arithmetic and ``| filter(...)``).  Anything else
+  (calls, lambdas, comprehensions...) is a ``RecipeCompileError``;
+- ``$.a.b[0]`` / ``$.items[*].id`` paths become tuples of accessors;
+- tool names become ``ToolBinding``s (``mcp-slack`` -> mcp server ``slack``);
+- input declarations become ``InputSpec``s checked by ``bind_inputs()``;
+- ``cache: {ttl: 30s, key: [...]}`` becomes a ``StepCacheSpec`` (results of
+  read-only steps are reused through ``core.workflow.step_cache``).
+
+``RecipePlan.run()`` then only renders and executes.  ``load_recipe_plan()``
+memoises plans for the read-only recipes returned by ``load_recipe_dict()``,
+so running one recipe for 1,000 rooms compiles it once.
+
+``core.workflow.engine.execute_recipe_run`` runs the plans of recipes with
+``steps:``, dispatching tool calls through ``core.workflow.tool_call``.
+"""
+from __future__ import annotations
+
+import ast
+import functools
+import json
+import operator
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Sequence, Set, Tuple, Union
+
+from .cache import FrozenDict, RecipeCache, freeze, thaw
+from .service import load_recipe_dict
+
+__all__ = [
+    "RecipeCompileError",
+    "RecipeInputError",
+    "Template",
+    "JsonPath",
+    "ToolBinding",
+    "InputSpec",
+    "PlanStep",
+    "RecipePlan",
+    "PlanResult",
+    "StepOutcome",
+    "StepCacheSpec",
+    "compile_recipe",
+    "load_recipe_plan",
+    "FILTERS",
+]
+
+
+class RecipeCompileError(ValueError):
+    """A recipe template, path or declaration that cannot be compiled."""
+
+
+class RecipeInputError(ValueError):
+    """Inputs that do not satisfy a recipe's ``inputs:`` declarations."""
+
+
+Context = Mapping[str, Any]
+Evaluator = Callable[[Context], Any]
+
+
+# ---- Filters -----------------------------------------------------------------------
+def _default(value: Any, fallback: Any = "", *_: Any) -> Any:
+    return fallback if value is None or value == "" else value
+
+
+def _slug(value: Any) -> str:
+    return re.sub(r"[^a-zA-Z0-9]+", "-", str(value or "")).strip("-").lower()
+
+
+FILTERS: Dict[str, Callable[..., Any]] = {
+    "default": _default,
+    "to_json": lambda v: json.dumps(thaw(v), default=str, ensure_ascii=False),
+    "tojson": lambda v: json.dumps(thaw(v), default=str, ensure_ascii=False),
+    "slug": _slug,
+    "lower": lambda v: str(v or "").lower(),
+    "upper": lambda v: str(v or "").upper(),
+    "trim": lambda v: str(v or "").strip(),
+    "string": lambda v: "" if v is None else str(v),
+    "int": lambda v: int(v or 0),
+    "float": lambda v: float(v or 0),
+    "length": lambda v: len(v or ()),
+    "join": lambda v, sep="": str(sep).join(str(x) for x in (v or ())),
+}
+
+_CONSTANTS = {"null": None, "none": None, "None": None, "true": True, "True": True, "false": False, "False": False}
+
+_BINOPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+_CMPOPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+    ast.In: lambda a, b: b is not None and a in b,
+    ast.NotIn: lambda a, b: b is None or a not in b,
+}
+
+
+def _lookup(obj: Any, key: Any) -> Any:
+    """``obj.key`` / ``obj[key]`` over mappings and sequences; missing -> None."""
+    if isinstance(obj, Mapping):
+        return obj.get(key)
+    if isinstance(obj, (list, tuple)) and isinstance(key, int):
+        return obj[key] if -len(obj) <= key < len(obj) else None
+    return None
+
+
+# ---- Expressions -------------------------------------------------------------------
+def _compile_node(node: ast.AST, src: str) -> Evaluator:
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda ctx: value
+    if isinstance(node, ast.Name):
+        if node.id in _CONSTANTS:
+            value = _CONSTANTS[node.id]
+            return lambda ctx: value
+        name = node.id
+        return lambda ctx: ctx.get(name)
+    if isinstance(node, ast.Attribute):
+        obj, attr = _compile_node(node.value, src), node.attr
+        return lambda ctx: _lookup(obj(ctx), attr)
+    if isinstance(node, ast.Subscript):
+        obj, key = _compile_node(node.value, src), _compile_node(node.slice, src)
+        return lambda ctx: _lookup(obj(ctx), key(ctx))
+    if isinstance(node, (ast.List, ast.Tuple)):
+        items = [_compile_node(e, src) for e in node.elts]
+        return lambda ctx: [f(ctx) for f in items]
+    if isinstance(node, ast.Dict):
+        if any(k is None for k in node.keys):
+            raise RecipeCompileError(f"'**' is not supported in template {src!r}")
+        pairs = [(_compile_node(k, src), _compile_node(v, src)) for k, v in zip(node.keys, node.values)]
+        return lambda ctx: {k(ctx): v(ctx) for k, v in pairs}
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_node(v, src) for v in node.values]
+        if isinstance(node.op, ast.And):
+            def _and(ctx):
+                value = None
+                for f in parts:
+                    value = f(ctx)
+                    if not value:
+                        return value
+                return value
+            return _and
+
+        def _or(ctx):
+            value = None
+            for f in parts:
+                value = f(ctx)
+                if value:
+                    return value
+            return value
+        return _or
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile_node(node.operand, src)
+        if isinstance(node.op, ast.Not):
+            return lambda ctx: not operand(ctx)
+        if isinstance(node.op, ast.USub):
+            return lambda ctx: -operand(ctx)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+    if isinstance(node, ast.Compare):
+        left = _compile_node(node.left, src)
+        try:
+            ops = [_CMPOPS[type(op)] for op in node.ops]
+        except KeyError:
+            raise RecipeCompileError(f"Unsupported comparison in template {src!r}") from None
+        rights = [_compile_node(c, src) for c in node.comparators]
+
+        def _compare(ctx):
+            a = left(ctx)
+            for op, right in zip(ops, rights):
+                b = right(ctx)
+                if not op(a, b):
+                    return False
+                a = b
+            return True
+        return _compare
+    if isinstance(node, ast.IfExp):
+        test, body, orelse = (_compile_node(n, src) for n in (node.test, node.body, node.orelse))
+        return lambda ctx: body(ctx) if test(ctx) else orelse(ctx)
+    if isinstance(node, ast.BinOp):
+        if isinstance(node.op, ast.BitOr):
+            return _compile_filter(node, src)
+        op = _BINOPS.get(type(node.op))
+        if op is not None:
+            left, right = _compile_node(node.left, src), _compile_node(node.right, src)
+            return lambda ctx: op(left(ctx), right(ctx))
+    raise RecipeCompileError(f"Unsupported expression {type(node).__name__} in template {src!r}")
+
+
+def _compile_filter(node: ast.BinOp, src: str) -> Evaluator:
+    """``value | name`` / ``value | name(args)``: Jinja-style filters parse as bit-or."""
+    target = node.right
+    args: List[Evaluator] = []
+    if isinstance(target, ast.Call):
+        if target.keywords:
+            raise RecipeCompileError(f"Keyword filter arguments are not supported in {src!r}")
+        args = [_compile_node(a, src) for a in target.args]
+        target = target.func
+    if not isinstance(target, ast.Name) or target.id not in FILTERS:
+        name = getattr(target, "id", type(target).__name__)
+        raise RecipeCompileError(f"Unknown filter {name!r} in template {src!r}")
+    fn, value = FILTERS[target.id], _compile_node(node.left, src)
+    return lambda ctx: fn(value(ctx), *(a(ctx) for a in args))
+
+
+def _parse_expression(src: str) -> ast.expr:
+    try:
+        return ast.parse(src.strip(), mode="eval").body
+    except SyntaxError as e:
+        raise RecipeCompileError(f"Invalid template expression {src!r}: {e.msg}") from None
+
+
+def _references(tree: ast.AST) -> Set[Tuple[str, ...]]:
+    """Dotted names an expression reads, e.g. ``s.sev | default(x)`` -> {("s", "sev"), ("x",)}."""
+    refs: Set[Tuple[str, ...]] = set()
+    inner: Set[int] = set()
+    for node in ast.walk(tree):
+        if id(node) in inner or not isinstance(node, (ast.Name, ast.Attribute, ast.Subscript)):
+            continue
+        path: List[str] = []
+        cur: ast.AST = node
+        while True:
+            if isinstance(cur, ast.Attribute):
+                path.append(cur.attr)
+            elif isinstance(cur, ast.Subscript):
+                key = cur.slice
+                if isinstance(key, ast.Constant) and isinstance(key.value, str):
+                    path.append(key.value)
+                else:
+                    path.clear()  # dynamic index: depend on the container only
+            else:
+                break
+            inner.add(id(cur.value))
+            cur = cur.value
+        if isinstance(cur, ast.Name) and cur.id not in _CONSTANTS and cur.id not in FILTERS:
+            refs.add((cur.id, *reversed(path)))
+    return refs
+
+
+def compile_expression(src: str) -> Evaluator:
+    """Compile one template expression (the text between ``{{`` and ``}}``)."""
+    return _compile_node(_parse_expression(src), src)
+
+
+# ---- Templates ---------------------------------------------------------------------
+_TEMPLATE_RE = re.compile(r"\{\{(.*?)\}\}", re.DOTALL)
+
+
+def _to_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(thaw(value), default=str, ensure_ascii=False)
+    return str(value)
+
+
+@dataclass(frozen=True)
+class Template:
+    """
+    A precompiled ``{{ ... }}`` string.  A template that is exactly one
+    expression renders to the raw value (``"{{s.metrics}}"`` -> the dict);
+    otherwise the parts are joined as text.
+    """
+    source: str
+    parts: Tuple[Union[str, Evaluator], ...] = field(repr=False)
+    refs: FrozenSet[Tuple[str, ...]] = frozenset()
+
+    @classmethod
+    def compile(cls, source: str) -> "Template":
+        parts: List[Union[str, Evaluator]] = []
+        refs: Set[Tuple[str, ...]] = set()
+        pos = 0
+        for m in _TEMPLATE_RE.finditer(source):
+            if m.start() > pos:
+                parts.append(source[pos:m.start()])
+            tree = _parse_expression(m.group(1))
+            parts.append(_compile_node(tree, m.group(1)))
+            refs |= _references(tree)
+            pos = m.end()
+        if pos < len(source):
+            parts.append(source[pos:])
+        return cls(source, tuple(parts), frozenset(refs))
+
+    def render(self, ctx: Context) -> Any:
+        if len(self.parts) == 1 and callable(self.parts[0]):
+            return self.parts[0](ctx)
+        return "".join(p if isinstance(p, str) else _to_text(p(ctx)) for p in self.parts)
+
+
+def _is_template(value: Any) -> bool:
+    return isinstance(value, str) and "{{" in value
+
+
+def _compile_value(value: Any, refs: Optional[Set[Tuple[str, ...]]] = None) -> Evaluator:
+    """
+    Precompile a params tree; constant subtrees are returned as-is (already
+    frozen).  Names the templates read are added to ``refs``.
+    """
+    if _is_template(value):
+        tpl = Template.compile(value)
+        if refs is not None:
+            refs |= tpl.refs
+        return tpl.render
+    if isinstance(value, Mapping):
+        items = [(k, _compile_value(v, refs)) for k, v in value.items()]
+        if any(getattr(f, "_dynamic", True) for _, f in items):
+            def _render_map(ctx):
+                return {k: f(ctx) for k, f in items}
+            return _render_map
+    elif isinstance(value, (list, tuple)):
+        items_ = [_compile_value(v, refs) for v in value]
+        if any(getattr(f, "_dynamic", True) for f in items_):
+            return lambda ctx: [f(ctx) for f in items_]
+    frozen = freeze(value)
+
+    def _constant(ctx):
+        return frozen
+    _constant._dynamic = False  # type: ignore[attr-defined]
+    return _constant
+
+
+# ---- JSONPath ----------------------------------------------------------------------
+_WILDCARD = object()
+_PATH_TOKEN = re.compile(r"\.([A-Za-z_][\w-]*)|\[(\d+|-\d+|\*|'[^']*'|\"[^\"]*\")\]|\.\*")
+
+
+@dataclass(frozen=True)
+class JsonPath:
+    """A precompiled ``$.a.b[0]`` / ``$['a']`` / ``$.items[*].id`` extractor."""
+    source: str
+    steps: Tuple[Any, ...]
+
+    @classmethod
+    def compile(cls, source: str) -> "JsonPath":
+        text = source.strip()
+        if not text.startswith("$"):
+            raise RecipeCompileError(f"JSONPath {source!r} must start with '$'")
+        steps: List[Any] = []
+        pos = 1
+        while pos < len(text):
+            m = _PATH_TOKEN.match(text, pos)
+            if m is None:
+                raise RecipeCompileError(f"Invalid JSONPath {source!r} at {text[pos:]!r}")
+            name, index = m.group(1), m.group(2)
+            if name is not None:
+                steps.append(name)
+            elif index is None or index == "*":
+                steps.append(_WILDCARD)
+            elif index[0] in "'\"":
+                steps.append(index[1:-1])
+            else:
+                steps.append(int(index))
+            pos = m.end()
+        return cls(source, tuple(steps))
+
+    def extract(self, doc: Any) -> Any:
+        return self._walk(doc, 0)
+
+    def _walk(self, value: Any, i: int) -> Any:
+        for j in range(i, len(self.steps)):
+            step = self.steps[j]
+            if step is _WILDCARD:
+                items = value.values() if isinstance(value, Mapping) else (value or [])
+                return [self._walk(v, j + 1) for v in items]
+            value = _lookup(value, step)
+            if value is None:
+                return None
+        return value
+
+
+def _compile_save(value: Any, refs: Optional[Set[Tuple[str, ...]]] = None) -> Evaluator:
+    """``saves:`` values: ``$.path`` reads the tool result, templates/constants render against the context."""
+    if isinstance(value, str) and value.strip().startswith("$"):
+        path = JsonPath.compile(value)
+        return lambda ctx: path.extract(ctx.get("result"))
+    return _compile_value(value, refs)
+
+
+# ---- Tools and inputs --------------------------------------------------------------
+@dataclass(frozen=True)
+class ToolBinding:
+    """
+    A step's tool.  ``mcp-<server>`` names bind to that MCP server,
+    ``local`` / ``local-<x>`` to in-process helpers and dotted names
+    (``servicenow.kb.create``) to a tool operation.  ``endpoint`` comes from
+    the ``tools`` mapping given to ``compile_recipe()`` (e.g. the Tools table).
+    """
+    name: str
+    kind: str  # "mcp" | "local" | "tool" | "none"
+    target: str
+    endpoint: Optional[str] = None
+
+    @classmethod
+    def resolve(cls, name: Optional[str], tools: Optional[Mapping[str, Any]] = None) -> "ToolBinding":
+        name = str(name or "").strip()
+        endpoint = (tools or {}).get(name)
+        endpoint = None if endpoint is None else str(endpoint)
+        if not name:
+            return cls("", "none", "", endpoint)
+        if name.startswith("mcp-"):
+            return cls(name, "mcp", name[4:], endpoint)
+        if name == "local" or name.startswith("local-"):
+            return cls(name, "local", name[6:], endpoint)
+        return cls(name, "tool", name, endpoint)
+
+
+_TYPES: Dict[str, Tuple[type, ...]] = {
+    "string": (str,),
+    "number": (int, float),
+    "integer": (int,),
+    "boolean": (bool,),
+    "object": (dict,),
+    "array": (list, tuple),
+}
+
+
+@dataclass(frozen=True)
+class InputSpec:
+    name: str
+    type: Optional[str] = None
+    required: bool = False
+    default: Any = None
+    has_default: bool = False
+    enum: Optional[Tuple[Any, ...]] = None
+
+    @classmethod
+    def compile(cls, name: str, spec: Any) -> "InputSpec":
+        if not isinstance(spec, Mapping):
+            return cls(name)  # `inputs: {x: "..."}` shorthand: untyped, optional
+        typ = spec.get("type")
+        if typ is not None and typ not in _TYPES:
+            raise RecipeCompileError(f"Input {name!r}: unknown type {typ!r}")
+        enum = spec.get("enum")
+        return cls(
+            name=name,
+            type=typ,
+            required=bool(spec.get("required", False)),
+            default=spec.get("default"),
+            has_default="default" in spec,
+            enum=tuple(enum) if enum is not None else None,
+        )
+
+    def check(self, value: Any) -> Optional[str]:
+        if value is None:
+            return None
+        types = _TYPES.get(self.type or "")
+        if types and (not isinstance(value, types) or (self.type in ("number", "integer") and isinstance(value, bool))):
+            return f"{self.name}: expected {self.type}, got {type(value).__name__}"
+        if self.enum is not None and value not in self.enum:
+            return f"{self.name}: {value!r} is not one of {list(self.enum)}"
+        return None
+
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*$")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Any) -> float:
+    """Seconds for ``30``, ``"30s"``, ``"500ms"``, ``"2m"`` or ``"1h"``."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    m = _DURATION.match(str(value))
+    if not m:
+        raise RecipeCompileError(f"invalid duration {value!r} (e.g. 30s, 500ms, 2m)")
+    return float(m.group(1)) * _DURATION_UNITS[m.group(2) or "s"]
+
+
+@dataclass(frozen=True)
+class StepCacheSpec:
+    """
+    A step's ``cache:`` attribute.  Results are keyed on the tool, the action
+    and ``key`` (expressions such as ``inputs.roomId``), or on all rendered
+    params when no ``key`` is given.
+    """
+    ttl_s: float
+    key: Optional[Tuple[Template, ...]] = None
+
+    @classmethod
+    def compile(cls, raw: Any, refs: Optional[Set[Tuple[str, ...]]] = None) -> Optional["StepCacheSpec"]:
+        if raw is None or raw is False:
+            return None
+        if raw is True:
+            raw = {}
+        if not isinstance(raw, Mapping):
+            raise RecipeCompileError("'cache' must be true or a mapping {ttl, key}")
+        ttl_s = parse_duration(raw.get("ttl", 30))
+        if ttl_s <= 0:
+            raise RecipeCompileError("cache ttl must be positive")
+        key = raw.get("key")
+        if key is None:
+            return cls(ttl_s)
+        if isinstance(key, str):
+            key = [key]
+        templates = []
+        for k in key:
+            k = str(k).strip()
+            tpl = Template.compile(k if k.startswith("{{") else "{{" + k + "}}")
+            if refs is not None:
+                refs |= tpl.refs
+            templates.append(tpl)
+        return cls(ttl_s, tuple(templates))
+
+    def args(self, ctx: Context, params: Any) -> Any:
+        """What identifies a call besides tool and action."""
+        if self.key is None:
+            return params
+        return [t.render(ctx) for t in self.key]
+
+
+# ---- Plan --------------------------------------------------------------------------
+@dataclass
+class StepOutcome:
+    id: str
+    status: str  # "ok" | "simulated" | "skipped" (| "resumed", see core.workflow.checkpoints)
+    params: Any = None
+    result: Any = None
+    saved: Dict[str, Any] = field(default_factory=dict)
+    offset_ms: float = 0.0  # start, relative to the start of the run
+    duration_ms: float = 0.0
+    cached: bool = False  # result came from the step cache
+
+
+ToolCall = Callable[[ToolBinding, Optional[str], Any], Any]
+
+
+@dataclass(frozen=True)
+class PlanStep:
+    id: str
+    action: Optional[str]
+    tool: ToolBinding
+    params: Evaluator = field(repr=False)
+    saves: Tuple[Tuple[str, Evaluator], ...] = field(repr=False, default=())
+    when: Optional[Template] = None
+    foreach: Optional[Template] = None
+    simulate: bool = False
+    fallback_saves: Tuple[Tuple[str, Evaluator], ...] = field(repr=False, default=())
+    fallback_message: Optional[str] = None
+    needs: Tuple[str, ...] = ()  # explicit `needs:` step ids
+    refs: FrozenSet[Tuple[str, ...]] = frozenset()  # dotted names its templates read
+    cache: Optional[StepCacheSpec] = None
+
+    @property
+    def writes(self) -> FrozenSet[str]:
+        """State keys (``s.<key>``) this step may save."""
+        return frozenset(k for k, _ in self.saves) | frozenset(k for k, _ in self.fallback_saves)
+
+    def render_params(self, ctx: Context) -> Any:
+        return self.params(ctx)
+
+    def execute(
+        self,
+        ctx: Context,
+        call: Optional[ToolCall] = None,
+        *,
+        idempotency_key: Optional[str] = None,
+        cache: Any = None,
+    ) -> Tuple[List[StepOutcome], Dict[str, Any], Any]:
+        """
+        Run this step (every ``foreach`` item) against ``ctx`` without
+        mutating it.  Returns ``(outcomes, saved state, result)``; ``result``
+        is a list for ``foreach`` steps; one with no items is skipped, so
+        ``outcomes`` is never empty.  See ``RecipePlan.run`` for the
+        ``call`` / ``fallback`` rules.  With ``idempotency_key`` the tool is
+        called as ``call(tool, action, params, idempotency_key=...)`` (one
+        key per ``foreach`` item: ``<key>-<n>``).  Steps with a ``cache:``
+        attribute go through ``cache.get_or_call(key, ttl_s, fn)`` when a
+        cache is given (see ``core.workflow.step_cache.StepCache``).
+        """
+        if self.when is not None and not self.when.render(ctx):
+            return [StepOutcome(self.id, "skipped")], {}, None
+        state = dict(ctx.get("s") or {})
+        saved_all: Dict[str, Any] = {}
+        outcomes: List[StepOutcome] = []
+        results = []
+        items = self.foreach.render(ctx) if self.foreach is not None else None
+        if self.foreach is not None and not items:
+            return [StepOutcome(self.id, "skipped")], {}, []
+        for n, item in enumerate((items or ()) if self.foreach is not None else (None,)):
+            started = time.perf_counter()
+            sctx = {**ctx, "s": state}
+            if self.foreach is not None:
+                sctx["item"] = item
+            params = self.params(sctx)
+            result, error, cached = None, None, False
+            if call is not None:
+                try:
+                    if idempotency_key is None:
+                        invoke = functools.partial(call, self.tool, self.action, params)
+                    else:
+                        key = idempotency_key if self.foreach is None else f"{idempotency_key}-{n}"
+                        invoke = functools.partial(call, self.tool, self.action, params, idempotency_key=key)
+                    if cache is not None and self.cache is not None:
+                        cache_key = (self.tool.name, self.action, self.cache.args(sctx, params))
+                        result, cached = cache.get_or_call(cache_key, self.cache.ttl_s, invoke)
+                    else:
+                        result = invoke()
+                except Exception as e:
+                    if not self.simulate:
+                        raise
+                    error = e
+            if result is None and self.simulate:
+                saved = {k: f(sctx) for k, f in self.fallback_saves}
+                status = "simulated"
+            else:
+                rctx = {**sctx, "result": result}
+                saved = {k: f(rctx) for k, f in self.saves}
+                status = "ok"
+            state.update(saved)
+            saved_all.update(saved)
+            outcome = StepOutcome(self.id, status, params, result, saved, cached=cached)
+            if error is not None:
+                outcome.result = {"error": f"{type(error).__name__}: {error}"}
+            outcome.duration_ms = (time.perf_counter() - started) * 1000.0
+            outcomes.append(outcome)
+            results.append(result)
+        if self.foreach is not None:
+            return outcomes, saved_all, results
+        return outcomes, saved_all, results[0] if results else None
+
+
+@dataclass
+class PlanResult:
+    inputs: Dict[str, Any]
+    state: Dict[str, Any]
+    steps: List[StepOutcome]
+    outputs: Any
+    checks: List[Tuple[str, bool]]
+
+    @property
+    def verified(self) -> bool:
+        return all(ok for _, ok in self.checks)
+
+    @property
+    def cache_hits(self) -> int:
+        return sum(1 for o in self.steps if o.cached)
+
+
+CONTEXT_NAMES = frozenset({"inputs", "input", "params", "s", "item", "result"})
+
+
+def set_step_result(ctx: Dict[str, Any], dotted: str, value: Any) -> None:
+    """
+    Expose a step's result as ``ctx[a][b] = value`` for id ``a.b``
+    (``{{act.create.result.x}}``).  The dicts along the path are replaced by
+    copies rather than mutated, so a shallow copy of ``ctx`` taken earlier
+    (``core.workflow.dag`` hands one to each running step) keeps its view.
+    """
+    *parents, last = dotted.split(".")
+    if (parents[0] if parents else last) in CONTEXT_NAMES:
+        return
+    node = ctx
+    for p in parents:
+        child = node.get(p)
+        child = node[p] = dict(child) if isinstance(child, dict) else {}
+        node = child
+    node[last] = value
+
+
+@dataclass(frozen=True)
+class RecipePlan:
+    """An immutable, precompiled recipe; see the module docstring."""
+    id: str
+    title: str
+    version: Optional[str]
+    inputs: Tuple[InputSpec, ...]
+    params: Any = field(repr=False)
+    steps: Tuple[PlanStep, ...]
+    checks: Tuple[Tuple[str, Evaluator], ...] = field(repr=False)
+    outputs: Evaluator = field(repr=False)
+    phase_counts: Tuple[Tuple[str, int], ...] = ()
+    source: Any = field(default=None, repr=False, compare=False)
+
+    @property
+    def tools(self) -> Tuple[ToolBinding, ...]:
+        seen: Dict[str, ToolBinding] = {}
+        for s in self.steps:
+            if s.tool.name:
+                seen.setdefault(s.tool.name, s.tool)
+        return tuple(seen.values())
+
+    def bind_inputs(self, inputs: Optional[Mapping[str, Any]] = None, *, validate: bool = True) -> Dict[str, Any]:
+        """Declared defaults under the caller's ``inputs`` (extra keys kept); raise RecipeInputError when invalid."""
+        out = {s.name: s.default for s in self.inputs if s.has_default}
+        out.update(inputs or {})
+        if validate:
+            problems = [f"{s.name}: required" for s in self.inputs if s.required and out.get(s.name) is None]
+            problems += [p for p in (s.check(out.get(s.name)) for s in self.inputs) if p]
+            if problems:
+                raise RecipeInputError(f"Invalid inputs for recipe {self.id!r}: " + "; ".join(problems))
+        return out
+
+    def new_context(self, bound: Dict[str, Any]) -> Dict[str, Any]:
+        """Render context for ``bind_inputs()`` output: ``inputs``/``input``, ``params`` and state ``s``."""
+        return {"inputs": bound, "input": bound, "params": self.params, "s": {}}
+
+    def finish(self, ctx: Dict[str, Any], outcomes: List[StepOutcome]) -> PlanResult:
+        """Evaluate assertions and outputs against the final context."""
+        checks = []
+        for text, check in self.checks:
+            try:
+                ok = bool(check(ctx))
+            except Exception:
+                ok = False
+            checks.append((text, ok))
+        return PlanResult(ctx["inputs"], ctx["s"], outcomes, self.outputs(ctx), checks)
+
+    def run(
+        self,
+        inputs: Optional[Mapping[str, Any]] = None,
+        *,
+        call: Optional[ToolCall] = None,
+        validate: bool = True,
+        cache: Any = None,
+    ) -> PlanResult:
+        """
+        Render and execute the steps in order.  ``call(tool, action, params)``
+        performs a step and returns its result.  Without ``call`` (or when it
+        returns None / raises) a step with a ``fallback`` is simulated with
+        the fallback's ``saves``.  A failing call without a fallback
+        propagates.  ``cache`` memoises steps that declare ``cache:``.
+        ``core.workflow.dag`` runs independent steps concurrently.
+        """
+        ctx = self.new_context(self.bind_inputs(inputs, validate=validate))
+        outcomes: List[StepOutcome] = []
+        start = time.perf_counter()
+        for step in self.steps:
+            offset = (time.perf_counter() - start) * 1000.0
+            step_outcomes, saved, result = step.execute(ctx, call, cache=cache)
+            for o in step_outcomes:
+                o.offset_ms = offset
+                offset += o.duration_ms
+            outcomes.extend(step_outcomes)
+            ctx["s"].update(saved)
+            if step_outcomes[0].status != "skipped":
+                set_step_result(ctx, step.id, {"result": result})
+        return self.finish(ctx, outcomes)
+
+
+def _phase_counts(recipe: Mapping[str, Any]) -> Tuple[Tuple[str, int], ...]:
+    return tuple((p, len(recipe.get(p) or [])) for p in ("intake", "plan", "act", "verify"))
+
+
+def _compile_step(i: int, raw: Any, tools: Optional[Mapping[str, Any]]) -> PlanStep:
+    if not isinstance(raw, Mapping):
+        raise RecipeCompileError(f"steps[{i}] must be a mapping")
+    sid = str(raw.get("id") or f"step-{i + 1}")
+    try:
+        fallback = raw.get("fallback")
+        fallback = fallback if isinstance(fallback, Mapping) else {}
+        when = Template.compile(str(raw["when"])) if raw.get("when") is not None else None
+        foreach = Template.compile(str(raw["foreach"])) if raw.get("foreach") is not None else None
+        needs = raw.get("needs") or ()
+        refs: Set[Tuple[str, ...]] = set()
+        for tpl in (when, foreach):
+            if tpl is not None:
+                refs |= tpl.refs
+        return PlanStep(
+            id=sid,
+            action=raw.get("action"),
+            tool=ToolBinding.resolve(raw.get("using") or raw.get("tool"), tools),
+            params=_compile_value(raw.get("params", raw.get("input")) or {}, refs),
+            saves=tuple((str(k), _compile_save(v, refs)) for k, v in (raw.get("saves") or {}).items()),
+            when=when,
+            foreach=foreach,
+            simulate=bool(fallback.get("simulate")),
+            fallback_saves=tuple(
+                (str(k), _compile_value(v, refs)) for k, v in (fallback.get("saves") or {}).items()
+            ),
+            fallback_message=fallback.get("message"),
+            needs=(str(needs),) if isinstance(needs, str) else tuple(str(n) for n in needs),
+            cache=StepCacheSpec.compile(raw.get("cache"), refs),
+            refs=frozenset(refs),
+        )
+    except RecipeCompileError as e:
+        raise RecipeCompileError(f"step {sid!r}: {e}") from None
+
+
+def _compile_checks(recipe: Mapping[str, Any]) -> Tuple[Tuple[str, Evaluator], ...]:
+    texts: List[str] = []
+    for entry in recipe.get("verify") or []:
+        if isinstance(entry, Mapping) and "assert" in entry:
+            texts.append(str(entry["assert"]))
+    texts += [str(t) for t in recipe.get("assertions") or []]
+    out = []
+    for text in texts:
+        inner = text.strip()
+        if inner.startswith("{{") and inner.endswith("}}"):
+            inner = inner[2:-2]
+        try:
+            out.append((text, compile_expression(inner)))
+        except RecipeCompileError as e:
+            raise RecipeCompileError(f"assertion {text!r}: {e}") from None
+    return tuple(out)
+
+
+def compile_recipe(recipe: Mapping[str, Any], *, tools: Optional[Mapping[str, Any]] = None) -> RecipePlan:
+    """Compile a parsed recipe (see ``load_recipe_dict``) into a ``RecipePlan``."""
+    if not isinstance(recipe, Mapping):
+        raise RecipeCompileError("Recipe must be a mapping")
+    declared = recipe.get("inputs") or {}
+    if not isinstance(declared, Mapping):
+        raise RecipeCompileError("'inputs' must be a mapping of name -> spec")
+    steps = recipe.get("steps") or []
+    if not isinstance(steps, Sequence) or isinstance(steps, str):
+        raise RecipeCompileError("'steps' must be a list")
+    try:
+        outputs = _compile_value(recipe.get("outputs") or {})
+    except RecipeCompileError as e:
+        raise RecipeCompileError(f"outputs: {e}") from None
+    return RecipePlan(
+        id=str(recipe.get("id") or recipe.get("name") or "recipe"),
+        title=str(recipe.get("title") or recipe.get("name") or recipe.get("id") or ""),
+        version=None if recipe.get("version") is None else str(recipe.get("version")),
+        inputs=tuple(InputSpec.compile(str(k), v) for k, v in declared.items()),
+        params=freeze(recipe.get("params") or {}),
+        steps=tuple(_compile_step(i, s, tools) for i, s in enumerate(steps)),
+        checks=_compile_checks(recipe),
+        outputs=outputs,
+        phase_counts=_phase_counts(recipe),
+        source=recipe,
+    )
+
+
+# Plans for cached (read-only) recipes, keyed on the recipe object's identity.
+# The plan holds its recipe, so an id is not reused while its entry is alive.
+_PLANS = RecipeCache(maxsize=256)
+
+
+def load_recipe_plan(source: Any, *, tools: Optional[Mapping[str, Any]] = None) -> RecipePlan:
+    """
+    ``compile_recipe(load_recipe_dict(source))``, compiled once per parsed
+    recipe.  Plans are only memoised for the read-only recipes from the
+    recipe cache (and without a ``tools`` mapping); a plain dict is
+    compiled on every call since it may be mutated.
+    """
+    recipe = load_recipe_dict(source)
+    if tools is not None or not isinstance(recipe, FrozenDict):
+        return compile_recipe(recipe, tools=tools)
+    return _PLANS.get_or_load(("plan", id(recipe)), lambda: compile_recipe(recipe))
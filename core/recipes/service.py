@@ -5,7 +5,7 @@ from pathlib import Path
 import re
 from typing import Union, Any
 
-import yaml
+from .cache import RECIPE_CACHE, RecipeCacheStats, file_key, parse_yaml, text_key, thaw
 
 PACKAGE_ROOT = Path(__file__).resolve().parents[2]
 PACKAGE_RECIPES_DIR = PACKAGE_ROOT / "recipes"
@@ -17,6 +17,8 @@ __all__ = [
     "save_recipe_yaml",
     "save_recipe_yaml_for_name",
     "load_recipe_dict",
+    "recipe_cache_stats",
+    "thaw",
 ]
 
 def _slugify(name: str) -> str:
@@ -42,6 +44,22 @@ def _read_text_from_path(p: Path) -> str:
         raise FileNotFoundError(f"Recipe file not found: {p}")
     return p.read_text(encoding="utf-8")
 
+def _parse_recipe_text(yaml_text: str) -> dict:
+    try:
+        data = parse_yaml(yaml_text) or {}
+    except Exception as e:
+        raise ValueError(f"Invalid YAML: {e}") from e
+
+    if not isinstance(data, dict):
+        raise ValueError("Recipe YAML must load to a mapping (dict).")
+    return data
+
+def _load_file(p: Path, key) -> dict:
+    return RECIPE_CACHE.get_or_load(key, lambda: _parse_recipe_text(_read_text_from_path(p)))
+
+def _load_text(yaml_text: str) -> dict:
+    return RECIPE_CACHE.get_or_load(text_key(yaml_text), lambda: _parse_recipe_text(yaml_text))
+
 def load_recipe_dict(source: Union[dict, str, Path, Any]) -> dict:
     """
     Load recipe data into a dict from:
@@ -49,27 +67,29 @@ def load_recipe_dict(source: Union[dict, str, Path, Any]) -> dict:
       - SQLAlchemy model with .yaml_path and/or .yaml
       - filesystem path
       - raw YAML text
+
+    Parsed recipes come from ``RECIPE_CACHE`` (keyed on path + mtime + size,
+    or on the text's hash) and are read-only ``FrozenDict`` views; use
+    ``thaw()`` for a copy you can modify.
     """
     if isinstance(source, dict):
         return source
 
-    yaml_text: str | None = None
-
     # Model instance
     if hasattr(source, "yaml_path") or hasattr(source, "yaml"):
         # prefer file if path exists; else inline yaml text
         p_val = getattr(source, "yaml_path", None)
         if p_val:
             p = Path(str(p_val))
-            if p.exists():
-                yaml_text = _read_text_from_path(p)
-        if yaml_text is None:
-            y = getattr(source, "yaml", None)
-            if y:
-                yaml_text = str(y)
+            key = file_key(p)
+            if key is not None:
+                return _load_file(p, key)
+        y = getattr(source, "yaml", None)
+        if y:
+            return _load_text(str(y))
 
     # Path-like or string path
-    if yaml_text is None and isinstance(source, (str, Path)):
+    if isinstance(source, (str, Path)):
         p = Path(str(source))
         candidate_paths = [p]
         if not p.is_absolute():
@@ -84,25 +104,20 @@ def load_recipe_dict(source: Union[dict, str, Path, Any]) -> dict:
             if candidate in seen:
                 continue
             seen.add(candidate)
-            if candidate.exists():
-                yaml_text = _read_text_from_path(candidate)
-                break
-    # If still None and it's a string, treat as YAML text
-    if yaml_text is None and isinstance(source, str):
+            key = file_key(candidate)  # one stat: existence, mtime and size
+            if key is not None:
+                return _load_file(candidate, key)
+    # If still unresolved and it's a string, treat as YAML text
+    if isinstance(source, str):
         if (":" in source) or ("\n" in source):
-            yaml_text = source
+            return _load_text(source)
 
-    if yaml_text is None:
-        raise ValueError(
-            "load_recipe_dict: could not resolve recipe source. "
-            "Provide a dict, a model with .yaml_path or .yaml, a file path, or YAML text."
-        )
+    raise ValueError(
+        "load_recipe_dict: could not resolve recipe source. "
+        "Provide a dict, a model with .yaml_path or .yaml, a file path, or YAML text."
+    )
 
-    try:
-        data = yaml.safe_load(yaml_text) or {}
-    except Exception as e:
-        raise ValueError(f"Invalid YAML: {e}") from e
 
-    if not isinstance(data, dict):
-        raise ValueError("Recipe YAML must load to a mapping (dict).")
-    return data
+def recipe_cache_stats() -> RecipeCacheStats:
+    """Hit/miss/eviction counters of the parsed-recipe cache."""
+    return RECIPE_CACHE.stats()
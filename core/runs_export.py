@@ -0,0 +1,218 @@
+"""
+core/runs_export.py
+-------------------
+
+Streaming export of run history (``workflow_runs``, ``step_events``,
+``artifacts`` and ``run_spans``) from a ``RunStore`` database to NDJSON or Parquet.
+
+Rows are read with server-side streaming (``stream_results`` + ``yield_per``)
+as plain column tuples, never ORM objects, and written chunk by chunk, so
+memory stays flat no matter how much history is exported.  Step, artifact and span
+rows are filtered by the same run window/status as their parent runs.
+
+Payloads offloaded to the blob store are exported as references unless
+``resolve_blobs=True``.  Parquet output needs the optional ``pyarrow`` package.
+
+CLI::
+
+    python -m core.runs_export --out exports/ --format parquet --since 2026-09-01 --status failed
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import JSON, DateTime, Float, Integer, Table, select
+
+from .runs_store import Artifact, RunSpan, RunStore, StepEvent, WorkflowRun
+
+try:  # optional dependency for Parquet output
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:
+    pa = None
+    pq = None
+
+EXPORT_TABLES = ("workflow_runs", "step_events", "artifacts", "run_spans")
+_TABLES: Dict[str, Table] = {
+    "workflow_runs": WorkflowRun.__table__,
+    "step_events": StepEvent.__table__,
+    "artifacts": Artifact.__table__,
+    "run_spans": RunSpan.__table__,
+}
+_BLOB_COLUMNS = {"step_events": ("payload", "result"), "artifacts": ("data",)}
+
+
+def _run_filters(
+    since: Optional[datetime], until: Optional[datetime], status: Optional[Sequence[str]]
+) -> List[Any]:
+    cond: List[Any] = []
+    if since:
+        cond.append(WorkflowRun.started_at >= since)
+    if until:
+        cond.append(WorkflowRun.started_at < until)
+    if status:
+        cond.append(WorkflowRun.status.in_(list(status)))
+    return cond
+
+
+def _query(table: str, cond: List[Any]):
+    tbl = _TABLES[table]
+    q = select(*tbl.c)
+    if table != "workflow_runs" and cond:
+        q = q.join(WorkflowRun.__table__, WorkflowRun.id == tbl.c.run_id)
+    return q.where(*cond).order_by(tbl.c.id)
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+    return value
+
+
+def iter_chunks(
+    store: RunStore,
+    table: str,
+    *,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    status: Optional[Sequence[str]] = None,
+    chunk_size: int = 1000,
+    resolve_blobs: bool = False,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield lists of at most ``chunk_size`` row dicts from ``table``. Offloaded
+    payloads stay as ``{"$blob": ...}`` references unless ``resolve_blobs``.
+    """
+    if table not in _TABLES:
+        raise ValueError(f"Unknown table {table!r}; expected one of {EXPORT_TABLES}")
+    q = _query(table, _run_filters(since, until, status))
+    blob_cols = _BLOB_COLUMNS.get(table, ()) if resolve_blobs else ()
+    with store.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(q)
+        for part in result.partitions():
+            rows = [{k: _jsonable(v) for k, v in row._mapping.items()} for row in part]
+            for r in rows:
+                for c in blob_cols:
+                    r[c] = store.load_blob(r[c])
+            yield rows
+
+
+def export_ndjson(
+    store: RunStore,
+    out_dir: Path,
+    *,
+    tables: Sequence[str] = EXPORT_TABLES,
+    **filters: Any,
+) -> Dict[str, int]:
+    """Write ``<table>.ndjson`` files into ``out_dir``; return row counts."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    counts: Dict[str, int] = {}
+    for table in tables:
+        n = 0
+        with (out_dir / f"{table}.ndjson").open("w", encoding="utf-8") as fh:
+            for chunk in iter_chunks(store, table, **filters):
+                fh.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in chunk))
+                n += len(chunk)
+        counts[table] = n
+    return counts
+
+
+def _arrow_schema(table: str):
+    fields = []
+    for col in _TABLES[table].c:
+        if isinstance(col.type, Integer):
+            typ = pa.int64()
+        elif isinstance(col.type, Float):
+            typ = pa.float64()
+        elif isinstance(col.type, DateTime):
+            typ = pa.timestamp("us", tz="UTC")
+        else:  # String and JSON (serialized) columns
+            typ = pa.string()
+        fields.append(pa.field(col.name, typ))
+    return pa.schema(fields)
+
+
+def export_parquet(
+    store: RunStore,
+    out_dir: Path,
+    *,
+    tables: Sequence[str] = EXPORT_TABLES,
+    **filters: Any,
+) -> Dict[str, int]:
+    """Write ``<table>.parquet`` files (one row group per chunk); return row counts."""
+    if pa is None or pq is None:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow).")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    counts: Dict[str, int] = {}
+    for table in tables:
+        schema = _arrow_schema(table)
+        json_cols = [c.name for c in _TABLES[table].c if isinstance(c.type, JSON)]
+        ts_cols = [c.name for c in _TABLES[table].c if isinstance(c.type, DateTime)]
+        n = 0
+        with pq.ParquetWriter(out_dir / f"{table}.parquet", schema) as writer:
+            for chunk in iter_chunks(store, table, **filters):
+                for r in chunk:
+                    for c in json_cols:
+                        r[c] = None if r[c] is None else json.dumps(r[c], ensure_ascii=False, default=str)
+                    for c in ts_cols:
+                        r[c] = None if r[c] is None else datetime.fromisoformat(r[c])
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                n += len(chunk)
+        counts[table] = n
+    return counts
+
+
+def export_runs(store: RunStore, out_dir: Path, *, fmt: str = "ndjson", **kwargs: Any) -> Dict[str, int]:
+    """Export run history as ``fmt`` ("ndjson" or "parquet")."""
+    if fmt == "ndjson":
+        return export_ndjson(store, out_dir, **kwargs)
+    if fmt == "parquet":
+        return export_parquet(store, out_dir, **kwargs)
+    raise ValueError(f"Unknown export format {fmt!r}; expected 'ndjson' or 'parquet'.")
+
+
+def _parse_dt(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from .runstore_factory import make_runstore
+
+    ap = argparse.ArgumentParser(description="Export run history from avops.db.")
+    ap.add_argument("--out", required=True, help="Output directory")
+    ap.add_argument("--format", choices=("ndjson", "parquet"), default="ndjson")
+    ap.add_argument("--db", help="Path to the run store database (default: avops.db)")
+    ap.add_argument("--since", help="ISO timestamp; runs started at or after")
+    ap.add_argument("--until", help="ISO timestamp; runs started before")
+    ap.add_argument("--status", action="append", help="Run status filter (repeatable)")
+    ap.add_argument("--table", action="append", choices=EXPORT_TABLES, help="Limit to table(s)")
+    ap.add_argument("--chunk-size", type=int, default=1000)
+    ap.add_argument("--resolve-blobs", action="store_true", help="Inline offloaded payloads")
+    args = ap.parse_args(argv)
+
+    store = make_runstore(Path(args.db) if args.db else None)
+    counts = export_runs(
+        store,
+        Path(args.out),
+        fmt=args.format,
+        tables=args.table or EXPORT_TABLES,
+        since=_parse_dt(args.since),
+        until=_parse_dt(args.until),
+        status=args.status,
+        chunk_size=args.chunk_size,
+        resolve_blobs=args.resolve_blobs,
+    )
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
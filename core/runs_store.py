@@ -1,16 +1,27 @@
 # core/runs_store.py
 from __future__ import annotations
+import base64
 import contextlib
+import json
+import os
+import threading
 import time
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 from sqlalchemy import (
-    JSON, DateTime, Float, ForeignKey, Integer, String, create_engine, select
+    JSON, DateTime, Float, ForeignKey, Index, Integer, String, bindparam, case, delete, func,
+    insert, inspect, or_, select, text,
 )
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, sessionmaker
 
+from .blob_store import LazyBlob, blob_store_for, blob_threshold_from_env, is_blob_ref, resolve
+from .db.connections import get_engine, sqlite_url
+from .latency import LatencySketch, bucket_counts, bucket_index, bucket_sql, quantile_from_buckets
+
 UTC = timezone.utc
 
 
@@ -36,6 +47,11 @@ class WorkflowRun(Base):
     steps: Mapped[List["StepEvent"]] = relationship(back_populates="run", cascade="all, delete-orphan")
     artifacts: Mapped[List["Artifact"]] = relationship(back_populates="run", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_workflow_runs_status_started", "status", "started_at"),
+        Index("ix_workflow_runs_recipe_id", "recipe_id", "id"),
+    )
+
 
 class StepEvent(Base):
     __tablename__ = "step_events"
@@ -51,6 +67,8 @@ class StepEvent(Base):
 
     run: Mapped[WorkflowRun] = relationship(back_populates="steps")
 
+    __table_args__ = (Index("ix_step_events_run_id", "run_id", "id"),)
+
 
 class Artifact(Base):
     __tablename__ = "artifacts"
@@ -65,19 +83,213 @@ class Artifact(Base):
     run: Mapped[WorkflowRun] = relationship(back_populates="artifacts")
 
 
+class RunRollup(Base):
+    """Per hour/day counters for finished runs, keyed by workflow and recipe."""
+    __tablename__ = "run_rollups"
+    grain: Mapped[str] = mapped_column(String(8), primary_key=True)  # hour/day
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    workflow_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    recipe_id: Mapped[int] = mapped_column(Integer, primary_key=True)  # 0 = no recipe
+    runs: Mapped[int] = mapped_column(Integer, default=0)
+    successes: Mapped[int] = mapped_column(Integer, default=0)
+    failures: Mapped[int] = mapped_column(Integer, default=0)
+    duration_sum_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    duration_count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class RunRollupBucket(Base):
+    """Duration histogram (core.latency buckets) for each RunRollup row."""
+    __tablename__ = "run_rollup_buckets"
+    grain: Mapped[str] = mapped_column(String(8), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    workflow_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    recipe_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bucket: Mapped[int] = mapped_column(Integer, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class RunSpan(Base):
+    """Timed section of a run; `parent_id` nests spans (see `Recorder.span()`)."""
+    __tablename__ = "run_spans"
+    id: Mapped[str] = mapped_column(String(16), primary_key=True)
+    run_id: Mapped[int] = mapped_column(ForeignKey("workflow_runs.id", ondelete="CASCADE"))
+    parent_id: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    name: Mapped[str] = mapped_column(String(128))
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    ended_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    duration_ms: Mapped[float] = mapped_column(Float)
+    status: Mapped[str] = mapped_column(String(16), default="ok")  # ok/error
+    attrs: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
+
+    __table_args__ = (Index("ix_run_spans_run_id", "run_id", "started_at"),)
+
+
+class RunChange(Base):
+    """
+    Append-only change feed. `seq` is the monotonic cursor for
+    `changes_since()`; step/artifact rows record the inserted id range.
+    """
+    __tablename__ = "run_changes"
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    ts: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
+    run_id: Mapped[int] = mapped_column(Integer)
+    kind: Mapped[str] = mapped_column(String(16))  # run/steps/artifacts
+    first_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    last_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+
+class RunCheckpoint(Base):
+    """
+    Durable per-step progress of a resumable recipe run (see
+    `core.workflow.checkpoints`). `run_id` is the first attempt's run; resumed
+    attempts (`attempt_run_id`) keep writing under it.
+    """
+    __tablename__ = "run_checkpoints"
+    run_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    step_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    seq: Mapped[int] = mapped_column(Integer)  # step position in the recipe
+    status: Mapped[str] = mapped_column(String(16))  # started/ok/simulated/skipped/failed
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    saved: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
+    result: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String(2000), nullable=True)
+    attempt_run_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
+
+
+class StepResult(Base):
+    """
+    Shared results of read-only recipe steps (``cache:`` in a recipe), keyed on
+    a digest of tool, action and normalized args (see `core.workflow.step_cache`).
+    """
+    __tablename__ = "step_results"
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    tool: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    action: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    value: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+
+
+ROLLUP_GRAINS = ("hour", "day")
+
+# Columns returned by the paged detail API unless `fields=` asks for more.
+STEP_LIST_FIELDS = ("run_id", "ts", "phase", "level", "status", "message")
+ARTIFACT_LIST_FIELDS = ("run_id", "kind", "external_id", "url", "title")
+
+
+# Full-text index over run names/errors, step messages and artifact titles/ids.
+# kind: name/error (ref_id = run id), step (step id) or artifact (artifact id).
+_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS run_search USING fts5("
+    "body, kind UNINDEXED, run_id UNINDEXED, ref_id UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+_SEARCH_BACKFILL = (
+    "INSERT INTO run_search (body, kind, run_id, ref_id) "
+    "SELECT name, 'name', id, id FROM workflow_runs WHERE name IS NOT NULL AND name != ''",
+    "INSERT INTO run_search (body, kind, run_id, ref_id) "
+    "SELECT error, 'error', id, id FROM workflow_runs WHERE error IS NOT NULL AND error != ''",
+    "INSERT INTO run_search (body, kind, run_id, ref_id) "
+    "SELECT message, 'step', run_id, id FROM step_events WHERE message IS NOT NULL AND message != ''",
+    "INSERT INTO run_search (body, kind, run_id, ref_id) "
+    "SELECT TRIM(COALESCE(title, '') || ' ' || COALESCE(external_id, '')), 'artifact', run_id, id "
+    "FROM artifacts WHERE COALESCE(title, '') != '' OR COALESCE(external_id, '') != ''",
+)
+_FTS_OPERATORS = {"OR", "AND", "NOT"}
+
+
+def _fts_query(query: str) -> str:
+    """Quote user terms as FTS5 phrases; keep OR/AND/NOT and trailing `*` prefixes."""
+    parts: List[str] = []
+    for tok in (query or "").split():
+        if tok in _FTS_OPERATORS:
+            if parts and parts[-1] not in _FTS_OPERATORS:
+                parts.append(tok)
+            continue
+        prefix = tok.endswith("*")
+        term = tok.rstrip("*").replace('"', '""')
+        if term:
+            parts.append(f'"{term}"' + ("*" if prefix else ""))
+    while parts and parts[-1] in _FTS_OPERATORS:
+        parts.pop()
+    return " ".join(parts)
+
+
+def _artifact_text(title: Optional[str], external_id: Optional[str]) -> str:
+    return " ".join(p for p in (title, external_id) if p)
+
+
+def _aware(dt: datetime) -> datetime:
+    """SQLite hands back naive datetimes; they are stored as UTC."""
+    return dt if dt.tzinfo else dt.replace(tzinfo=UTC)
+
+
+def _floor(dt: datetime, grain: str) -> datetime:
+    dt = dt.astimezone(UTC) if dt.tzinfo else dt.replace(tzinfo=UTC)
+    if grain == "day":
+        return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def _grain_step(grain: str) -> timedelta:
+    return timedelta(days=1) if grain == "day" else timedelta(hours=1)
+
+
 class RunStore:
     """
     Persistent run log for workflows/agents.
       - Use `with store.workflow_run(...):` to wrap an execution
       - Call `rec.step(...)` and `rec.artifact(...)` inside the context
+      - Time sections with `with rec.span("name", tool=...):` (nestable);
+        see `latency_breakdown()`
+      - Pass `buffered=True` to queue steps/artifacts in memory and write them
+        in bulk (every `flush_size` rows / `flush_interval_s` seconds and on exit)
+      - `deferred=True` also defers the run row: a run that finishes within
+        one flush window is written in a single transaction (see `RunJournal`)
+      - Finished runs are folded into hourly/daily rollups; see `run_series()`
+      - Every write appends to a change feed; see `changes_since()` and
+        `wait_for_changes()`
+      - Names, errors, step messages and artifacts are full-text indexed;
+        see `search()`
+      - Resumable recipe runs keep per-step checkpoints; see `save_checkpoint()`
+      - Results of cacheable recipe steps are shared between processes; see
+        `get_step_result()`
     """
-    def __init__(self, db_path: Optional[Path] = None):
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        *,
+        blob_threshold: Optional[int] = None,
+        blob_dir: Optional[Path] = None,
+    ):
         base_dir = Path(__file__).resolve().parents[1]  # <repo>/sma-av-streamlit
         self.db_path = Path(db_path) if db_path else base_dir / "avops.db"
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.engine = create_engine(f"sqlite:///{self.db_path}", future=True)
+        self.engine = get_engine(sqlite_url(self.db_path))
+        # Databases from before the rollups (or their histograms) get them
+        # backfilled once, like the search index below.
+        rollups_missing = not {RunRollup.__tablename__, RunRollupBucket.__tablename__} <= set(
+            inspect(self.engine).get_table_names()
+        )
         Base.metadata.create_all(self.engine)
+        self._ensure_indexes()
         self.Session = sessionmaker(self.engine, expire_on_commit=False)
+        if rollups_missing:
+            self.rebuild_rollups()
+        self.fts_enabled = self._ensure_search_index()
+        # Payloads/results/artifact data at or above this many JSON bytes go to
+        # the content-addressed blob store (None = keep everything inline).
+        self.blob_threshold = blob_threshold if blob_threshold is not None else blob_threshold_from_env()
+        self.blobs = blob_store_for(self.engine, blob_dir)
+        # Wakes wait_for_changes() callers when this process commits a change.
+        self._changed = threading.Condition()
+
+    def _ensure_indexes(self) -> None:
+        """create_all() skips indexes on tables that already exist; add them."""
+        for table in Base.metadata.sorted_tables:
+            for idx in table.indexes:
+                idx.create(self.engine, checkfirst=True)
 
     @contextlib.contextmanager
     def workflow_run(
@@ -89,37 +301,119 @@ class RunStore:
         recipe_id: Optional[int],
         trigger: str = "manual",
         meta: Optional[Dict[str, Any]] = None,
+        buffered: bool = False,
+        flush_size: int = 100,
+        flush_interval_s: float = 1.0,
+        deferred: bool = False,
     ):
         start = time.perf_counter()
-        with self.Session() as s:
-            run = WorkflowRun(
-                workflow_id=workflow_id,
-                name=name,
-                agent_id=agent_id,
-                recipe_id=recipe_id,
-                trigger=trigger,
-                status="running",
-                meta=meta or {},
-            )
-            s.add(run); s.commit(); s.refresh(run)
-            run_id = run.id
+        header = dict(
+            workflow_id=workflow_id,
+            name=name,
+            agent_id=agent_id,
+            recipe_id=recipe_id,
+            trigger=trigger,
+            status="running",
+            started_at=datetime.now(UTC),
+            meta=meta or {},
+        )
+        if deferred:
+            # The run row itself waits for the first flush (see RunJournal).
+            rec: Recorder = RunJournal(self, header, flush_size=flush_size, flush_interval_s=flush_interval_s)
+        else:
+            with self.Session() as s:
+                run = WorkflowRun(**header)
+                s.add(run); s.flush()
+                run_id = run.id
+                s.add(RunChange(run_id=run_id, kind="run"))
+                self._index_text(s, [("name", run_id, run_id, name)])
+                s.commit()
+            self._notify_changed()
+            if buffered:
+                rec = BufferedRecorder(
+                    self, run_id, flush_size=flush_size, flush_interval_s=flush_interval_s
+                )
+            else:
+                rec = Recorder(self, run_id)
 
         status, error = "success", None
+        in_flight = False
         try:
-            yield Recorder(self, run_id)
+            yield rec
         except Exception as e:
-            status, error = "failed", f"{type(e).__name__}: {e}"
+            status, error, in_flight = "failed", f"{type(e).__name__}: {e}", True
             raise
         finally:
-            dur_ms = (time.perf_counter() - start) * 1000.0
-            with self.Session() as s:
+            if isinstance(rec, RunJournal):
+                # Remaining rows and the final status go out in one transaction.
+                try:
+                    rec.finish(status, error, (time.perf_counter() - start) * 1000.0)
+                except Exception:
+                    if not in_flight:
+                        raise
+            else:
+                # Queued rows are written even when the body raised.
+                flush_error: Optional[Exception] = None
+                try:
+                    rec.flush()
+                except Exception as e:
+                    flush_error = e
+                    if status == "success":
+                        status, error = "failed", f"{type(e).__name__}: {e}"
+                dur_ms = (time.perf_counter() - start) * 1000.0
+                with self.Session() as s:
+                    r = s.get(WorkflowRun, rec.run_id)
+                    if r:
+                        self._finish_run(s, r, status, error, dur_ms)
+                        s.commit()
+                self._notify_changed()
+                if flush_error is not None and not in_flight:
+                    raise flush_error
+
+    def _finish_run(self, s, r: WorkflowRun, status: str, error: Optional[str], dur_ms: float) -> None:
+        r.status = status
+        r.error = error
+        r.finished_at = datetime.now(UTC)
+        r.duration_ms = dur_ms
+        self._rollup(s, [r])
+        s.add(RunChange(run_id=r.id, kind="run"))
+        if error:
+            self._index_text(s, [("error", r.id, r.id, error)])
+
+    def write_run(
+        self,
+        run_id: Optional[int],
+        header: Dict[str, Any],
+        *,
+        steps: Optional[List[Dict[str, Any]]] = None,
+        artifacts: Optional[List[Dict[str, Any]]] = None,
+        spans: Optional[List[Dict[str, Any]]] = None,
+        finish: Optional[tuple] = None,
+    ) -> int:
+        """
+        One transaction for a journaled run: insert the run row from
+        ``header`` if ``run_id`` is None, add the rows (their ``run_id`` is
+        filled in), and apply ``finish=(status, error, duration_ms)``.
+        Returns the run id.
+        """
+        with self.Session() as s:
+            if run_id is None:
+                run = WorkflowRun(**header)
+                s.add(run); s.flush()
+                run_id = run.id
+                self._index_text(s, [("name", run_id, run_id, header.get("name"))])
+                if finish is None:
+                    s.add(RunChange(run_id=run_id, kind="run"))
+            for rows in (steps, artifacts, spans):
+                for r in rows or ():
+                    r["run_id"] = run_id
+            self._insert_rows(s, steps, artifacts, spans)
+            if finish is not None:
                 r = s.get(WorkflowRun, run_id)
-                if r:
-                    r.status = status
-                    r.error = error
-                    r.finished_at = datetime.now(UTC)
-                    r.duration_ms = dur_ms
-                    s.commit()
+                self._finish_run(s, r, *finish)
+            s.commit()
+        self._notify_changed()
+        return run_id
 
     # ---- Logging helpers ----------------------------------------------------
     def log_step(
@@ -135,11 +429,15 @@ class RunStore:
     ) -> int:
         with self.Session() as s:
             ev = StepEvent(
-                run_id=run_id, phase=phase, level=level, status=status,
-                message=message, payload=payload, result=result
+                run_id=run_id, phase=phase, level=level, status=status, message=message,
+                payload=self._offload(payload), result=self._offload(result),
             )
-            s.add(ev); s.commit(); s.refresh(ev)
-            return ev.id
+            s.add(ev); s.flush()
+            s.add(RunChange(run_id=run_id, kind="steps", first_id=ev.id, last_id=ev.id))
+            self._index_text(s, [("step", run_id, ev.id, message)])
+            s.commit()
+        self._notify_changed()
+        return ev.id
 
     def log_artifact(
         self,
@@ -154,12 +452,607 @@ class RunStore:
         with self.Session() as s:
             a = Artifact(
                 run_id=run_id, kind=kind, title=title,
-                external_id=external_id, url=url, data=data or {}
+                external_id=external_id, url=url, data=self._offload(data or {})
+            )
+            s.add(a); s.flush()
+            s.add(RunChange(run_id=run_id, kind="artifacts", first_id=a.id, last_id=a.id))
+            self._index_text(s, [("artifact", run_id, a.id, _artifact_text(title, external_id))])
+            s.commit()
+        self._notify_changed()
+        return a.id
+
+    def log_many(
+        self,
+        *,
+        steps: Optional[List[Dict[str, Any]]] = None,
+        artifacts: Optional[List[Dict[str, Any]]] = None,
+        spans: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        """Bulk-insert step/artifact/span rows (column dicts) in one transaction."""
+        if not steps and not artifacts and not spans:
+            return
+        with self.Session() as s:
+            self._insert_rows(s, steps, artifacts, spans)
+            s.commit()
+        self._notify_changed()
+
+    def _insert_rows(self, s, steps, artifacts, spans) -> None:
+        """Insert row dicts plus their change-feed and search rows (caller commits)."""
+        if self.blob_threshold:
+            # Blobs join this transaction: it may already hold the write lock.
+            conn = s.connection()
+            steps = [
+                {
+                    **r,
+                    "payload": self._offload(r.get("payload"), conn),
+                    "result": self._offload(r.get("result"), conn),
+                }
+                for r in steps or []
+            ]
+            artifacts = [{**r, "data": self._offload(r.get("data"), conn)} for r in artifacts or []]
+        for model, kind, rows in ((StepEvent, "steps", steps), (Artifact, "artifacts", artifacts)):
+            if not rows:
+                continue
+            ids = s.scalars(
+                insert(model).returning(model.id, sort_by_parameter_order=True), rows
+            ).all()
+            # One change row per run per batch, covering its id range.
+            by_run: Dict[int, List[int]] = {}
+            for row, new_id in zip(rows, ids):
+                by_run.setdefault(row["run_id"], []).append(new_id)
+            s.add_all(
+                RunChange(run_id=rid, kind=kind, first_id=min(v), last_id=max(v))
+                for rid, v in by_run.items()
             )
-            s.add(a); s.commit(); s.refresh(a)
-            return a.id
+            if kind == "steps":
+                docs = [("step", r["run_id"], i, r.get("message")) for r, i in zip(rows, ids)]
+            else:
+                docs = [
+                    ("artifact", r["run_id"], i, _artifact_text(r.get("title"), r.get("external_id")))
+                    for r, i in zip(rows, ids)
+                ]
+            self._index_text(s, docs)
+        if spans:
+            s.execute(insert(RunSpan), spans)
+
+    # ---- Checkpoints ----------------------------------------------------------
+    def save_checkpoint(
+        self,
+        run_id: int,
+        step_id: str,
+        *,
+        seq: int,
+        status: str,
+        idempotency_key: Optional[str] = None,
+        saved: Optional[Dict[str, Any]] = None,
+        result: Any = None,
+        error: Optional[str] = None,
+        attempt_run_id: Optional[int] = None,
+    ) -> None:
+        """Upsert one step's checkpoint (large `saved`/`result` go to the blob store)."""
+        values = dict(
+            run_id=run_id, step_id=step_id, seq=seq, status=status, idempotency_key=idempotency_key,
+            saved=self._offload(saved) if self.blob_threshold else saved,
+            result=self._offload(result) if self.blob_threshold else result,
+            error=error[:2000] if error else None, attempt_run_id=attempt_run_id,
+            updated_at=datetime.now(UTC),
+        )
+        stmt = sqlite_insert(RunCheckpoint).values(**values)
+        with self.Session() as s:
+            s.execute(stmt.on_conflict_do_update(
+                index_elements=["run_id", "step_id"],
+                set_={k: stmt.excluded[k] for k in values if k not in ("run_id", "step_id")},
+            ))
+            s.commit()
+
+    def checkpoints(self, run_id: int) -> List[Dict[str, Any]]:
+        """Checkpoints of a resumable run, in recipe order."""
+        with self.Session() as s:
+            rows = s.execute(
+                select(RunCheckpoint).where(RunCheckpoint.run_id == run_id).order_by(RunCheckpoint.seq)
+            ).scalars().all()
+            return [
+                {
+                    "run_id": r.run_id, "step_id": r.step_id, "seq": r.seq, "status": r.status,
+                    "idempotency_key": r.idempotency_key,
+                    "saved": self._lazy(r.saved, True), "result": self._lazy(r.result, True),
+                    "error": r.error, "attempt_run_id": r.attempt_run_id,
+                    "updated_at": _aware(r.updated_at).isoformat(),
+                }
+                for r in rows
+            ]
+
+    # ---- Step result cache -----------------------------------------------------
+    def get_step_result(self, key: str) -> Optional[tuple]:
+        """`(value, seconds left)` for an unexpired cached step result, else None."""
+        with self.Session() as s:
+            row = s.get(StepResult, key)
+            if row is None:
+                return None
+            left = (_aware(row.expires_at) - datetime.now(UTC)).total_seconds()
+            if left <= 0:
+                return None
+            value = row.value
+        return self._lazy(value, True), left
+
+    def put_step_result(
+        self, key: str, value: Any, *, ttl_s: float, tool: Optional[str] = None, action: Optional[str] = None
+    ) -> None:
+        now = datetime.now(UTC)
+        values = dict(
+            key=key, tool=tool, action=action,
+            value=self._offload(value) if self.blob_threshold else value,
+            created_at=now, expires_at=now + timedelta(seconds=ttl_s),
+        )
+        stmt = sqlite_insert(StepResult).values(**values)
+        with self.Session() as s:
+            s.execute(stmt.on_conflict_do_update(
+                index_elements=["key"], set_={k: stmt.excluded[k] for k in values if k != "key"},
+            ))
+            s.commit()
+
+    def prune_step_results(self, *, now: Optional[datetime] = None) -> int:
+        """Delete expired step results; return rows deleted."""
+        with self.Session() as s:
+            n = s.execute(delete(StepResult).where(StepResult.expires_at <= (now or datetime.now(UTC)))).rowcount
+            s.commit()
+            return n or 0
+
+    # ---- Full-text search ----------------------------------------------------
+    def _ensure_search_index(self) -> bool:
+        """
+        Create the FTS5 table if missing, backfilling existing rows once;
+        False if this SQLite build has no FTS5.
+        """
+        exists_sql = text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='run_search'")
+        with self.engine.connect() as conn:
+            if conn.execute(exists_sql).first():
+                return True
+        with self.engine.connect() as conn:
+            # Serialize check-and-create across connections and processes, so
+            # exactly one of them creates (and backfills) the table.
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                if not conn.execute(exists_sql).first():
+                    conn.execute(text(_SEARCH_DDL))
+                    for sql in _SEARCH_BACKFILL:
+                        conn.execute(text(sql))
+                conn.commit()
+            except OperationalError as e:
+                conn.rollback()
+                if "no such module" in str(e).lower():
+                    return False
+                raise
+        return True
+
+    def _index_text(self, s, docs: Sequence[tuple]) -> None:
+        """Add (kind, run_id, ref_id, body) documents in the caller's transaction."""
+        rows = [
+            {"kind": k, "run_id": rid, "ref_id": ref, "body": body}
+            for k, rid, ref, body in docs if body
+        ]
+        if self.fts_enabled and rows:
+            s.execute(text(
+                "INSERT INTO run_search (body, kind, run_id, ref_id) VALUES (:body, :kind, :run_id, :ref_id)"
+            ), rows)
+
+    def rebuild_search_index(self) -> int:
+        """Re-index run names/errors, step messages and artifacts; return documents indexed."""
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM run_search"))
+            for sql in _SEARCH_BACKFILL:
+                conn.execute(text(sql))
+            return conn.execute(text("SELECT COUNT(*) FROM run_search")).scalar() or 0
+
+    def search(
+        self,
+        query: str,
+        *,
+        since: Optional[datetime] = None,
+        status: Optional[List[str]] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Runs whose name, error, step messages or artifact titles/ids match
+        `query`, best first (bm25), as `{"hits", "total"}`. Each hit has the
+        run row, `score` (lower is better), `matches` (count) and up to three
+        `snippets` with the matched terms in [brackets].
+
+        Terms are matched as phrases, so `HDMI_RX_1` and `401` need no
+        escaping; `OR`/`AND`/`NOT` combine terms (default AND) and a trailing
+        `*` does a prefix match. Without FTS5 this falls back to LIKE.
+        """
+        match = _fts_query(query)
+        if not match:
+            return {"hits": [], "total": 0}
+        if not self.fts_enabled:
+            return self._search_like(query, since=since, status=status, limit=limit, offset=offset)
+        where, params = ["1=1"], {"q": match}
+        if since is not None:
+            where.append("r.started_at >= :since")
+            params["since"] = since
+        if status:
+            where.append("r.status IN :status")
+            params["status"] = list(status)
+        grouped = (
+            "FROM (SELECT run_id, rank AS score FROM run_search WHERE run_search MATCH :q) f "
+            f"JOIN workflow_runs r ON r.id = f.run_id WHERE {' AND '.join(where)}"
+        )
+        binds = [bindparam("since", type_=DateTime(timezone=True))] if since is not None else []
+        if status:
+            binds.append(bindparam("status", expanding=True))
+        with self.Session() as s:
+            total = s.execute(
+                text(f"SELECT COUNT(DISTINCT f.run_id) {grouped}").bindparams(*binds), params
+            ).scalar() or 0
+            ranked = s.execute(
+                text(
+                    f"SELECT f.run_id, MIN(f.score) AS score, COUNT(*) AS matches {grouped} "
+                    "GROUP BY f.run_id ORDER BY score, f.run_id DESC LIMIT :limit OFFSET :offset"
+                ).bindparams(*binds),
+                {**params, "limit": max(1, int(limit)), "offset": max(0, int(offset))},
+            ).all()
+            if not ranked:
+                return {"hits": [], "total": total}
+            run_ids = [row.run_id for row in ranked]
+            runs = {
+                r.id: self._run_to_dict(r)
+                for r in s.execute(select(WorkflowRun).where(WorkflowRun.id.in_(run_ids))).scalars()
+            }
+            snippets: Dict[int, List[Dict[str, Any]]] = {}
+            for row in s.execute(
+                text(
+                    "SELECT run_id, kind, ref_id, snippet(run_search, 0, '[', ']', '…', 12) AS snippet "
+                    "FROM run_search WHERE run_search MATCH :q AND run_id IN :ids ORDER BY rank"
+                ).bindparams(bindparam("ids", expanding=True)),
+                {"q": match, "ids": run_ids},
+            ):
+                found = snippets.setdefault(row.run_id, [])
+                if len(found) < 3:
+                    found.append({"kind": row.kind, "ref_id": row.ref_id, "snippet": row.snippet})
+        return {
+            "hits": [
+                {
+                    "run": runs[row.run_id], "score": float(row.score), "matches": row.matches,
+                    "snippets": snippets.get(row.run_id, []),
+                }
+                for row in ranked if row.run_id in runs
+            ],
+            "total": total,
+        }
+
+    def _search_like(self, query, *, since, status, limit, offset) -> Dict[str, Any]:
+        """Substring fallback (any term) when SQLite lacks FTS5; unranked, newest first."""
+        terms = [t.strip('"*') for t in query.split() if t not in _FTS_OPERATORS]
+        pats = [f"%{t}%" for t in terms if t]
+        step_runs = select(StepEvent.run_id).where(or_(*[StepEvent.message.like(p) for p in pats]))
+        art_runs = select(Artifact.run_id).where(
+            or_(*[Artifact.title.like(p) for p in pats], *[Artifact.external_id.like(p) for p in pats])
+        )
+        cond = [or_(
+            *[WorkflowRun.name.like(p) for p in pats],
+            *[WorkflowRun.error.like(p) for p in pats],
+            WorkflowRun.id.in_(step_runs),
+            WorkflowRun.id.in_(art_runs),
+        )]
+        if since is not None:
+            cond.append(WorkflowRun.started_at >= since)
+        if status:
+            cond.append(WorkflowRun.status.in_(list(status)))
+        with self.Session() as s:
+            total = s.execute(select(func.count(WorkflowRun.id)).where(*cond)).scalar() or 0
+            rows = s.execute(
+                select(WorkflowRun).where(*cond).order_by(WorkflowRun.id.desc())
+                .offset(max(0, int(offset))).limit(max(1, int(limit)))
+            ).scalars().all()
+            hits = [
+                {"run": self._run_to_dict(r), "score": 0.0, "matches": None, "snippets": []}
+                for r in rows
+            ]
+        return {"hits": hits, "total": total}
+
+    # ---- Change feed ---------------------------------------------------------
+    def _notify_changed(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    def change_cursor(self) -> int:
+        """Current head of the change feed (start tailing from here)."""
+        with self.Session() as s:
+            return s.execute(select(func.max(RunChange.seq))).scalar() or 0
+
+    def changes_since(self, cursor: Optional[int] = 0, *, limit: int = 500) -> Dict[str, Any]:
+        """
+        Runs and steps inserted or updated after `cursor`, as
+        `{"cursor", "runs", "steps", "more", "reset"}`.
+
+        `runs` holds the current row of every run touched by the changes
+        (started, finished, or given new steps/artifacts); `steps` holds the new
+        step rows without payloads (see `step_payload()`). Pass the returned
+        `cursor` back in to continue. At most `limit` feed entries are consumed
+        per call (`more` is True if some remain). `reset` is True when the
+        cursor is no longer covered by the feed (pruned or a different
+        database); callers should reload from scratch.
+        """
+        cursor = int(cursor or 0)
+        limit = max(1, int(limit))
+        with self.Session() as s:
+            lo, hi = s.execute(select(func.min(RunChange.seq), func.max(RunChange.seq))).one()
+            hi = hi or 0
+            reset = cursor > hi or (lo is not None and cursor and cursor < lo - 1)
+            if reset:
+                cursor = (lo or 1) - 1
+            changes = s.execute(
+                select(RunChange).where(RunChange.seq > cursor).order_by(RunChange.seq).limit(limit + 1)
+            ).scalars().all()
+            more = len(changes) > limit
+            changes = changes[:limit]
+            if not changes:
+                return {"cursor": cursor, "runs": [], "steps": [], "more": False, "reset": bool(reset)}
+
+            run_ids = sorted({c.run_id for c in changes})
+            runs = s.execute(
+                select(WorkflowRun).where(WorkflowRun.id.in_(run_ids)).order_by(WorkflowRun.id.desc())
+            ).scalars().all()
+            step_ranges = [
+                StepEvent.id.between(c.first_id, c.last_id)
+                for c in changes if c.kind == "steps" and c.first_id is not None
+            ]
+            steps = []
+            if step_ranges:
+                cols = [getattr(StepEvent, f) for f in ("id", *STEP_LIST_FIELDS)]
+                steps = s.execute(
+                    select(*cols).where(or_(*step_ranges)).order_by(StepEvent.id)
+                ).all()
+            return {
+                "cursor": changes[-1].seq,
+                "runs": [self._run_to_dict(r) for r in runs],
+                "steps": [
+                    {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in r._mapping.items()}
+                    for r in steps
+                ],
+                "more": more,
+                "reset": bool(reset),
+            }
+
+    def wait_for_changes(
+        self,
+        cursor: Optional[int] = 0,
+        *,
+        timeout: float = 25.0,
+        poll_interval: float = 1.0,
+        limit: int = 500,
+    ) -> Dict[str, Any]:
+        """
+        Long-poll: return `changes_since(cursor)` as soon as it is non-empty,
+        or the empty result after `timeout` seconds. Writes from this process
+        wake waiters immediately; writes from other processes are picked up
+        every `poll_interval` seconds.
+        """
+        deadline = time.monotonic() + max(0.0, float(timeout))
+        while True:
+            feed = self.changes_since(cursor, limit=limit)
+            remaining = deadline - time.monotonic()
+            if feed["runs"] or feed["reset"] or remaining <= 0:
+                return feed
+            with self._changed:
+                self._changed.wait(min(poll_interval, remaining))
+
+    def prune_changes(self, *, keep: int = 100_000) -> int:
+        """Drop all but the newest `keep` feed entries; return rows deleted."""
+        with self.Session() as s:
+            hi = s.execute(select(func.max(RunChange.seq))).scalar() or 0
+            n = s.execute(delete(RunChange).where(RunChange.seq <= hi - max(0, int(keep)))).rowcount
+            s.commit()
+            return n or 0
+
+    # ---- Blobs ---------------------------------------------------------------
+    def _offload(self, value: Any, conn=None) -> Any:
+        return self.blobs.offload(value, self.blob_threshold, conn)
+
+    def load_blob(self, value: Any) -> Any:
+        """Resolve a blob reference / LazyBlob to its payload (other values pass through)."""
+        return resolve(value, self.blobs)
+
+    def _lazy(self, value: Any, resolve_blobs: bool) -> Any:
+        if not is_blob_ref(value):
+            return value
+        return self.blobs.load(value) if resolve_blobs else LazyBlob(self.blobs, value)
+
+    # ---- Rollups -------------------------------------------------------------
+    @staticmethod
+    def _rollup(s, runs) -> None:
+        """Upsert rollup counters/histogram buckets for finished runs."""
+        counters: Dict[tuple, List[float]] = {}
+        hist: Dict[tuple, int] = {}
+        for r in runs:
+            ok = r.status == "success"
+            dur = float(r.duration_ms or 0.0)
+            for grain in ROLLUP_GRAINS:
+                key = (grain, _floor(r.started_at, grain), r.workflow_id, r.recipe_id or 0)
+                c = counters.setdefault(key, [0, 0, 0, 0.0, 0])
+                c[0] += 1
+                c[1 if ok else 2] += 1
+                if dur > 0:
+                    c[3] += dur
+                    c[4] += 1
+                    hk = key + (bucket_index(dur),)
+                    hist[hk] = hist.get(hk, 0) + 1
+        keys = ("grain", "bucket_start", "workflow_id", "recipe_id")
+        for key, (n, succ, fail, dsum, dcnt) in counters.items():
+            stmt = sqlite_insert(RunRollup).values(
+                **dict(zip(keys, key)), runs=n, successes=succ, failures=fail,
+                duration_sum_ms=dsum, duration_count=dcnt,
+            )
+            s.execute(stmt.on_conflict_do_update(
+                index_elements=list(keys),
+                set_={
+                    "runs": RunRollup.runs + stmt.excluded.runs,
+                    "successes": RunRollup.successes + stmt.excluded.successes,
+                    "failures": RunRollup.failures + stmt.excluded.failures,
+                    "duration_sum_ms": RunRollup.duration_sum_ms + stmt.excluded.duration_sum_ms,
+                    "duration_count": RunRollup.duration_count + stmt.excluded.duration_count,
+                },
+            ))
+        for key, n in hist.items():
+            stmt = sqlite_insert(RunRollupBucket).values(**dict(zip(keys + ("bucket",), key)), count=n)
+            s.execute(stmt.on_conflict_do_update(
+                index_elements=list(keys + ("bucket",)),
+                set_={"count": RunRollupBucket.count + stmt.excluded.count},
+            ))
+
+    def rebuild_rollups(self, *, batch_size: int = 5000) -> int:
+        """
+        Recompute all rollups from workflow_runs in one transaction; run
+        automatically when the rollup tables are created on an older DB.
+        """
+        n = 0
+        with self.Session() as s:
+            s.query(RunRollupBucket).delete()
+            s.query(RunRollup).delete()
+            q = select(WorkflowRun).where(WorkflowRun.status != "running").order_by(WorkflowRun.id)
+            batch: List[WorkflowRun] = []
+            for r in s.execute(q.execution_options(yield_per=batch_size)).scalars():
+                batch.append(r)
+                if len(batch) >= batch_size:
+                    self._rollup(s, batch)
+                    n += len(batch)
+                    batch = []
+            self._rollup(s, batch)
+            n += len(batch)
+            s.commit()
+        return n
+
+    def run_series(
+        self,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        grain: str = "hour",
+        workflow_id: Optional[str] = None,
+        recipe_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Ready-to-plot run counts per hour/day over [since, until], zero-filled.
+        `since=None` starts at the oldest rollup. Reads rollup rows only, so cost
+        depends on the number of buckets in the window, not on the number of runs.
+        """
+        if grain not in ROLLUP_GRAINS:
+            raise ValueError(f"grain must be one of {ROLLUP_GRAINS}")
+        if since is None:
+            with self.Session() as s:
+                since = s.execute(
+                    select(func.min(RunRollup.bucket_start)).where(RunRollup.grain == grain)
+                ).scalar()
+            if since is None:
+                return []
+        start = _floor(since, grain)
+        end = _floor(until or datetime.now(UTC), grain)
+        where = [RunRollup.grain == grain, RunRollup.bucket_start >= start, RunRollup.bucket_start <= end]
+        hwhere = [
+            RunRollupBucket.grain == grain,
+            RunRollupBucket.bucket_start >= start,
+            RunRollupBucket.bucket_start <= end,
+        ]
+        if workflow_id is not None:
+            where.append(RunRollup.workflow_id == str(workflow_id))
+            hwhere.append(RunRollupBucket.workflow_id == str(workflow_id))
+        if recipe_id is not None:
+            where.append(RunRollup.recipe_id == int(recipe_id))
+            hwhere.append(RunRollupBucket.recipe_id == int(recipe_id))
+        with self.Session() as s:
+            rows = s.execute(
+                select(
+                    RunRollup.bucket_start,
+                    func.sum(RunRollup.runs),
+                    func.sum(RunRollup.successes),
+                    func.sum(RunRollup.failures),
+                    func.sum(RunRollup.duration_sum_ms),
+                    func.sum(RunRollup.duration_count),
+                ).where(*where).group_by(RunRollup.bucket_start)
+            ).all()
+            hrows = s.execute(
+                select(RunRollupBucket.bucket_start, RunRollupBucket.bucket, func.sum(RunRollupBucket.count))
+                .where(*hwhere)
+                .group_by(RunRollupBucket.bucket_start, RunRollupBucket.bucket)
+            ).all()
+
+        hists: Dict[datetime, Dict[int, int]] = {}
+        for ts, b, c in hrows:
+            hists.setdefault(_floor(ts, grain), {})[int(b)] = int(c)
+        by_ts = {_floor(r[0], grain): r[1:] for r in rows}
+
+        out: List[Dict[str, Any]] = []
+        step, t = _grain_step(grain), start
+        while t <= end:
+            n, succ, fail, dsum, dcnt = by_ts.get(t, (0, 0, 0, 0.0, 0))
+            out.append({
+                "bucket_start": t,
+                "runs": int(n or 0),
+                "successes": int(succ or 0),
+                "failures": int(fail or 0),
+                "avg_ms": (float(dsum) / dcnt) if dcnt else 0.0,
+                "p95_ms": quantile_from_buckets(hists.get(t, {}), 0.95),
+            })
+            t += step
+        return out
 
     # ---- Queries ------------------------------------------------------------
+    def latency_sketches(
+        self,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        by: Optional[str] = None,
+        workflow_id: Optional[str] = None,
+        recipe_id: Optional[int] = None,
+    ) -> Dict[Any, LatencySketch]:
+        """
+        Merged duration sketches from the hourly rollups, keyed by `by`
+        ("recipe_id", "workflow_id") or under `None` for one overall sketch.
+        Reads at most one row per (group, bucket) after a SQL GROUP BY, so the
+        cost does not depend on how many runs fall in the window.
+        """
+        if by not in (None, "recipe_id", "workflow_id"):
+            raise ValueError("by must be None, 'recipe_id' or 'workflow_id'")
+        where = [RunRollupBucket.grain == "hour"]
+        if since is not None:
+            where.append(RunRollupBucket.bucket_start >= _floor(since, "hour"))
+        if until is not None:
+            where.append(RunRollupBucket.bucket_start <= _floor(until, "hour"))
+        if workflow_id is not None:
+            where.append(RunRollupBucket.workflow_id == str(workflow_id))
+        if recipe_id is not None:
+            where.append(RunRollupBucket.recipe_id == int(recipe_id))
+        group = [RunRollupBucket.bucket] if by is None else [getattr(RunRollupBucket, by), RunRollupBucket.bucket]
+        with self.Session() as s:
+            rows = s.execute(
+                select(*group, func.sum(RunRollupBucket.count)).where(*where).group_by(*group)
+            ).all()
+        out: Dict[Any, LatencySketch] = {}
+        for row in rows:
+            key = None if by is None else row[0]
+            if by == "recipe_id" and key == 0:
+                key = None  # rollups store "no recipe" as 0
+            out.setdefault(key, LatencySketch()).counts[int(row[-2])] = int(row[-1] or 0)
+        return out
+
+    def latency_percentiles(
+        self,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        workflow_id: Optional[str] = None,
+        recipe_id: Optional[int] = None,
+        qs: Sequence[float] = (0.5, 0.95, 0.99),
+    ) -> Dict[str, Any]:
+        """`{"runs", "p50_ms", "p95_ms", "p99_ms"}` over the window, from rollup sketches."""
+        sketch = self.latency_sketches(
+            since=since, until=until, workflow_id=workflow_id, recipe_id=recipe_id
+        ).get(None, LatencySketch())
+        return {"runs": sketch.count, **sketch.percentiles(qs)}
+
     def latest_runs(
         self,
         *,
@@ -176,7 +1069,75 @@ class RunStore:
             rows = s.execute(q.order_by(WorkflowRun.id.desc()).limit(limit)).scalars().all()
             return [self._run_to_dict(r) for r in rows]
 
-    def run_details(self, run_id: int) -> Dict[str, Any]:
+    def page_runs(
+        self,
+        *,
+        cursor: Optional[str] = None,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        page_size: int = 25,
+        status: Optional[List[str]] = None,
+        since: Optional[datetime] = None,
+        workflow_id: Optional[str] = None,
+        recipe_id: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Keyset-paginated run listing, newest first. Pass the returned
+        `next_cursor` (older runs) or `prev_cursor` (newer runs) back as
+        `cursor`; `before_id`/`after_id` are the raw equivalents. Each page is
+        one indexed range scan, so its cost does not depend on its position.
+        """
+        if cursor:
+            before_id, after_id = _decode_cursor(cursor)
+        page_size = max(1, int(page_size))
+        q = _filter_runs(
+            select(WorkflowRun), status=status, since=since, workflow_id=workflow_id, recipe_id=recipe_id
+        )
+        newer = after_id is not None and before_id is None
+        if newer:
+            q = q.where(WorkflowRun.id > int(after_id)).order_by(WorkflowRun.id.asc())
+        else:
+            if before_id is not None:
+                q = q.where(WorkflowRun.id < int(before_id))
+            q = q.order_by(WorkflowRun.id.desc())
+        with self.Session() as s:
+            rows = s.execute(q.limit(page_size + 1)).scalars().all()
+            more = len(rows) > page_size
+            rows = rows[:page_size]
+            if newer:
+                rows.reverse()
+            runs = [self._run_to_dict(r) for r in rows]
+        if not runs:
+            return {"runs": [], "next_cursor": None, "prev_cursor": None}
+        has_older = more if not newer else True
+        has_newer = more if newer else before_id is not None
+        return {
+            "runs": runs,
+            "next_cursor": _encode_cursor(before=runs[-1]["id"]) if has_older else None,
+            "prev_cursor": _encode_cursor(after=runs[0]["id"]) if has_newer else None,
+        }
+
+    def count_runs(
+        self,
+        *,
+        status: Optional[List[str]] = None,
+        since: Optional[datetime] = None,
+        workflow_id: Optional[str] = None,
+        recipe_id: Optional[int] = None,
+    ) -> int:
+        """Number of runs `page_runs()` pages through with the same filters."""
+        q = _filter_runs(
+            select(func.count(WorkflowRun.id)), status=status, since=since,
+            workflow_id=workflow_id, recipe_id=recipe_id,
+        )
+        with self.Session() as s:
+            return s.execute(q).scalar() or 0
+
+    def run_details(self, run_id: int, *, resolve_blobs: bool = True) -> Dict[str, Any]:
+        """
+        Full run with steps and artifacts. Offloaded payloads are loaded inline,
+        or returned as `LazyBlob`s (load on `.value`) when `resolve_blobs=False`.
+        """
         with self.Session() as s:
             r = s.get(WorkflowRun, run_id)
             if not r:
@@ -190,45 +1151,226 @@ class RunStore:
             d = self._run_to_dict(r)
             d["steps"] = [self._step_to_dict(x) for x in steps]
             d["artifacts"] = [self._artifact_to_dict(x) for x in arts]
+        for sd in d["steps"]:
+            sd["payload"] = self._lazy(sd["payload"], resolve_blobs)
+            sd["result"] = self._lazy(sd["result"], resolve_blobs)
+        for ad in d["artifacts"]:
+            ad["data"] = self._lazy(ad["data"], resolve_blobs)
+        return d
+
+    # ---- Paged run details ---------------------------------------------------
+    def update_run_meta(self, run_id: int, values: Dict[str, Any]) -> None:
+        """Merge `values` into a run's `meta`."""
+        with self.Session() as s:
+            r = s.get(WorkflowRun, run_id)
+            if r:
+                r.meta = {**(r.meta or {}), **values}
+                s.commit()
+
+    def run_header(self, run_id: int) -> Dict[str, Any]:
+        """Run row plus step/artifact counts, without loading any steps."""
+        with self.Session() as s:
+            r = s.get(WorkflowRun, run_id)
+            if not r:
+                return {}
+            d = self._run_to_dict(r)
+            d["step_count"] = s.execute(
+                select(func.count(StepEvent.id)).where(StepEvent.run_id == run_id)
+            ).scalar() or 0
+            d["artifact_count"] = s.execute(
+                select(func.count(Artifact.id)).where(Artifact.run_id == run_id)
+            ).scalar() or 0
             return d
 
+    def steps(
+        self,
+        run_id: int,
+        *,
+        after_id: Optional[int] = None,
+        offset: int = 0,
+        limit: int = 50,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        One page of a run's steps in id order. Only `fields` are selected
+        (default: everything but payload/result; see `step_payload()`).
+        Page with `after_id=next_cursor` (keyset) or `offset`.
+        """
+        return self._page_rows(StepEvent, run_id, fields or STEP_LIST_FIELDS, after_id, offset, limit)
+
+    def artifacts(
+        self,
+        run_id: int,
+        *,
+        after_id: Optional[int] = None,
+        offset: int = 0,
+        limit: int = 50,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """Like `steps()` for artifacts; `data` is excluded by default (`artifact_data()`)."""
+        return self._page_rows(Artifact, run_id, fields or ARTIFACT_LIST_FIELDS, after_id, offset, limit)
+
+    def step_payload(self, step_id: int) -> Dict[str, Any]:
+        """Payload and result of one step, with blob references resolved."""
+        with self.Session() as s:
+            row = s.execute(
+                select(StepEvent.payload, StepEvent.result).where(StepEvent.id == step_id)
+            ).first()
+        if row is None:
+            return {}
+        return {"payload": self.load_blob(row.payload), "result": self.load_blob(row.result)}
+
+    def artifact_data(self, artifact_id: int) -> Any:
+        with self.Session() as s:
+            data = s.execute(select(Artifact.data).where(Artifact.id == artifact_id)).scalar()
+        return self.load_blob(data)
+
+    def _page_rows(self, model, run_id, fields, after_id, offset, limit) -> Dict[str, Any]:
+        cols = [getattr(model, f) for f in dict.fromkeys(("id", *fields))]
+        q = select(*cols).where(model.run_id == run_id)
+        if after_id is not None:
+            q = q.where(model.id > int(after_id))
+        elif offset:
+            q = q.offset(int(offset))
+        limit = max(1, int(limit))
+        with self.Session() as s:
+            rows = s.execute(q.order_by(model.id).limit(limit + 1)).all()
+        items = [
+            {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in r._mapping.items()}
+            for r in rows[:limit]
+        ]
+        for it in items:
+            for k in ("payload", "result", "data"):
+                if k in it:
+                    it[k] = self.load_blob(it[k])
+        return {"items": items, "next_cursor": items[-1]["id"] if len(rows) > limit else None}
+
+    # ---- Spans ---------------------------------------------------------------
+    def latency_breakdown(self, run_id: int) -> Dict[str, Any]:
+        """
+        Span tree of a run for a waterfall view. `spans` is depth-first in start
+        order with `depth`, `offset_ms` (from run start) and `self_ms` (duration
+        minus direct children); `by_name` totals time per span name, slowest
+        first.
+        """
+        with self.Session() as s:
+            run = s.get(WorkflowRun, run_id)
+            if not run:
+                return {}
+            rows = s.execute(
+                select(RunSpan).where(RunSpan.run_id == run_id).order_by(RunSpan.started_at)
+            ).scalars().all()
+        t0 = _aware(run.started_at)
+        ids = {r.id for r in rows}
+        children: Dict[Optional[str], List[RunSpan]] = {}
+        for r in rows:
+            children.setdefault(r.parent_id if r.parent_id in ids else None, []).append(r)
+
+        spans: List[Dict[str, Any]] = []
+
+        def walk(parent: Optional[str], depth: int) -> None:
+            for r in children.get(parent, []):
+                kids = children.get(r.id, [])
+                spans.append({
+                    "id": r.id, "parent_id": r.parent_id, "name": r.name, "depth": depth,
+                    "status": r.status, "attrs": r.attrs or {},
+                    "started_at": _aware(r.started_at).isoformat(),
+                    "offset_ms": (_aware(r.started_at) - t0).total_seconds() * 1000.0,
+                    "duration_ms": r.duration_ms,
+                    "self_ms": max(0.0, r.duration_ms - sum(k.duration_ms for k in kids)),
+                })
+                walk(r.id, depth + 1)
+
+        walk(None, 0)
+        by_name: Dict[str, Dict[str, Any]] = {}
+        for sp in spans:
+            agg = by_name.setdefault(
+                sp["name"], {"name": sp["name"], "count": 0, "total_ms": 0.0, "self_ms": 0.0, "max_ms": 0.0}
+            )
+            agg["count"] += 1
+            agg["total_ms"] += sp["duration_ms"]
+            agg["self_ms"] += sp["self_ms"]
+            agg["max_ms"] = max(agg["max_ms"], sp["duration_ms"])
+        return {
+            "run_id": run_id,
+            "duration_ms": run.duration_ms,
+            "spans": spans,
+            "by_name": sorted(by_name.values(), key=lambda a: a["self_ms"], reverse=True),
+        }
+
     def stats(self, *, since: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        KPI summary computed with SQL aggregates. p95 is estimated from a
+        bucketed duration histogram (see core.latency), so cost and memory
+        don't grow with the number of runs in the window.
+        """
+        window = [WorkflowRun.started_at >= since] if since else []
+        dur = WorkflowRun.duration_ms
         with self.Session() as s:
-            q = select(WorkflowRun)
-            if since:
-                q = q.filter(WorkflowRun.started_at >= since)
-            rows = s.execute(q).scalars().all()
-            n = len(rows)
-            succ = sum(1 for r in rows if r.status == "success")
-            durs = sorted([r.duration_ms or 0.0 for r in rows if r.duration_ms])
-            p95 = _quantile(durs, 0.95) if durs else 0.0
-            last_err = next((r.error for r in sorted(rows, key=lambda x: x.id, reverse=True) if r.error), "")
-            return {"runs": n, "success_rate": (succ / n) * 100.0 if n else 0.0, "p95_ms": p95, "last_error": last_err or ""}
+            n, succ, avg_ms = s.execute(
+                select(
+                    func.count(WorkflowRun.id),
+                    func.coalesce(func.sum(case((WorkflowRun.status == "success", 1), else_=0)), 0),
+                    func.avg(dur),
+                ).where(*window)
+            ).one()
+            p95 = self._duration_quantile(s, 0.95, *window)
+            last_err = s.execute(
+                select(WorkflowRun.error)
+                .where(*window, WorkflowRun.error.is_not(None), WorkflowRun.error != "")
+                .order_by(WorkflowRun.id.desc())
+                .limit(1)
+            ).scalar()
+            return {
+                "runs": n,
+                "success_rate": (succ / n) * 100.0 if n else 0.0,
+                "p95_ms": p95,
+                "avg_ms": float(avg_ms or 0.0),
+                "last_error": last_err or "",
+            }
 
     def recipe_metrics(self, recipe_id: int, *, limit: int = 200) -> Dict[str, Any]:
         """Return recent success metrics for a specific recipe."""
         with self.Session() as s:
-            rows = (
-                s.execute(
-                    select(WorkflowRun)
-                    .where(WorkflowRun.recipe_id == recipe_id)
-                    .order_by(WorkflowRun.id.desc())
-                    .limit(limit)
+            recent = (
+                select(WorkflowRun.status, WorkflowRun.duration_ms)
+                .where(WorkflowRun.recipe_id == recipe_id)
+                .order_by(WorkflowRun.id.desc())
+                .limit(limit)
+                .subquery()
+            )
+            total, success, avg_ms = s.execute(
+                select(
+                    func.count(),
+                    func.coalesce(func.sum(case((recent.c.status == "success", 1), else_=0)), 0),
+                    func.avg(func.coalesce(recent.c.duration_ms, 0.0)),
                 )
-                .scalars()
-                .all()
-            )
-            total = len(rows)
-            success = sum(1 for r in rows if r.status == "success")
-            last_status = rows[0].status if rows else "unknown"
-            avg_ms = sum(r.duration_ms or 0.0 for r in rows) / total if total else 0.0
+            ).one()
+            last_status = s.execute(
+                select(WorkflowRun.status)
+                .where(WorkflowRun.recipe_id == recipe_id)
+                .order_by(WorkflowRun.id.desc())
+                .limit(1)
+            ).scalar()
             return {
                 "runs": total,
                 "success_rate": (success / total) * 100.0 if total else 0.0,
-                "last_status": last_status,
-                "avg_ms": avg_ms,
+                "last_status": last_status or "unknown",
+                "avg_ms": float(avg_ms or 0.0),
             }
 
+    @staticmethod
+    def _duration_quantile(s, q: float, *where) -> float:
+        """Approximate duration quantile from a GROUP BY over latency buckets."""
+        dur = WorkflowRun.duration_ms
+        cond = [*where, dur.is_not(None), dur > 0]
+        lo, hi = s.execute(select(func.min(dur), func.max(dur)).where(*cond)).one()
+        if lo is None:
+            return 0.0
+        b = bucket_sql(dur).label("b")
+        rows = s.execute(select(b, func.count()).where(*cond).group_by(b)).all()
+        return quantile_from_buckets(bucket_counts(rows), q, lo=lo, hi=hi)
+
     # ---- Dict helpers -------------------------------------------------------
     @staticmethod
     def _run_to_dict(r: WorkflowRun) -> Dict[str, Any]:
@@ -256,11 +1398,108 @@ class RunStore:
         }
 
 
+def _encode_cursor(*, before: Optional[int] = None, after: Optional[int] = None) -> str:
+    raw = json.dumps({"b": before} if before is not None else {"a": after})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    """Return (before_id, after_id) for an opaque page cursor."""
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        d = json.loads(base64.urlsafe_b64decode(cursor + pad))
+        return d.get("b"), d.get("a")
+    except Exception as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+
+
+def _filter_runs(
+    q,
+    *,
+    status: Optional[List[str]] = None,
+    since: Optional[datetime] = None,
+    workflow_id: Optional[str] = None,
+    recipe_id: Optional[int] = None,
+):
+    """Apply the run listing filters shared by `page_runs()` and `count_runs()`."""
+    if status:
+        q = q.where(WorkflowRun.status.in_(status))
+    if since:
+        q = q.where(WorkflowRun.started_at >= since)
+    if workflow_id is not None:
+        q = q.where(WorkflowRun.workflow_id == str(workflow_id))
+    if recipe_id is not None:
+        q = q.where(WorkflowRun.recipe_id == int(recipe_id))
+    return q
+
+
+class Span:
+    """Handle yielded by `Recorder.span()`; add attributes with `set()`."""
+    __slots__ = ("id", "parent_id", "name", "attrs", "started_at", "_t0")
+
+    def __init__(self, name: str, parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.started_at = datetime.now(UTC)
+        self._t0 = time.perf_counter()
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def _row(self, run_id: int, status: str) -> Dict[str, Any]:
+        dur_ms = (time.perf_counter() - self._t0) * 1000.0
+        return {
+            "id": self.id, "run_id": run_id, "parent_id": self.parent_id, "name": self.name,
+            "started_at": self.started_at,
+            "ended_at": self.started_at + timedelta(milliseconds=dur_ms),
+            "duration_ms": dur_ms, "status": status, "attrs": self.attrs,
+        }
+
+
 class Recorder:
     """Use inside the workflow_run() context manager."""
     def __init__(self, store: RunStore, run_id: int):
         self.store = store
         self.run_id = run_id
+        self._local = threading.local()  # per-thread stack of open spans
+
+    def current_span(self) -> Optional[Span]:
+        """The innermost span open on this thread, if any."""
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    @contextlib.contextmanager
+    def span(self, name: str, *, parent: Optional[Span] = None, **attrs: Any):
+        """
+        Time a section of the run, e.g.
+        `with rec.span("servicenow.create", tool="servicenow") as sp: ...; sp.set(bytes=n)`.
+        Spans opened inside another span (same thread) become its children.
+        Worker threads pass `parent` (see `current_span()`) to nest under a
+        span opened on another thread.
+        Exceptions mark the span `error` and propagate.
+        """
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        if parent is None and stack:
+            parent = stack[-1]
+        sp = Span(name, parent.id if parent is not None else None, dict(attrs))
+        stack.append(sp)
+        status = "ok"
+        try:
+            yield sp
+        except BaseException as e:
+            status = "error"
+            sp.attrs.setdefault("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            stack.pop()
+            self._record_span(sp._row(self.run_id, status))
+
+    def _record_span(self, row: Dict[str, Any]) -> None:
+        self.store.log_many(spans=[row])
 
     def step(
         self,
@@ -291,16 +1530,158 @@ class Recorder:
             external_id=external_id, url=url, data=data
         )
 
+    def flush(self) -> None:
+        """Unbuffered recorders write immediately; nothing to flush."""
+
+    def open_run(self) -> int:
+        """The run id; deferred runs (`RunJournal`) write their run row first."""
+        return self.run_id
+
+    def update_meta(self, **values: Any) -> None:
+        """Merge `values` into the run's `meta` (e.g. what `core.workflow.checkpoints` resumes from)."""
+        self.store.update_run_meta(self.run_id, values)
+
+
+class BufferedRecorder(Recorder):
+    """
+    Write-behind recorder: rows are queued and bulk-inserted once `flush_size`
+    rows are pending or `flush_interval_s` has elapsed since the last flush.
+    The time threshold is checked on each call, and `workflow_run()` always
+    flushes on exit (including on failure).
+    """
+    def __init__(
+        self,
+        store: RunStore,
+        run_id: int,
+        *,
+        flush_size: int = 100,
+        flush_interval_s: float = 1.0,
+    ):
+        super().__init__(store, run_id)
+        self.flush_size = max(1, int(flush_size))
+        self.flush_interval_s = float(flush_interval_s)
+        self._steps: List[Dict[str, Any]] = []
+        self._artifacts: List[Dict[str, Any]] = []
+        self._spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @property
+    def pending(self) -> int:
+        return len(self._steps) + len(self._artifacts) + len(self._spans)
+
+    def step(
+        self,
+        phase: str,
+        message: str,
+        *,
+        level: str = "info",
+        status: str = "ok",
+        payload: Optional[Dict[str, Any]] = None,
+        result: Optional[Dict[str, Any]] = None,
+    ):
+        with self._lock:
+            self._steps.append({
+                "run_id": self.run_id, "ts": datetime.now(UTC), "phase": phase,
+                "level": level, "status": status, "message": message,
+                "payload": payload, "result": result,
+            })
+        self._maybe_flush()
+
+    def artifact(
+        self,
+        kind: str,
+        title: str,
+        *,
+        external_id: Optional[str] = None,
+        url: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None,
+    ):
+        with self._lock:
+            self._artifacts.append({
+                "run_id": self.run_id, "kind": kind, "title": title,
+                "external_id": external_id, "url": url, "data": data or {},
+            })
+        self._maybe_flush()
+
+    def _record_span(self, row: Dict[str, Any]) -> None:
+        with self._lock:
+            self._spans.append(row)
+        self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if (
+            self.pending >= self.flush_size
+            or time.monotonic() - self._last_flush >= self.flush_interval_s
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            steps, self._steps = self._steps, []
+            arts, self._artifacts = self._artifacts, []
+            spans, self._spans = self._spans, []
+            self._last_flush = time.monotonic()
+            # Write under the lock so concurrent flushes keep insertion order.
+            try:
+                self.store.log_many(steps=steps, artifacts=arts, spans=spans)
+            except Exception:
+                # Re-queue so the exit flush in workflow_run() retries them.
+                self._steps[:0] = steps
+                self._artifacts[:0] = arts
+                self._spans[:0] = spans
+                raise
+
+
+class RunJournal(BufferedRecorder):
+    """
+    Buffered recorder whose run row is also deferred (``workflow_run(deferred=True)``).
+    Nothing is written until the first flush; then the run row, queued
+    steps/artifacts/spans and (on exit) the final status share one
+    transaction per flush window, so a run shorter than the window costs a
+    single commit.  ``run_id`` is None until the first flush.
+    """
+    def __init__(
+        self,
+        store: RunStore,
+        header: Dict[str, Any],
+        *,
+        flush_size: int = 100,
+        flush_interval_s: float = 1.0,
+    ):
+        super().__init__(store, None, flush_size=flush_size, flush_interval_s=flush_interval_s)
+        self.header = header
+
+    def flush(self, finish: Optional[tuple] = None) -> None:
+        with self._lock:
+            if not self.pending and finish is None:
+                return
+            steps, self._steps = self._steps, []
+            arts, self._artifacts = self._artifacts, []
+            spans, self._spans = self._spans, []
+            self._last_flush = time.monotonic()
+            try:
+                self.run_id = self.store.write_run(
+                    self.run_id, self.header, steps=steps, artifacts=arts, spans=spans, finish=finish
+                )
+            except Exception:
+                self._steps[:0] = steps
+                self._artifacts[:0] = arts
+                self._spans[:0] = spans
+                raise
+
+    def finish(self, status: str, error: Optional[str], duration_ms: float) -> None:
+        self.flush(finish=(status, error, duration_ms))
+
+    def open_run(self) -> int:
+        with self._lock:
+            if self.run_id is None:
+                self.run_id = self.store.write_run(None, self.header)
+        return self.run_id
 
-def _quantile(xs: List[float], q: float) -> float:
-    if not xs:
-        return 0.0
-    xs = sorted(xs)
-    if q <= 0:
-        return xs[0]
-    if q >= 1:
-        return xs[-1]
-    idx = (len(xs) - 1) * q
-    lo, hi = int(idx), min(int(idx) + 1, len(xs) - 1)
-    frac = idx - lo
-    return xs[lo] * (1 - frac) + xs[hi] * frac
+    def update_meta(self, **values: Any) -> None:
+        with self._lock:
+            if self.run_id is None:  # still in the header written by the first flush
+                self.header["meta"] = {**(self.header.get("meta") or {}), **values}
+                return
+        super().update_meta(**values)
@@ -10,33 +10,75 @@ variables to select between different backends (e.g. SQL vs. Redis vs.
 external API).  Centralising the factory logic here decouples the
 Dashboard from a specific storage implementation and makes it easier to
 introduce alternative stores without touching the UI code.
+
+Stores are cached in a process-wide registry keyed by the resolved
+database URL, so every caller (pages, ``run_now``, the scheduler) shares
+one SQLAlchemy engine and connection pool per database and the schema
+check runs once per process.  Module state survives Streamlit script
+reruns, and the registry lock makes first use safe across threads.
 """
 
 from __future__ import annotations
 
+import os
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 from .runs_store import RunStore
 
+_STORES: Dict[str, RunStore] = {}
+_LOCK = threading.Lock()
+
+
+def _resolve_db_path(db_path: Optional[Path]) -> Path:
+    if db_path is None:
+        env_path = os.getenv("IPAV_DB_PATH")
+        if env_path:
+            db_path = Path(env_path)
+        else:
+            # Base directory of the repo (sma-av-streamlit)
+            base_dir = Path(__file__).resolve().parents[1]
+            db_path = base_dir / "avops.db"
+    return Path(db_path).expanduser().resolve()
+
+
+def runstore_url(db_path: Optional[Path] = None) -> str:
+    """Return the registry key (SQLAlchemy URL) for ``db_path``."""
+    return f"sqlite:///{_resolve_db_path(db_path)}"
+
 
 def make_runstore(db_path: Optional[Path] = None) -> RunStore:
-    """Instantiate and return a ``RunStore``.
+    """Return the shared ``RunStore`` for a database, creating it on first use.
 
     Parameters
     ----------
     db_path : Optional[Path], optional
-        An explicit path to the SQLite file.  If not provided, the default
-        ``avops.db`` in the repository root will be used.  This argument
-        exists primarily for testing or advanced deployments.
+        An explicit path to the SQLite file.  If not provided, ``$IPAV_DB_PATH``
+        or the default ``avops.db`` in the repository root will be used.  This
+        argument exists primarily for testing or advanced deployments.
 
     Returns
     -------
     RunStore
-        A new run store bound to the specified or default database.
+        The run store bound to the specified or default database.  Repeated
+        calls for the same database return the same instance.
     """
-    if db_path is None:
-        # Base directory of the repo (sma-av-streamlit)
-        base_dir = Path(__file__).resolve().parents[1]
-        db_path = base_dir / "avops.db"
-    return RunStore(db_path=db_path)
\ No newline at end of file
+    key = runstore_url(db_path)
+    store = _STORES.get(key)
+    if store is not None:
+        return store
+    with _LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = RunStore(db_path=_resolve_db_path(db_path))
+            _STORES[key] = store
+        return store
+
+
+def reset_runstores() -> None:
+    """Dispose every cached engine and clear the registry (tests, config reloads)."""
+    with _LOCK:
+        for store in _STORES.values():
+            store.engine.dispose()
+        _STORES.clear()
@@ -1,11 +1,15 @@
 # core/utils/evidence.py
 from __future__ import annotations
 
-from typing import Any, Optional
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 import json
 
+from ..blob_store import blob_store_for, blob_threshold_from_env, resolve
+
 def _resolve_evidence_model():
     """
     Try to find a suitable evidence-like model in core.db.models.
@@ -43,6 +47,31 @@ def _get_model():
     _EVIDENCE_MODEL = _resolve_evidence_model()
     return _EVIDENCE_MODEL
 
+
+@dataclass(frozen=True)
+class _EvidenceColumns:
+    """Which optional columns the evidence model has (probed once per model)."""
+    payload_field: Optional[str]
+    has_kind: bool
+    has_label: bool
+    has_created_at: bool
+
+
+_COLUMNS: Dict[Any, _EvidenceColumns] = {}
+
+def _columns(EV) -> _EvidenceColumns:
+    cols = _COLUMNS.get(EV)
+    if cols is None:
+        names = set(EV.__table__.columns.keys())
+        cols = _EvidenceColumns(
+            payload_field=next((f for f in ("data", "payload", "json", "content") if f in names), None),
+            has_kind="kind" in names,
+            has_label="label" in names,
+            has_created_at="created_at" in names,
+        )
+        _COLUMNS[EV] = cols
+    return cols
+
 def _coerce_json(obj: Any) -> Any:
     # Best effort to serialize arbitrary objects
     if isinstance(obj, (dict, list, str, int, float, bool)) or obj is None:
@@ -52,6 +81,36 @@ def _coerce_json(obj: Any) -> Any:
     except Exception:
         return str(obj)
 
+def _row(
+    cols: _EvidenceColumns,
+    run_id: int,
+    obj: Any,
+    label: Optional[str],
+    kind: str,
+    offload: Optional[Callable[[Any], Any]],
+    now: datetime,
+) -> Dict[str, Any]:
+    row: Dict[str, Any] = {"run_id": run_id}
+    if cols.has_kind:
+        row["kind"] = kind
+    if cols.has_label:
+        row["label"] = label or ""
+    if cols.payload_field:
+        value = _coerce_json(obj)
+        row[cols.payload_field] = offload(value) if offload else value
+    if cols.has_created_at:
+        row["created_at"] = now
+    return row
+
+def _offloader(db: Session) -> Optional[Callable[[Any], Any]]:
+    threshold = blob_threshold_from_env()
+    if not threshold:
+        return None
+    # Large payloads go to the content-addressed blob store; the row keeps a reference.
+    # Blobs are written in the session's transaction, which may hold the write lock.
+    store = blob_store_for(db.get_bind())
+    return lambda value: store.offload(value, threshold, db.connection())
+
 def attach_json(
     db: Session,
     run_id: int,
@@ -59,42 +118,104 @@ def attach_json(
     *,
     label: Optional[str] = None,
     kind: str = "json",
+    commit: bool = True,
 ) -> Optional[int]:
     """
     Attach a JSON-like payload as evidence for a run. If no compatible model
     is found, this function is a no-op and returns None.
+    With ``commit=False`` the row is only flushed; the caller's transaction
+    commits it (see ``core.workflow.journal``).  To attach several payloads
+    use ``attach_many()`` / ``EvidenceBatch``.
     """
     EV = _get_model()
     if EV is None:
         # Graceful no-op when the schema doesn't include an evidence table.
         return None
 
-    rec = EV()
-    # Required/likely fields
-    if hasattr(rec, "run_id"):
-        setattr(rec, "run_id", run_id)
-    if hasattr(rec, "kind"):
-        setattr(rec, "kind", kind)
-    if hasattr(rec, "label"):
-        setattr(rec, "label", label or "")
-
-    # Choose a payload column
-    payload_field = None
-    for f in ("data", "payload", "json", "content"):
-        if hasattr(rec, f):
-            payload_field = f
-            break
-    if payload_field:
-        setattr(rec, payload_field, _coerce_json(obj))
-
-    # Stamp time if model has created_at
-    if hasattr(rec, "created_at") and getattr(rec, "created_at") is None:
-        setattr(rec, "created_at", datetime.utcnow())
-
+    cols = _columns(EV)
+    rec = EV(**_row(cols, run_id, obj, label, kind, _offloader(db), datetime.utcnow()))
     db.add(rec)
+    if not commit:
+        db.flush()
+        return getattr(rec, "id", None)
     db.commit()
     try:
         db.refresh(rec)
     except Exception:
         pass
     return getattr(rec, "id", None)
+
+
+def attach_many(
+    db: Session,
+    items: Iterable[Tuple[int, Any, Optional[str], str]],
+    *,
+    commit: bool = True,
+) -> int:
+    """
+    Attach ``(run_id, obj, label, kind)`` items with one executemany INSERT
+    (no per-row refresh; ids are not returned).  Returns the number of rows
+    written, 0 when there is no evidence table.
+    """
+    EV = _get_model()
+    items = list(items)
+    if EV is None or not items:
+        return 0
+    cols = _columns(EV)
+    offload = _offloader(db)
+    now = datetime.utcnow()
+    rows = [_row(cols, run_id, obj, label, kind, offload, now) for run_id, obj, label, kind in items]
+    db.execute(insert(EV.__table__), rows)
+    if commit:
+        db.commit()
+    return len(rows)
+
+
+class EvidenceBatch:
+    """
+    Collect evidence and write it with one ``attach_many()`` call on exit
+    (also when the block raises) or on ``flush()``::
+
+        with EvidenceBatch(db, run.id) as ev:
+            ev.add({"phase": "plan", "message": "..."})
+    """
+
+    def __init__(self, db: Session, run_id: Optional[int] = None, *, commit: bool = True):
+        self.db = db
+        self.run_id = run_id
+        self.commit = commit
+        self._items: List[Tuple[int, Any, Optional[str], str]] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(
+        self,
+        obj: Any,
+        *,
+        label: Optional[str] = None,
+        kind: str = "json",
+        run_id: Optional[int] = None,
+    ) -> None:
+        rid = self.run_id if run_id is None else run_id
+        if rid is None:
+            raise ValueError("EvidenceBatch.add() needs a run_id")
+        self._items.append((rid, obj, label, kind))
+
+    def flush(self) -> int:
+        items, self._items = self._items, []
+        return attach_many(self.db, items, commit=self.commit)
+
+    def __enter__(self) -> "EvidenceBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.flush()
+
+
+def load_evidence_payload(db: Session, ev: Any) -> Any:
+    """Return an evidence row's payload, loading it from the blob store if offloaded."""
+    for f in ("data", "payload", "json", "content"):
+        if hasattr(ev, f):
+            return resolve(getattr(ev, f), blob_store_for(db.get_bind()))
+    return None
@@ -0,0 +1,345 @@
+"""
+core/workflow/checkpoints.py
+----------------------------
+
+Checkpointed, resumable recipe runs.
+
+``run_recipe()`` executes a compiled recipe step by step inside a
+``RunStore.workflow_run``.  Each step writes a checkpoint to the run store
+(``RunStore.save_checkpoint``):
+
+- a ``started`` row before the tool is called;
+- the final status (``ok`` / ``simulated`` / ``skipped``), with the step's
+  ``s.*`` saves and its result, once it returns;
+- ``failed`` and the error if it raises.  The run then fails as usual.
+
+``resume(run_id)`` starts a new attempt run (``meta.resume_of`` = the first
+run) for a ``failed`` or interrupted run.  A run killed mid-way stays
+``running``, so ``running`` is only accepted once the run looks dead: no
+checkpoint and no start newer than ``stale_after_s``
+(``$IPAV_RESUME_STALE_S``, default 15 minutes).  A step that legitimately
+runs longer than that looks dead too.  ``resume()`` restores ``s`` and the
+step results from the completed checkpoints, skips those steps (reported as
+``resumed``) and runs the rest.  The recipe and inputs are read back from
+the first run's ``meta``, so a recipe file edited after the failure does not
+change the resumed run.
+
+Steps that call out (``mcp-*`` and tool bindings) get an idempotency key,
+derived from the first run's id and the step id.  A retried step is called
+with the same key, so the tool can drop the duplicate ``create_incident``
+the first attempt may already have made.  ``call`` then receives it as
+``call(tool, action, params, idempotency_key=...)``.  Local steps are
+called as ``call(tool, action, params)``.
+
+Steps with ``cache:`` go through the run store's shared step cache
+(``core.workflow.step_cache``); the run record gets a ``cache`` step with
+the run's hits and misses.
+
+``checkpoint_run()`` does the same inside a run that is already open.
+Scheduled and manual runs (``engine.execute_recipe_run`` under an execution
+journal) use it when their steps run in order; the Run Details page offers
+a Resume button for them once they fail.  Runs on the DAG executor
+(``$IPAV_STEP_WORKERS`` above 1) are not checkpointed.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Optional
+
+from ..recipes.cache import thaw
+from ..recipes.compiler import (
+    PlanResult,
+    PlanStep,
+    RecipePlan,
+    StepOutcome,
+    ToolCall,
+    compile_recipe,
+    load_recipe_plan,
+    set_step_result,
+)
+from ..runs_store import RunStore
+from .step_cache import StepCache, record_cache_summary, step_cache_for
+
+__all__ = [
+    "CheckpointedRun", "idempotency_key", "run_recipe", "checkpoint_run", "resume", "COMPLETED", "RESUMABLE",
+]
+
+# Checkpoint statuses a resumed run does not execute again.
+COMPLETED = frozenset({"ok", "simulated", "skipped"})
+
+# Run statuses resume() accepts; a run killed mid-way stays "running" (only
+# resumed once stale, see _last_activity()).
+RESUMABLE = frozenset({"failed", "running"})
+
+# Bindings with side effects outside this process.
+_SIDE_EFFECT_KINDS = frozenset({"mcp", "tool"})
+
+
+@dataclass
+class CheckpointedRun:
+    run_id: int  # this attempt
+    root_run_id: int  # the first attempt; checkpoints and keys belong to it
+    result: PlanResult
+    resumed: List[str] = field(default_factory=list)  # steps restored from checkpoints
+
+
+def idempotency_key(root_run_id: int, step_id: str) -> str:
+    """Stable key for one step of one logical run (the same on every attempt)."""
+    digest = hashlib.sha256(f"{root_run_id}:{step_id}".encode("utf-8")).hexdigest()[:24]
+    return f"ipav-{root_run_id}-{digest}"
+
+
+def _jsonable(value: Any) -> Any:
+    try:
+        return json.loads(json.dumps(thaw(value), default=str))
+    except Exception:
+        return str(value)
+
+
+def _stale_after_from_env() -> float:
+    try:
+        return max(0.0, float(os.getenv("IPAV_RESUME_STALE_S", "900")))
+    except ValueError:
+        return 900.0
+
+
+def _parse_ts(value: Any) -> Optional[datetime]:
+    try:
+        dt = datetime.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _last_activity(header: Mapping[str, Any], checkpoints: List[Dict[str, Any]]) -> Optional[datetime]:
+    """The run's start or its newest checkpoint write, whichever is later."""
+    stamps = [_parse_ts(header.get("started_at"))] + [_parse_ts(cp.get("updated_at")) for cp in checkpoints]
+    return max((ts for ts in stamps if ts is not None), default=None)
+
+
+def _store(store: Optional[RunStore]) -> RunStore:
+    if store is not None:
+        return store
+    from ..runstore_factory import make_runstore
+    return make_runstore()
+
+
+def run_recipe(
+    source: Any,
+    inputs: Optional[Mapping[str, Any]] = None,
+    *,
+    call: Optional[ToolCall] = None,
+    store: Optional[RunStore] = None,
+    workflow_id: Optional[str] = None,
+    name: Optional[str] = None,
+    agent_id: Optional[int] = None,
+    recipe_id: Optional[int] = None,
+    trigger: str = "manual",
+    validate: bool = True,
+    cache: Optional[StepCache] = None,
+) -> CheckpointedRun:
+    """
+    Run a recipe (a ``RecipePlan`` or anything ``load_recipe_plan`` accepts)
+    with per-step checkpoints; resume a failed run with ``resume()``.
+    """
+    plan = source if isinstance(source, RecipePlan) else load_recipe_plan(source)
+    bound = plan.bind_inputs(inputs, validate=validate)
+    header = dict(
+        workflow_id=workflow_id or f"recipe:{plan.id}",
+        name=name or plan.title or plan.id,
+        agent_id=agent_id,
+        recipe_id=recipe_id,
+        trigger=trigger,
+    )
+    store = _store(store)
+    return _execute(
+        store, plan, bound, header, root_run_id=None, done={}, call=call, cache=cache or step_cache_for(store)
+    )
+
+
+def resume(
+    run_id: int,
+    *,
+    call: Optional[ToolCall] = None,
+    store: Optional[RunStore] = None,
+    trigger: str = "resume",
+    cache: Optional[StepCache] = None,
+    stale_after_s: Optional[float] = None,
+) -> CheckpointedRun:
+    """
+    Continue a failed or interrupted checkpointed run (or one of its resumed
+    attempts) from its last completed step.  Raises ValueError for unknown
+    runs, runs without checkpoint metadata, runs in another state (e.g.
+    ``success``), ``running`` runs with activity in the last
+    ``stale_after_s`` seconds and runs whose steps have all completed.
+    """
+    store = _store(store)
+    header = store.run_header(run_id)
+    if not header:
+        raise ValueError(f"Unknown run {run_id}")
+    status = header.get("status")
+    if status not in RESUMABLE:
+        raise ValueError(f"Run {run_id} is {status!r}; only failed or interrupted runs can be resumed")
+    meta = header.get("meta") or {}
+    root = int(meta.get("resume_of") or run_id)
+    if root != run_id:
+        meta = (store.run_header(root) or {}).get("meta") or {}
+    if not isinstance(meta.get("recipe"), Mapping):
+        raise ValueError(f"Run {run_id} was not checkpointed; nothing to resume")
+    checkpoints = store.checkpoints(root)
+    if status == "running":
+        stale_after_s = _stale_after_from_env() if stale_after_s is None else float(stale_after_s)
+        last = _last_activity(header, checkpoints)
+        if last is not None and (datetime.now(timezone.utc) - last).total_seconds() < stale_after_s:
+            raise ValueError(f"Run {run_id} is still running (last activity {last.isoformat()})")
+    plan = compile_recipe(meta["recipe"])
+    done = {cp["step_id"]: cp for cp in checkpoints if cp["status"] in COMPLETED}
+    if all(step.id in done for step in plan.steps):
+        raise ValueError(f"Run {run_id} has no steps left to resume")
+    return _execute(
+        store,
+        plan,
+        dict(meta.get("inputs") or {}),
+        dict(
+            workflow_id=header["workflow_id"],
+            name=header["name"],
+            agent_id=header.get("agent_id"),
+            recipe_id=header.get("recipe_id"),
+            trigger=trigger,
+        ),
+        root_run_id=root,
+        done=done,
+        call=call,
+        cache=cache or step_cache_for(store),
+    )
+
+
+def _execute(
+    store: RunStore,
+    plan: RecipePlan,
+    bound: Dict[str, Any],
+    header: Dict[str, Any],
+    *,
+    root_run_id: Optional[int],
+    done: Mapping[str, Dict[str, Any]],
+    call: Optional[ToolCall] = None,
+    cache: Optional[StepCache] = None,
+) -> CheckpointedRun:
+    meta: Dict[str, Any] = {"recipe": _jsonable(plan.source), "inputs": _jsonable(bound)}
+    if root_run_id is not None:
+        meta["resume_of"] = root_run_id
+    with store.workflow_run(meta=meta, **header) as rec:
+        return _run_steps(store, rec, plan, bound, root_run_id=root_run_id, done=done, call=call, cache=cache)
+
+
+def checkpoint_run(
+    rec: Any,
+    plan: RecipePlan,
+    bound: Dict[str, Any],
+    *,
+    call: Optional[ToolCall] = None,
+    cache: Optional[StepCache] = None,
+    log_steps: bool = True,
+) -> CheckpointedRun:
+    """
+    ``run_recipe()`` inside an open run (``rec``, e.g. an execution journal's
+    recorder): the recipe and inputs go into its ``meta`` and its row is
+    written now, so ``resume(rec.run_id)`` works if it fails.  Each step
+    gets a ``step.<id>`` span; with ``log_steps=False`` the caller records
+    the step outcomes itself (failures are always logged).
+    """
+    rec.update_meta(recipe=_jsonable(plan.source), inputs=_jsonable(bound))
+    rec.open_run()
+    store = rec.store
+    return _run_steps(
+        store, rec, plan, bound, root_run_id=None, done={}, call=call,
+        cache=cache or step_cache_for(store), log_steps=log_steps,
+    )
+
+
+def _run_steps(
+    store: RunStore,
+    rec: Any,
+    plan: RecipePlan,
+    bound: Dict[str, Any],
+    *,
+    root_run_id: Optional[int],
+    done: Mapping[str, Dict[str, Any]],
+    call: Optional[ToolCall],
+    cache: Optional[StepCache],
+    log_steps: bool = True,
+) -> CheckpointedRun:
+    run_id = rec.run_id
+    root = root_run_id if root_run_id is not None else run_id
+    ctx = plan.new_context(bound)
+    outcomes: List[StepOutcome] = []
+    resumed: List[str] = []
+    for seq, step in enumerate(plan.steps):
+        cp = done.get(step.id)
+        if cp is not None:
+            saved = dict(cp.get("saved") or {})
+            ctx["s"].update(saved)
+            if cp["status"] != "skipped":
+                set_step_result(ctx, step.id, {"result": cp.get("result")})
+            outcomes.append(StepOutcome(step.id, "resumed", result=cp.get("result"), saved=saved))
+            resumed.append(step.id)
+            continue
+        with rec.span(f"step.{step.id}", tool=step.tool.name, action=step.action) as sp:
+            step_outcomes = _run_step(
+                store, rec, step, seq, ctx, call, cache, root=root, run_id=run_id, log=log_steps
+            )
+            sp.set(status=step_outcomes[0].status, cached=any(o.cached for o in step_outcomes))
+        outcomes.extend(step_outcomes)
+    record_cache_summary(rec, plan, outcomes)
+    if resumed:
+        rec.step(
+            "resume", f"Resumed after {len(resumed)} completed step(s)",
+            payload={"resume_of": root, "skipped": resumed},
+        )
+    result = plan.finish(ctx, outcomes)
+    return CheckpointedRun(run_id=run_id, root_run_id=root, result=result, resumed=resumed)
+
+
+def _run_step(
+    store: RunStore,
+    rec: Any,
+    step: PlanStep,
+    seq: int,
+    ctx: Dict[str, Any],
+    call: Optional[ToolCall],
+    cache: Optional[StepCache],
+    *,
+    root: int,
+    run_id: int,
+    log: bool = True,
+) -> List[StepOutcome]:
+    key = idempotency_key(root, step.id) if step.tool.kind in _SIDE_EFFECT_KINDS else None
+    store.save_checkpoint(root, step.id, seq=seq, status="started", idempotency_key=key, attempt_run_id=run_id)
+    try:
+        step_outcomes, saved, result = step.execute(ctx, call, idempotency_key=key, cache=cache)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        store.save_checkpoint(
+            root, step.id, seq=seq, status="failed", idempotency_key=key, error=error, attempt_run_id=run_id
+        )
+        rec.step("act", f"{step.id} failed", level="error", status="failed", payload={"step": step.id, "error": error})
+        raise
+    status = step_outcomes[0].status
+    saved, result = _jsonable(saved), _jsonable(result)
+    store.save_checkpoint(
+        root, step.id, seq=seq, status=status, idempotency_key=key,
+        saved=saved, result=result, attempt_run_id=run_id,
+    )
+    ctx["s"].update(saved)
+    if status != "skipped":
+        set_step_result(ctx, step.id, {"result": result})
+    if log:
+        rec.step(
+            "act", f"{step.id}: {status}", status=status,
+            payload={"step": step.id, "idempotency_key": key, "cached": any(o.cached for o in step_outcomes)},
+        )
+    return step_outcomes
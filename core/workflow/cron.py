@@ -0,0 +1,220 @@
+"""
+core/workflow/cron.py
+---------------------
+
+Cron-expression triggers for workflows (``trigger_type="cron"``).
+
+Expressions have five fields, ``minute hour day-of-month month day-of-week``.
+Each field accepts ``*``, ``a-b``, ``*/n``, ``a-b/n``, comma lists and the
+``JAN``..``DEC`` / ``SUN``..``SAT`` names.  The ``@hourly``, ``@daily``,
+``@weekly``, ``@monthly`` and ``@yearly`` shortcuts are also accepted.  As in
+Vixie cron, a day that is restricted in both day-of-month and day-of-week
+matches if either field matches.  For example, ``30 7 * * MON-FRI`` fires at
+07:30 on weekdays.
+
+``parse_cron`` is cached and precomputes a fire calendar for each
+expression: the sorted minutes-of-day it fires at, plus its day and month
+sets.  ``next_fire`` is then a per-day check and a bisect rather than a
+minute-by-minute scan.  When a ``MaintenanceWindow`` is given, fires outside
+the window are skipped and the search jumps to the next window opening.
+
+Expressions are evaluated in ``$IPAV_SCHEDULER_TZ`` (an IANA zone name,
+default UTC).  Times passed in and returned are naive UTC, like the rest of
+the workflow tables.
+"""
+from __future__ import annotations
+
+import os
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Tuple
+
+try:
+    from zoneinfo import ZoneInfo
+except Exception:  # pragma: no cover - Python < 3.9
+    ZoneInfo = None  # type: ignore[assignment]
+
+_MONTHS = {m: i for i, m in enumerate(
+    ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"), start=1)}
+_WEEKDAYS = {d: i for i, d in enumerate(("SUN", "MON", "TUE", "WED", "THU", "FRI", "SAT"))}
+_MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+# A day-of-month/month pair that never occurs (e.g. Feb 30) is found within 8 years.
+_MAX_SCAN_DAYS = 366 * 8
+_MAX_WINDOW_SKIPS = 1000
+
+
+def _value(token: str, names: dict, field: str) -> int:
+    key = token.upper()
+    if key in names:
+        return names[key]
+    try:
+        return int(token)
+    except ValueError:
+        raise ValueError(f"Invalid {field} value {token!r} in cron expression") from None
+
+
+def _parse_field(text: str, lo: int, hi: int, field: str, names: Optional[dict] = None) -> FrozenSet[int]:
+    names = names or {}
+    values = set()
+    for part in text.split(","):
+        rng, slash, step_txt = part.partition("/")
+        step = _value(step_txt, {}, field) if slash else 1
+        if step < 1:
+            raise ValueError(f"Invalid {field} step {step_txt!r} in cron expression")
+        if rng == "*":
+            start, end = lo, hi
+        elif "-" in rng:
+            a, _, b = rng.partition("-")
+            start, end = _value(a, names, field), _value(b, names, field)
+        else:
+            start = _value(rng, names, field)
+            end = hi if slash else start
+        if not lo <= start <= end <= hi:
+            raise ValueError(f"{field} range {part!r} outside {lo}-{hi} in cron expression")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronSchedule:
+    """A parsed cron expression with its precomputed fire calendar."""
+    expr: str
+    times: Tuple[int, ...]  # sorted minutes-of-day (hour * 60 + minute)
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]  # 0=Sunday, as in cron
+    any_day: bool
+    any_weekday: bool
+
+    def matches_day(self, d: date) -> bool:
+        if d.month not in self.months:
+            return False
+        dom = d.day in self.days
+        dow = d.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return dom and dow
+        return dom or dow
+
+    def next_local(self, after: datetime) -> Optional[datetime]:
+        """First fire strictly after ``after`` (naive wall-clock time), or None."""
+        start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        d, minute = start.date(), start.hour * 60 + start.minute
+        for _ in range(_MAX_SCAN_DAYS):
+            if self.matches_day(d):
+                i = bisect_left(self.times, minute)
+                if i < len(self.times):
+                    t = self.times[i]
+                    return datetime.combine(d, time(t // 60, t % 60))
+            d += timedelta(days=1)
+            minute = 0
+        return None
+
+
+def parse_cron(expr: str) -> CronSchedule:
+    """Parse (and cache) a five-field cron expression; raises ValueError if invalid."""
+    return _parse_cron(" ".join(str(expr or "").split()))
+
+
+@lru_cache(maxsize=512)
+def _parse_cron(text: str) -> CronSchedule:
+    fields = _MACROS.get(text.lower(), text).split(" ")
+    if len(fields) != 5:
+        raise ValueError(f"Cron expression {text!r} must have 5 fields (minute hour day month weekday)")
+    m_txt, h_txt, dom_txt, mon_txt, dow_txt = fields
+    minutes = _parse_field(m_txt, 0, 59, "minute")
+    hours = _parse_field(h_txt, 0, 23, "hour")
+    days = _parse_field(dom_txt, 1, 31, "day-of-month")
+    months = _parse_field(mon_txt, 1, 12, "month", _MONTHS)
+    weekdays = frozenset(d % 7 for d in _parse_field(dow_txt, 0, 7, "day-of-week", _WEEKDAYS))
+    return CronSchedule(
+        expr=text,
+        times=tuple(sorted(h * 60 + m for h in hours for m in minutes)),
+        days=days,
+        months=months,
+        weekdays=weekdays,
+        any_day=dom_txt.startswith("*"),
+        any_weekday=dow_txt.startswith("*"),
+    )
+
+
+def scheduler_tz() -> tzinfo:
+    """Zone cron expressions are evaluated in (``$IPAV_SCHEDULER_TZ``, default UTC)."""
+    name = (os.getenv("IPAV_SCHEDULER_TZ") or "").strip()
+    if name and ZoneInfo is not None:
+        try:
+            return ZoneInfo(name)
+        except Exception:
+            pass
+    return timezone.utc
+
+
+def _window_next_open(window, local: datetime) -> datetime:
+    """Start of the next opening of ``window`` at or after ``local`` (wall-clock)."""
+    for k in range(8):
+        d = local.date() + timedelta(days=k)
+        if d.weekday() not in window.days:
+            continue
+        opens = datetime.combine(d, window.start)
+        if opens >= local:
+            return opens
+        if local.time() <= window.end:
+            return local
+    return local + timedelta(days=7)
+
+
+def next_fire(
+    schedule: CronSchedule,
+    after: datetime,
+    *,
+    tz: Optional[tzinfo] = None,
+    window=None,
+) -> Optional[datetime]:
+    """
+    Next fire (naive UTC) strictly after ``after`` (naive UTC), or None if
+    the schedule never fires again.  ``window`` (a
+    ``core.agents.fixed.policies.MaintenanceWindow``) drops fires outside it.
+    """
+    tz = tz or scheduler_tz()
+    local = after.replace(tzinfo=timezone.utc).astimezone(tz).replace(tzinfo=None)
+    for _ in range(_MAX_WINDOW_SKIPS):
+        nxt = schedule.next_local(local)
+        if nxt is None:
+            return None
+        if window is not None and not window.is_open_now(nxt):
+            local = _window_next_open(window, nxt) - timedelta(minutes=1)
+            continue
+        utc = nxt.replace(tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+        if utc > after:
+            return utc
+        local = nxt  # repeated wall-clock hour after a DST fall-back
+    return None
+
+
+def next_fires(
+    schedule: CronSchedule,
+    after: datetime,
+    n: int,
+    *,
+    tz: Optional[tzinfo] = None,
+    window=None,
+) -> List[datetime]:
+    """The next ``n`` fires (naive UTC) after ``after``."""
+    out: List[datetime] = []
+    tz = tz or scheduler_tz()
+    while len(out) < n:
+        nxt = next_fire(schedule, after, tz=tz, window=window)
+        if nxt is None:
+            break
+        out.append(nxt)
+        after = nxt
+    return out
@@ -0,0 +1,291 @@
+"""
+core/workflow/dag.py
+--------------------
+
+Run a compiled recipe's steps as a dependency DAG, with independent steps in
+parallel.
+
+``RecipePlan.run()`` executes steps one after another, so a triage run takes
+the sum of all its tool calls.  Steps mostly depend on one another only
+through data: ``create-incident`` reads ``s.sev``, which ``classify`` saves.
+``build_graph()`` infers those edges from what each step's templates read
+(``PlanStep.refs``) and what it saves (``PlanStep.writes``):
+
+- reading ``s.<key>`` depends on the last earlier step that saves ``<key>``
+  (reading all of ``s`` depends on every earlier saving step);
+- reading ``<step id>.result...`` depends on that step;
+- saving ``<key>`` waits for earlier steps that read or save ``<key>``, so
+  the results match a sequential run;
+- ``needs: [step-id, ...]`` adds explicit edges.
+
+``DagExecutor`` runs ready steps on a bounded thread pool
+(``$IPAV_STEP_WORKERS``, default 4).  Each step sees the state as of its
+submission.  Once all its dependencies have finished, that is the same state
+a sequential run would give it.  ``fallback:`` works as in
+``RecipePlan.run``.  A failing step without a fallback stops new
+submissions, lets the running steps finish and re-raises.  Results carry
+per-step offsets and durations, plus the critical path, so the wall time can
+be compared with it.  Steps with ``cache:`` share results through
+``core.workflow.step_cache`` (the recorder's run store, if any).  With a
+recorder each step gets a span, nested under the span open around ``run()``,
+and the run gets a ``cache`` step with its hits and misses.
+
+Scheduled and manual runs (``service.run_now`` ->
+``engine.execute_recipe_run``) use the executor when ``$IPAV_STEP_WORKERS``
+is set above 1, and run steps in order otherwise.
+"""
+from __future__ import annotations
+
+import heapq
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Set, Tuple
+
+from ..recipes.compiler import (
+    CONTEXT_NAMES,
+    PlanResult,
+    PlanStep,
+    RecipePlan,
+    StepOutcome,
+    ToolCall,
+    set_step_result,
+)
+from .step_cache import StepCache, record_cache_summary, step_cache_for
+
+__all__ = ["StepGraph", "DagResult", "DagExecutor", "build_graph", "run_plan"]
+
+
+@dataclass(frozen=True)
+class StepGraph:
+    """Step dependencies as indices into ``steps``."""
+    steps: Tuple[PlanStep, ...]
+    deps: Tuple[FrozenSet[int], ...]
+
+    @property
+    def dependents(self) -> Tuple[Tuple[int, ...], ...]:
+        out: List[List[int]] = [[] for _ in self.steps]
+        for j, deps in enumerate(self.deps):
+            for i in deps:
+                out[i].append(j)
+        return tuple(tuple(d) for d in out)
+
+    def edges(self) -> Dict[str, List[str]]:
+        """``{step id: [ids it waits for]}``, for display and tests."""
+        return {s.id: [self.steps[i].id for i in sorted(d)] for s, d in zip(self.steps, self.deps)}
+
+
+def _step_ref(ref: Tuple[str, ...], ids: Tuple[str, ...]) -> bool:
+    """Does ``ref`` (e.g. ``("act", "create", "result", "sys_id")``) read step ``ids`` (``("act", "create")``)?"""
+    n = min(len(ref), len(ids))
+    return ref[:n] == ids[:n]
+
+
+def build_graph(plan: RecipePlan) -> StepGraph:
+    """Infer the step DAG; raises ValueError on unknown ``needs:`` ids or a cycle."""
+    steps = plan.steps
+    by_id = {s.id: i for i, s in enumerate(steps)}
+    id_parts = [tuple(s.id.split(".")) for s in steps]
+    last_writer: Dict[str, int] = {}
+    readers: Dict[str, List[int]] = {}
+    whole_state_readers: List[int] = []
+    deps: List[Set[int]] = []
+    for j, step in enumerate(steps):
+        d: Set[int] = set()
+        for name in step.needs:
+            if name not in by_id:
+                raise ValueError(f"step {step.id!r} needs unknown step {name!r}")
+            d.add(by_id[name])
+        state_keys: Set[str] = set()
+        reads_all_state = False
+        for ref in step.refs:
+            if ref[0] == "s":
+                if len(ref) == 1:
+                    reads_all_state = True
+                else:
+                    state_keys.add(ref[1])
+            elif ref[0] not in CONTEXT_NAMES:
+                d.update(i for i in range(j) if _step_ref(ref, id_parts[i]))
+        if reads_all_state:
+            d.update(last_writer.values())
+        d.update(last_writer[k] for k in state_keys if k in last_writer)
+        for key in step.writes:
+            d.update(readers.get(key, ()))
+            if key in last_writer:
+                d.add(last_writer[key])
+        if step.writes:
+            d.update(whole_state_readers)
+        d.discard(j)
+        deps.append(d)
+
+        for key in state_keys:
+            readers.setdefault(key, []).append(j)
+        if reads_all_state:
+            whole_state_readers.append(j)
+        for key in step.writes:
+            last_writer[key] = j
+
+    graph = StepGraph(steps, tuple(frozenset(d) for d in deps))
+    _check_acyclic(graph)
+    return graph
+
+
+def _check_acyclic(graph: StepGraph) -> None:
+    order = _topological(graph)
+    if len(order) != len(graph.steps):
+        done = set(order)
+        stuck = [s.id for i, s in enumerate(graph.steps) if i not in done]
+        raise ValueError(f"step dependencies form a cycle: {stuck}")
+
+
+@dataclass
+class DagResult(PlanResult):
+    wall_ms: float = 0.0
+    sum_ms: float = 0.0  # what a sequential run would have spent in steps
+    critical_path_ms: float = 0.0
+    critical_path: List[str] = field(default_factory=list)
+    edges: Dict[str, List[str]] = field(default_factory=dict)
+
+
+def _step_workers() -> int:
+    try:
+        return max(1, int(os.getenv("IPAV_STEP_WORKERS", "4")))
+    except ValueError:
+        return 4
+
+
+class DagExecutor:
+    """Run a ``RecipePlan``'s steps concurrently; see the module docstring."""
+
+    def __init__(
+        self,
+        plan: RecipePlan,
+        *,
+        max_workers: Optional[int] = None,
+        recorder: Any = None,
+        cache: Optional[StepCache] = None,
+    ):
+        self.plan = plan
+        self.graph = build_graph(plan)
+        self.max_workers = max(1, int(max_workers)) if max_workers is not None else _step_workers()
+        self.recorder = recorder  # optional RunStore recorder: one span per step
+        self.cache = cache if cache is not None else step_cache_for(getattr(recorder, "store", None))
+
+    def _execute(self, step: PlanStep, ctx: Dict[str, Any], call: Optional[ToolCall], parent: Any = None):
+        if self.recorder is None:
+            return step.execute(ctx, call, cache=self.cache)
+        # Pool threads have their own span stacks, so the caller's span is passed in.
+        with self.recorder.span(f"step.{step.id}", parent=parent, tool=step.tool.name, action=step.action) as sp:
+            outcomes, saved, result = step.execute(ctx, call, cache=self.cache)
+            sp.set(status=outcomes[0].status, cached=any(o.cached for o in outcomes))
+            return outcomes, saved, result
+
+    def run(
+        self,
+        inputs: Optional[Mapping[str, Any]] = None,
+        *,
+        call: Optional[ToolCall] = None,
+        validate: bool = True,
+    ) -> DagResult:
+        plan, graph = self.plan, self.graph
+        ctx = plan.new_context(plan.bind_inputs(inputs, validate=validate))
+        n = len(graph.steps)
+        remaining = [len(d) for d in graph.deps]
+        dependents = graph.dependents
+        ready = [i for i in range(n) if remaining[i] == 0]
+        heapq.heapify(ready)  # lowest step index first
+        outcomes: Dict[int, List[StepOutcome]] = {}
+        error: Optional[BaseException] = None
+        parent = self.recorder.current_span() if self.recorder is not None else None
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="recipe-step") as pool:
+            running: Dict[Future, Tuple[int, float]] = {}
+            while running or (ready and error is None):
+                while ready and error is None and len(running) < self.max_workers:
+                    i = heapq.heappop(ready)
+                    # set_step_result() copies on write, so sharing the step-result dicts is safe.
+                    snapshot = {**ctx, "s": dict(ctx["s"])}
+                    offset = (time.perf_counter() - start) * 1000.0
+                    running[pool.submit(self._execute, graph.steps[i], snapshot, call, parent)] = (i, offset)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    i, offset = running.pop(fut)
+                    try:
+                        step_outcomes, saved, result = fut.result()
+                    except BaseException as e:
+                        error = error or e
+                        continue
+                    for o in step_outcomes:
+                        o.offset_ms = offset
+                        offset += o.duration_ms
+                    outcomes[i] = step_outcomes
+                    ctx["s"].update(saved)
+                    if step_outcomes[0].status != "skipped":
+                        set_step_result(ctx, graph.steps[i].id, {"result": result})
+                    for j in dependents[i]:
+                        remaining[j] -= 1
+                        if remaining[j] == 0:
+                            heapq.heappush(ready, j)
+        if error is not None:
+            raise error
+
+        base = plan.finish(ctx, [o for i in range(n) for o in outcomes[i]])
+        if self.recorder is not None:
+            record_cache_summary(self.recorder, plan, base.steps)
+        durations = [sum(o.duration_ms for o in outcomes[i]) for i in range(n)]
+        path_ms: List[float] = [0.0] * n
+        prev: List[Optional[int]] = [None] * n
+        for j in _topological(graph):
+            best = max(graph.deps[j], key=lambda i: path_ms[i], default=None)
+            prev[j] = best
+            path_ms[j] = durations[j] + (path_ms[best] if best is not None else 0.0)
+        tail = max(range(n), key=lambda i: path_ms[i], default=None)
+        path: List[str] = []
+        while tail is not None:
+            path.append(graph.steps[tail].id)
+            tail = prev[tail]
+        return DagResult(
+            inputs=base.inputs,
+            state=base.state,
+            steps=base.steps,
+            outputs=base.outputs,
+            checks=base.checks,
+            wall_ms=(time.perf_counter() - start) * 1000.0,
+            sum_ms=sum(durations),
+            critical_path_ms=max(path_ms, default=0.0),
+            critical_path=path[::-1],
+            edges=graph.edges(),
+        )
+
+
+def _topological(graph: StepGraph) -> List[int]:
+    remaining = [len(d) for d in graph.deps]
+    ready = [i for i, n in enumerate(remaining) if n == 0]
+    heapq.heapify(ready)
+    order: List[int] = []
+    dependents = graph.dependents
+    while ready:
+        i = heapq.heappop(ready)
+        order.append(i)
+        for j in dependents[i]:
+            remaining[j] -= 1
+            if remaining[j] == 0:
+                heapq.heappush(ready, j)
+    return order
+
+
+def run_plan(
+    plan: RecipePlan,
+    inputs: Optional[Mapping[str, Any]] = None,
+    *,
+    call: Optional[ToolCall] = None,
+    max_workers: Optional[int] = None,
+    recorder: Any = None,
+    cache: Optional[StepCache] = None,
+    validate: bool = True,
+) -> DagResult:
+    """``DagExecutor(plan, ...).run(inputs, call=call, validate=validate)``."""
+    executor = DagExecutor(plan, max_workers=max_workers, recorder=recorder, cache=cache)
+    return executor.run(inputs, call=call, validate=validate)
@@ -1,16 +1,27 @@
 
 from __future__ import annotations
-from typing import Iterator, Dict, Any
+import contextlib
+import os
+from typing import Iterator, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from ..db.models import Agent, Recipe, Run
+from ..recipes.cache import thaw
+from ..recipes.compiler import PlanResult, RecipePlan, ToolCall, load_recipe_plan
 from ..recipes.service import load_recipe_dict
+from .checkpoints import checkpoint_run
+from .dag import DagResult, _step_workers, run_plan
+from .journal import ExecutionJournal
+from .step_cache import cache_summary, step_cache_for
+from .tool_call import make_tool_call
 # core/workflow/engine.py (top of file)
 try:
-    from ..utils.evidence import attach_json
+    from ..utils.evidence import EvidenceBatch
 except Exception:
     # Fallback: graceful no-op if evidence module can't import
-    def attach_json(db, run_id, obj, **kwargs):
-        return None
+    class EvidenceBatch:  # type: ignore[no-redef]
+        def __init__(self, db, run_id=None, **kwargs): pass
+        def add(self, obj, **kwargs): pass
+        def flush(self): return 0
 
 
 def run_workflow_phases(recipe: Dict[str, Any]) -> Iterator[tuple[str, str]]:
@@ -18,7 +29,95 @@ def run_workflow_phases(recipe: Dict[str, Any]) -> Iterator[tuple[str, str]]:
         steps = recipe.get(phase, []) or []
         yield phase, f"{phase} steps: {len(steps)}"
 
-def execute_recipe_run(db: Session, agent_id: int, recipe_id: int) -> Run:
+def resolve_inputs(recipe: Dict[str, Any], inputs: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Caller inputs over the recipe's declared ``inputs:`` defaults (extra keys are kept)."""
+    declared = recipe.get("inputs") or {}
+    out = {
+        name: spec["default"]
+        for name, spec in declared.items()
+        if isinstance(spec, dict) and "default" in spec
+    }
+    out.update(inputs or {})
+    return out
+
+
+def record_plan_result(record, agent_name: str, plan: RecipePlan, result: PlanResult) -> None:
+    """One ``act`` entry per step outcome and one ``verify`` entry with the checks, outputs and cache hits."""
+    for o in result.steps:
+        record("act", f"{agent_name}: {o.id} {o.status}", payload={
+            "step": o.id, "status": o.status, "cached": o.cached,
+            "duration_ms": round(o.duration_ms, 3), "result": thaw(o.result),
+        })
+    passed = sum(1 for _, ok in result.checks if ok)
+    payload = {
+        "checks": [{"assert": text, "ok": ok} for text, ok in result.checks],
+        "outputs": thaw(result.outputs),
+    }
+    if isinstance(result, DagResult):
+        payload.update(wall_ms=round(result.wall_ms, 3), critical_path=result.critical_path)
+    cache = cache_summary(plan, result.steps)
+    if cache is not None:
+        payload["cache"] = cache
+    record("verify", f"{agent_name}: {passed}/{len(result.checks)} checks passed", payload=payload)
+
+
+def step_workers() -> int:
+    """``$IPAV_STEP_WORKERS`` when it is set above 1, else 1 (steps run in order)."""
+    return _step_workers() if os.getenv("IPAV_STEP_WORKERS") else 1
+
+
+def run_recipe_plan(
+    plan: RecipePlan,
+    inputs: Optional[Dict[str, Any]],
+    *,
+    call: Optional[ToolCall],
+    recorder: Any = None,
+) -> PlanResult:
+    """
+    Execute a compiled recipe's steps (inputs are bound leniently, as
+    ``resolve_inputs`` does), with one span per step on ``recorder``.  With
+    ``step_workers()`` above 1 independent steps run concurrently
+    (``core.workflow.dag``); otherwise they run in order, checkpointed into
+    the recorder's run so a failed run can be resumed
+    (``core.workflow.checkpoints``).
+    """
+    workers = step_workers()
+    if workers > 1:
+        return run_plan(plan, inputs, call=call, max_workers=workers, recorder=recorder, validate=False)
+    if recorder is not None:
+        bound = plan.bind_inputs(inputs, validate=False)
+        return checkpoint_run(recorder, plan, bound, call=call, log_steps=False).result
+    return plan.run(inputs, call=call, validate=False, cache=step_cache_for(None))
+
+
+def execute_recipe_run(
+    db: Session,
+    agent_id: int,
+    recipe_id: int,
+    *,
+    inputs: Optional[Dict[str, Any]] = None,
+    journal: Optional[ExecutionJournal] = None,
+    call: Optional[ToolCall] = None,
+) -> Run:
+    """
+    Run a recipe for an agent and record it as ``RunEvidence``.
+    With a ``journal`` nothing is committed here: the ``Run`` row and its
+    evidence are written by the journal's flush.  The returned ``Run.id`` is
+    None until then: the first flush comes after ``flush_size`` entries or
+    ``flush_interval_s``, at the latest when the ``execution_journal`` block
+    exits.  Read it after the block, or from ``journal.run_id`` once flushed.
+    Without one, a failing run is committed as ``failed`` with the evidence
+    recorded so far.
+
+    Recipes with ``steps:`` are compiled (``load_recipe_plan``) and run
+    with ``call`` (default: ``tool_call.make_tool_call(db)``), concurrently
+    when ``$IPAV_STEP_WORKERS`` is above 1 (``run_recipe_plan``); each step
+    outcome is an ``act`` entry and the assertions and outputs a ``verify``
+    entry.  Phase recipes (``intake``/``plan``/``act``/``verify`` lists)
+    record one entry per phase with its step count.  With a journal each
+    step (``step.<id>``) or phase (``phase.<name>``) also gets a span, and
+    steps run in order are checkpointed (``checkpoints.resume()``).
+    """
     agent = db.get(Agent, agent_id)
     if agent is None:
         raise ValueError(f"Agent {agent_id} not found")
@@ -28,13 +127,39 @@ def execute_recipe_run(db: Session, agent_id: int, recipe_id: int) -> Run:
         raise ValueError(f"Recipe {recipe_id} not found")
 
     run = Run(agent_id=agent_id, recipe_id=recipe_id, status="running")
-    db.add(run); db.commit(); db.refresh(run)
-    recipe_dict = load_recipe_dict(recipe.yaml_path)
-    for phase, message in run_workflow_phases(recipe_dict):
-        attach_json(
-            db,
-            run_id=run.id,
-            obj={"phase": phase, "message": f"{agent.name}: {message}"},
-        )
-    run.status = "completed"; db.commit(); db.refresh(run)
+    if journal is not None:
+        journal.bind_run(run)
+        record = journal.record
+    else:
+        db.add(run); db.commit(); db.refresh(run)
+        batch = EvidenceBatch(db, run.id, commit=False)
+
+        def record(phase: str, message: str, *, payload: Optional[Dict[str, Any]] = None) -> None:
+            batch.add({"phase": phase, "message": message, **(payload or {})})
+
+    try:
+        recipe_dict = load_recipe_dict(recipe.yaml_path)
+        if inputs is not None:
+            record("inputs", "Recipe inputs", payload={"inputs": resolve_inputs(recipe_dict, inputs)})
+        if recipe_dict.get("steps"):
+            plan = load_recipe_plan(recipe_dict)
+            result = run_recipe_plan(
+                plan, inputs, call=make_tool_call(db) if call is None else call,
+                recorder=journal.rec if journal is not None else None,
+            )
+            record_plan_result(record, agent.name, plan, result)
+        else:
+            for phase, message in run_workflow_phases(recipe_dict):
+                with journal.span(f"phase.{phase}") if journal is not None else contextlib.nullcontext():
+                    record(phase, f"{agent.name}: {message}")
+        run.status = "completed"
+    except BaseException:
+        if journal is None:  # the journal marks its own run failed
+            db.rollback()
+            run.status = "failed"
+        raise
+    finally:
+        if journal is None:
+            batch.flush()  # one INSERT, committed with the status
+            db.commit(); db.refresh(run)
     return run
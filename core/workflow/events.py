@@ -0,0 +1,558 @@
+"""
+core/workflow/events.py
+-----------------------
+
+Event-triggered workflows backed by a durable local event queue.
+
+Producers publish ``(topic, payload)`` events with ``publish_event()``, or by
+POSTing JSON to the HTTP endpoint (``make_http_server``).  Events are stored
+in the ``event_queue`` table, so an event is kept even if nothing is
+dispatching when it arrives.  Workflows subscribe with
+``trigger_type="event"`` and a ``trigger_expr`` of comma-separated topic
+globs (``"incident.*, device.alarm.*"``).
+
+``EventDispatcher`` claims pending events in batches (the same atomic
+``UPDATE ... RETURNING`` claim the scheduler uses, so several dispatchers can
+share one database).  It matches each event's topic against the subscribed
+workflows and launches each match with ``run_now(trigger="event")``, passing
+the event payload as the recipe inputs.  Claims are heartbeated while the
+batch runs (``service.claim_heartbeat``), so a long launch is not re-claimed
+by another dispatcher.  A launch takes the workflow's
+``service.workflow_guard`` lock, so it never overlaps a tick or daemon run of
+the same workflow in this process.  If a launch fails (or the workflow is
+busy), the event goes back to the queue with an exponential backoff
+(``available_at``) and only the workflows that have not run yet are retried,
+until ``max_attempts`` is reached.
+
+An event published in this process wakes the dispatcher at once.  Events
+from other processes (the Streamlit app, cron jobs) are seen within
+``poll_interval_s``.
+
+CLI (HTTP endpoint + dispatcher)::
+
+    python -m core.workflow.events --port 8765
+    curl -XPOST localhost:8765/events -d '{"topic": "incident.p1", "payload": {"summary": "Room 4 dark"}}'
+
+Set ``$IPAV_EVENTS_TOKEN`` to require ``Authorization: Bearer <token>``.
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import re
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import JSON, Column, bindparam, DateTime, Index, Integer, String, Table, Text, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from core.db.hotfix_migrations import ensure_event_queue_available_at_column
+from core.db.models import Base
+from core.latency import LatencySketch
+
+from . import service
+
+log = logging.getLogger(__name__)
+
+EVENT_STATUSES = ("pending", "running", "done", "ignored", "failed")
+MAX_BODY_BYTES = 1 << 20
+
+event_queue = Table(
+    "event_queue", Base.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("topic", String(255), nullable=False),
+    Column("payload", JSON, nullable=True),
+    Column("source", String(128), nullable=True),
+    Column("created_at", DateTime(timezone=False), nullable=False),
+    Column("status", String(16), nullable=False, default="pending"),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("claimed_by", String(128), nullable=True),
+    Column("claim_expires_at", DateTime(timezone=False), nullable=True),
+    Column("dispatched_at", DateTime(timezone=False), nullable=True),
+    Column("available_at", DateTime(timezone=False), nullable=True),  # retry backoff; NULL = now
+    Column("runs", JSON, nullable=True),  # workflow ids launched for this event
+    Column("error", Text, nullable=True),
+    Index("ix_event_queue_status_id", "status", "id"),
+)
+
+_READY: Set[str] = set()
+_READY_LOCK = threading.Lock()
+# Wakes in-process dispatchers as soon as an event is published; the
+# sequence number lets a dispatcher see publishes that landed mid-batch.
+_PUBLISHED = threading.Condition()
+_published_seq = 0
+
+
+def _table(db: Session) -> Table:
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _READY:
+        with _READY_LOCK:
+            event_queue.create(bind=bind, checkfirst=True)
+            ensure_event_queue_available_at_column(bind)
+            _READY.add(key)
+    return event_queue
+
+
+# --------------------------------------------------------------------------------------
+# Ingestion
+
+def publish_events(db: Session, events: Iterable[Dict[str, Any]], *, source: Optional[str] = None) -> List[int]:
+    """
+    Durably enqueue ``{"topic": ..., "payload": ..., "source": ...}`` events in
+    one transaction; return their ids.  Raises ValueError for a missing topic.
+    """
+    tbl = _table(db)
+    now = service._utcnow()
+    rows = []
+    for ev in events:
+        topic = str(ev.get("topic") or "").strip()
+        if not topic:
+            raise ValueError("Event needs a non-empty 'topic'.")
+        rows.append({
+            "topic": topic,
+            "payload": ev.get("payload"),
+            "source": ev.get("source") or source,
+            "created_at": now,
+            "status": "pending",
+            "attempts": 0,
+        })
+    if not rows:
+        return []
+    ids = db.execute(insert(tbl).returning(tbl.c.id, sort_by_parameter_order=True), rows).scalars().all()
+    db.commit()
+    global _published_seq
+    with _PUBLISHED:
+        _published_seq += 1
+        _PUBLISHED.notify_all()
+    return [int(i) for i in ids]
+
+
+def publish_event(
+    db: Session, topic: str, payload: Any = None, *, source: Optional[str] = None
+) -> int:
+    """Durably enqueue one event and wake in-process dispatchers; return its id."""
+    return publish_events(db, [{"topic": topic, "payload": payload}], source=source)[0]
+
+
+def queue_depth(db: Session) -> Dict[str, int]:
+    """Event counts by status."""
+    tbl = _table(db)
+    rows = db.execute(select(tbl.c.status, func.count()).group_by(tbl.c.status)).all()
+    return {status: int(n) for status, n in rows}
+
+
+def prune_events(db: Session, *, older_than_s: float = 7 * 24 * 3600.0) -> int:
+    """Delete finished (done/ignored/failed) events older than ``older_than_s``."""
+    tbl = _table(db)
+    cutoff = service._utcnow() - timedelta(seconds=older_than_s)
+    n = db.execute(
+        delete(tbl).where(tbl.c.status.in_(("done", "ignored", "failed")), tbl.c.created_at < cutoff)
+    ).rowcount
+    db.commit()
+    return n or 0
+
+
+# --------------------------------------------------------------------------------------
+# Subscriptions
+
+class Subscriptions:
+    """Topic -> workflow ids for enabled event workflows (exact topics hashed, globs scanned)."""
+
+    def __init__(self, workflows: Iterable[Any] = ()):
+        self.exact: Dict[str, List[int]] = {}
+        self.globs: List[Tuple[re.Pattern, int]] = []
+        self._cache: Dict[str, List[int]] = {}
+        for wf in workflows:
+            if service._getattr_or(wf, "trigger_type") != "event":
+                continue
+            if not int(service._getattr_or(wf, "enabled", 1) or 0):
+                continue
+            wf_id = int(service._getattr_or(wf, "id"))
+            for pattern in service.parse_topics(service._getattr_or(wf, "trigger_expr")):
+                if any(ch in pattern for ch in "*?["):
+                    self.globs.append((re.compile(fnmatch.translate(pattern)), wf_id))
+                else:
+                    self.exact.setdefault(pattern, []).append(wf_id)
+
+    def __len__(self) -> int:
+        return len({i for ids in self.exact.values() for i in ids} | {i for _, i in self.globs})
+
+    def match(self, topic: str) -> List[int]:
+        """Workflow ids subscribed to ``topic`` (each at most once, in id order)."""
+        hit = self._cache.get(topic)
+        if hit is None:
+            ids = set(self.exact.get(topic, ()))
+            ids.update(wf_id for rx, wf_id in self.globs if rx.match(topic))
+            hit = self._cache[topic] = sorted(ids)
+        return hit
+
+
+# --------------------------------------------------------------------------------------
+# Dispatch
+
+@dataclass
+class DispatchStats:
+    claimed: int = 0
+    dispatched: int = 0  # events whose subscribers all ran
+    ignored: int = 0  # events with no subscriber
+    retried: int = 0
+    failed: int = 0  # events that ran out of attempts
+    runs: int = 0
+    latency: LatencySketch = field(default_factory=LatencySketch)  # publish -> launch (ms)
+
+    def summary(self) -> Dict[str, Any]:
+        out = {k: v for k, v in self.__dict__.items() if k != "latency"}
+        out.update(self.latency.percentiles())
+        return out
+
+
+def heartbeat_events(
+    db: Session, event_ids, *, worker_id: str = service.WORKER_ID, lease_s: float = service.CLAIM_LEASE_S
+) -> int:
+    """Extend ``worker_id``'s claims on ``event_ids``; return how many are still held."""
+    tbl = _table(db)
+    ids = [int(i) for i in event_ids]
+    if not ids:
+        return 0
+    n = db.execute(
+        update(tbl)
+        .where(tbl.c.id.in_(ids), tbl.c.status == "running", tbl.c.claimed_by == worker_id)
+        .values(claim_expires_at=service._utcnow() + timedelta(seconds=lease_s))
+    ).rowcount
+    db.commit()
+    return n or 0
+
+
+class WorkflowBusy(RuntimeError):
+    """The workflow is already running in this process; the event is retried later."""
+
+
+class EventDispatcher:
+    """
+    Claim pending events and launch their subscribed workflows.
+
+    ``launch(wf_id, event)`` runs one workflow for one event (``event`` is a
+    dict with id/topic/payload/source/created_at).  The default calls
+    ``service.run_now(..., trigger="event", inputs=<payload>)`` in a fresh
+    session, under the workflow's ``workflow_guard``.  With ``max_workers``
+    > 1 the events of a batch are launched concurrently.  A failed event is
+    retried after ``retry_backoff_s * 2 ** (attempts - 1)`` seconds (capped at
+    ``max_backoff_s``).
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        launch: Optional[Callable[[int, Dict[str, Any]], Any]] = None,
+        worker_id: str = service.WORKER_ID,
+        batch_size: int = 100,
+        max_workers: int = 1,
+        max_attempts: int = 3,
+        lease_s: float = service.CLAIM_LEASE_S,
+        poll_interval_s: float = 0.5,
+        reload_interval_s: float = 60.0,
+        retry_backoff_s: float = 5.0,
+        max_backoff_s: float = 300.0,
+    ):
+        self.session_factory = session_factory
+        self.launch = launch or self._run_workflow
+        self.worker_id = worker_id
+        self.batch_size = max(1, int(batch_size))
+        self.max_workers = max(1, int(max_workers))
+        self.max_attempts = max(1, int(max_attempts))
+        self.lease_s = float(lease_s)
+        self.poll_interval_s = max(0.01, float(poll_interval_s))
+        self.reload_interval_s = max(1.0, float(reload_interval_s))
+        self.retry_backoff_s = max(0.0, float(retry_backoff_s))
+        self.max_backoff_s = max(self.retry_backoff_s, float(max_backoff_s))
+        self.stats = DispatchStats()
+        self._stats_lock = threading.Lock()
+
+        self._subs: Optional[Subscriptions] = None
+        self._loaded_at = float("-inf")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- Subscriptions -------------------------------------------------------
+    def request_reload(self, _wf_id: Optional[int] = None) -> None:
+        """Drop cached subscriptions (service change listener)."""
+        self._subs = None
+
+    def subscriptions(self) -> Subscriptions:
+        if self._subs is None or time.monotonic() - self._loaded_at >= self.reload_interval_s:
+            with self.session_factory() as db:
+                self._subs = Subscriptions(service.list_workflows(db))
+            self._loaded_at = time.monotonic()
+        return self._subs
+
+    # ---- Claim / finish ------------------------------------------------------
+    def _claim(self, db: Session) -> List[Dict[str, Any]]:
+        tbl = _table(db)
+        now = service._utcnow()
+        claimable = (
+            (tbl.c.status == "pending") & (tbl.c.available_at.is_(None) | (tbl.c.available_at <= now))
+        ) | ((tbl.c.status == "running") & (tbl.c.claim_expires_at < now))
+        pick = select(tbl.c.id).where(claimable).order_by(tbl.c.id).limit(self.batch_size)
+        rows = db.execute(
+            update(tbl)
+            .where(tbl.c.id.in_(pick.scalar_subquery()), claimable)
+            .values(
+                status="running",
+                claimed_by=self.worker_id,
+                claim_expires_at=now + timedelta(seconds=self.lease_s),
+                attempts=tbl.c.attempts + 1,
+            )
+            .returning(
+                tbl.c.id, tbl.c.topic, tbl.c.payload, tbl.c.source,
+                tbl.c.created_at, tbl.c.attempts, tbl.c.runs,
+            )
+        ).all()
+        db.commit()
+        return sorted((dict(r._mapping) for r in rows), key=lambda ev: ev["id"])
+
+    def _process(self, ev: Dict[str, Any], subs: Subscriptions) -> Dict[str, Any]:
+        """Launch ``ev``'s pending subscribers; return the row update for the event."""
+        done = list(ev.get("runs") or [])
+        targets = [wf_id for wf_id in subs.match(ev["topic"]) if wf_id not in done]
+        if not targets and not done:
+            return {"status": "ignored", "runs": []}
+        queued_ms = max(0.0, (service._utcnow() - ev["created_at"]).total_seconds() * 1000.0)
+        with self._stats_lock:
+            self.stats.latency.add(queued_ms, len(targets))
+        error: Optional[str] = None
+        for wf_id in targets:
+            try:
+                self.launch(wf_id, ev)
+                done.append(wf_id)
+                with self._stats_lock:
+                    self.stats.runs += 1
+            except Exception as e:
+                log.exception("event %s: workflow %s failed", ev["id"], wf_id)
+                error = f"workflow {wf_id}: {type(e).__name__}: {e}"
+        if error is None:
+            return {"status": "done", "runs": done, "error": None}
+        if int(ev["attempts"]) >= self.max_attempts:
+            return {"status": "failed", "runs": done, "error": error}
+        return {"status": "pending", "runs": done, "error": error}
+
+    def dispatch_pending(self) -> int:
+        """Claim and dispatch one batch of events; return how many were claimed."""
+        subs = self.subscriptions()
+        with self.session_factory() as db:
+            events = self._claim(db)
+        if not events:
+            return 0
+        self.stats.claimed += len(events)
+        with service.claim_heartbeat(
+            self.session_factory, worker_id=self.worker_id, lease_s=self.lease_s, renew=heartbeat_events
+        ) as alive:
+            alive.update(ev["id"] for ev in events)
+            if self.max_workers > 1 and len(events) > 1:
+                with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="events") as pool:
+                    results = list(pool.map(lambda ev: self._process(ev, subs), events))
+            else:
+                results = [self._process(ev, subs) for ev in events]
+
+        now = service._utcnow()
+        params = []
+        for ev, res in zip(events, results):
+            status = res["status"]
+            if status == "done":
+                self.stats.dispatched += 1
+            elif status == "ignored":
+                self.stats.ignored += 1
+            elif status == "pending":
+                self.stats.retried += 1
+            else:
+                self.stats.failed += 1
+            params.append({
+                "ev_id": ev["id"],
+                "status": status,
+                "runs": res["runs"],
+                "error": res.get("error"),
+                "dispatched_at": now if status != "pending" else None,
+                "available_at": now + timedelta(seconds=self._backoff_s(ev["attempts"])) if status == "pending" else None,
+            })
+        tbl = event_queue
+        with self.session_factory() as db:
+            # One executemany for the whole batch.
+            db.execute(
+                update(tbl)
+                .where(tbl.c.id == bindparam("ev_id"), tbl.c.claimed_by == self.worker_id)
+                .values(
+                    status=bindparam("status"),
+                    runs=bindparam("runs", type_=JSON),
+                    error=bindparam("error"),
+                    dispatched_at=bindparam("dispatched_at"),
+                    available_at=bindparam("available_at"),
+                    claimed_by=None,
+                    claim_expires_at=None,
+                )
+                .execution_options(synchronize_session=False),
+                params,
+            )
+            db.commit()
+        return len(events)
+
+    def _backoff_s(self, attempts: int) -> float:
+        return min(self.max_backoff_s, self.retry_backoff_s * 2 ** max(0, int(attempts) - 1))
+
+    def _run_workflow(self, wf_id: int, event: Dict[str, Any]) -> None:
+        payload = event.get("payload")
+        inputs = payload if isinstance(payload, dict) else {"payload": payload}
+        with service.workflow_guard(wf_id) as ok:
+            if not ok:
+                raise WorkflowBusy(f"workflow {wf_id} is already running")
+            with self.session_factory() as db:
+                service.run_now(
+                    db,
+                    wf_id,
+                    trigger="event",
+                    inputs=inputs,
+                    meta={"event_id": event["id"], "event_topic": event["topic"], "event_source": event.get("source")},
+                )
+
+    # ---- Loop ------------------------------------------------------------------
+    def run_forever(self) -> None:
+        service.add_change_listener(self.request_reload)
+        try:
+            while not self._stop.is_set():
+                seen = _published_seq
+                try:
+                    claimed = self.dispatch_pending()
+                except Exception:
+                    log.exception("event dispatch failed")
+                    claimed = 0
+                if claimed >= self.batch_size:
+                    continue  # more may be waiting
+                with _PUBLISHED:
+                    if not self._stop.is_set() and _published_seq == seen:
+                        _PUBLISHED.wait(self.poll_interval_s)
+        finally:
+            service.remove_change_listener(self.request_reload)
+
+    def start(self) -> "EventDispatcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="event-dispatcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        self._stop.set()
+        with _PUBLISHED:
+            _PUBLISHED.notify_all()
+        if self._thread is not None and timeout != 0:
+            self._thread.join(timeout)
+
+
+# --------------------------------------------------------------------------------------
+# HTTP endpoint
+
+class _EventHandler(BaseHTTPRequestHandler):
+    server_version = "ipav-events/1"
+
+    def _reply(self, code: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        token = self.server.token  # type: ignore[attr-defined]
+        return not token or self.headers.get("Authorization", "") == f"Bearer {token}"
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.rstrip("/") != "/healthz":
+            return self._reply(404, {"error": "not found"})
+        with self.server.session_factory() as db:  # type: ignore[attr-defined]
+            self._reply(200, {"ok": True, "queue": queue_depth(db)})
+
+    def do_POST(self) -> None:  # noqa: N802
+        if self.path.rstrip("/") != "/events":
+            return self._reply(404, {"error": "not found"})
+        if not self._authorized():
+            return self._reply(401, {"error": "unauthorized"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            return self._reply(413 if length else 400, {"error": "body must be 1 byte to 1 MiB of JSON"})
+        try:
+            body = json.loads(self.rfile.read(length))
+            events = body if isinstance(body, list) else [body]
+            if not all(isinstance(ev, dict) for ev in events):
+                raise ValueError("expected an event object or a list of them")
+            with self.server.session_factory() as db:  # type: ignore[attr-defined]
+                ids = publish_events(db, events, source=self.headers.get("X-Event-Source") or "http")
+        except ValueError as e:  # includes JSONDecodeError
+            return self._reply(400, {"error": str(e)})
+        self._reply(202, {"ids": ids})
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        log.debug("%s " + fmt, self.address_string(), *args)
+
+
+def make_http_server(
+    session_factory: Callable[[], Session],
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    *,
+    token: Optional[str] = None,
+) -> ThreadingHTTPServer:
+    """
+    ``POST /events`` (an event object or a list) -> 202 ``{"ids": [...]}``;
+    ``GET /healthz`` -> queue depth.  Call ``serve_forever()`` on the result.
+    """
+    server = ThreadingHTTPServer((host, port), _EventHandler)
+    server.daemon_threads = True
+    server.session_factory = session_factory  # type: ignore[attr-defined]
+    server.token = token if token is not None else os.getenv("IPAV_EVENTS_TOKEN")  # type: ignore[attr-defined]
+    return server
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from core.db.session import SessionLocal
+
+    ap = argparse.ArgumentParser(description="Accept events over HTTP and run subscribed workflows.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=1, help="Events launched concurrently per batch")
+    ap.add_argument("--poll-interval", type=float, default=0.5, help="Queue poll period (seconds)")
+    ap.add_argument("--no-http", action="store_true", help="Only dispatch; do not listen")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    dispatcher = EventDispatcher(
+        SessionLocal, max_workers=args.workers, poll_interval_s=args.poll_interval
+    ).start()
+    server = None if args.no_http else make_http_server(SessionLocal, args.host, args.port)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        if server is not None:
+            threading.Thread(target=server.serve_forever, name="events-http", daemon=True).start()
+            log.info("listening on http://%s:%d/events", args.host, args.port)
+        while not stop.wait(60.0):
+            log.info("events: %s", dispatcher.stats.summary())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.shutdown()
+        dispatcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+core/workflow/journal.py
+------------------------
+
+Execution journal: one buffered record of a workflow execution, written as
+one transaction per database per flush window.
+
+Without it, a four-phase ``run_now()`` commits about ten times across two
+files:
+- ``sma_av_ai_ops.db``: the ``Run`` row, each evidence row and the status;
+- ``avops.db``: the run start, the step and the run end.
+
+Inside a journal the engine records each entry (phase, message, payload)
+once, and both views are derived from it when the journal flushes:
+
+- app DB: the ``Run`` row, ``RunEvidence`` rows and the workflow's
+  last/next run columns, in one commit;
+- run store: ``WorkflowRun``, ``StepEvent`` and span rows through
+  ``RunStore.workflow_run(deferred=True)``, in one commit.
+
+A run shorter than ``flush_interval_s`` therefore costs one commit per
+database.  Longer runs flush every window, so progress stays visible.  The
+two databases are separate SQLite files, so the pair of commits is not
+atomic.  The app DB commits first.
+"""
+from __future__ import annotations
+
+import contextlib
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..runs_store import RunJournal, RunStore
+
+try:
+    from ..utils.evidence import attach_many
+except Exception:
+    # Fallback: graceful no-op if evidence module can't import
+    def attach_many(db, items, **kwargs):
+        return 0
+
+
+class ExecutionJournal:
+    """Entries of one execution; see the module docstring. Use ``execution_journal()``."""
+
+    def __init__(
+        self,
+        db: Session,
+        rec: RunJournal,
+        *,
+        flush_size: int = 100,
+        flush_interval_s: float = 1.0,
+    ):
+        self.db = db
+        self.rec = rec
+        self.run: Any = None  # app-DB Run row, inserted at the first flush
+        self.flush_size = max(1, int(flush_size))
+        self.flush_interval_s = float(flush_interval_s)
+        self.app_commits = 0
+        self._evidence: List[Tuple[Any, Optional[str], str]] = []
+        self._last_flush = time.monotonic()
+
+    @property
+    def run_id(self) -> Optional[int]:
+        return getattr(self.run, "id", None)
+
+    def bind_run(self, run: Any) -> None:
+        """Attach the (not yet added) ``Run`` row this execution reports into."""
+        self.run = run
+
+    # ---- Entries ---------------------------------------------------------------
+    def record(
+        self,
+        phase: str,
+        message: str,
+        *,
+        payload: Optional[Dict[str, Any]] = None,
+        result: Optional[Dict[str, Any]] = None,
+        level: str = "info",
+        status: str = "ok",
+    ) -> None:
+        """One entry -> a ``StepEvent`` and a ``RunEvidence`` row (``{"phase", "message", **payload}``)."""
+        self.rec.step(phase, message, level=level, status=status, payload=payload, result=result)
+        self._evidence.append(({"phase": phase, "message": message, **(payload or {})}, None, "json"))
+        self._maybe_flush()
+
+    def step(self, phase: str, message: str, **kwargs: Any) -> None:
+        """Run-store step only (no evidence row)."""
+        self.rec.step(phase, message, **kwargs)
+        self._maybe_flush()
+
+    def evidence(self, obj: Any, *, label: Optional[str] = None, kind: str = "json") -> None:
+        """App-DB evidence only (no step)."""
+        self._evidence.append((obj, label, kind))
+        self._maybe_flush()
+
+    def span(self, name: str, **attrs: Any):
+        return self.rec.span(name, **attrs)
+
+    # ---- Flushing ----------------------------------------------------------------
+    def _maybe_flush(self) -> None:
+        if (
+            len(self._evidence) >= self.flush_size
+            or time.monotonic() - self._last_flush >= self.flush_interval_s
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write everything queued so far (app DB, then run store)."""
+        self.flush_app()
+        self.rec.flush()
+
+    def flush_app(self) -> None:
+        """Insert the Run row (first time) and queued evidence, plus any staged changes, in one commit."""
+        self._last_flush = time.monotonic()
+        evidence, self._evidence = self._evidence, []
+        if self.run is not None:
+            self.db.add(self.run)
+            self.db.flush()
+            attach_many(
+                self.db, [(self.run.id, obj, label, kind) for obj, label, kind in evidence], commit=False
+            )
+        self.db.commit()
+        self.app_commits += 1
+
+
+@contextlib.contextmanager
+def execution_journal(
+    db: Session,
+    store: RunStore,
+    *,
+    workflow_id: str,
+    name: str,
+    agent_id: Optional[int],
+    recipe_id: Optional[int],
+    trigger: str = "manual",
+    meta: Optional[Dict[str, Any]] = None,
+    flush_size: int = 100,
+    flush_interval_s: float = 1.0,
+) -> Iterator[ExecutionJournal]:
+    """
+    Journal one execution.  Changes staged on ``db`` inside the block (e.g.
+    the workflow's ``last_run_at``) are committed with the final app-DB
+    flush.  On error the ``Run`` is marked failed and both views still get
+    what was recorded.
+    """
+    with store.workflow_run(
+        workflow_id=workflow_id,
+        name=name,
+        agent_id=agent_id,
+        recipe_id=recipe_id,
+        trigger=trigger,
+        meta=meta,
+        deferred=True,
+        flush_size=flush_size,
+        flush_interval_s=flush_interval_s,
+    ) as rec:
+        journal = ExecutionJournal(db, rec, flush_size=flush_size, flush_interval_s=flush_interval_s)
+        try:
+            yield journal
+        except BaseException:
+            db.rollback()  # drop half-staged changes; keep the journal's own rows
+            if journal.run is not None and getattr(journal.run, "status", None) == "running":
+                journal.run.status = "failed"
+            try:
+                journal.flush_app()
+            except Exception:
+                db.rollback()
+            raise
+        journal.flush_app()
@@ -0,0 +1,371 @@
+"""
+core/workflow/scheduler.py
+--------------------------
+
+Resident scheduler for interval and cron workflows.
+
+``tick()`` scans the workflows table and runs whatever is due, so scheduled
+workflows only fire when something calls it.  ``SchedulerDaemon`` instead
+loads the enabled interval/cron workflows once into a min-heap of next fire
+times and sleeps until the earliest one.  The database is not polled between
+fires.  Cron fires come from ``core.workflow.cron`` and honour the agent's
+maintenance window.
+
+- **Missed fires.**  After downtime or a slow run, the workflow runs once and
+  its next fire moves to the first future slot on its original grid or cron
+  calendar (``misfire="coalesce"``).  With ``misfire="skip"`` the late fire is dropped
+  when it is more than ``misfire_grace_s`` late.
+- **Jitter.**  Each fire is delayed by a random ``0..jitter_s`` seconds so that
+  workflows sharing an interval don't all start in the same instant.  The
+  grid itself does not drift.
+- **Replicas.**  Each fire claims its workflow row first, so several daemons
+  (or ``tick()`` callers) on one database never double-fire.  ``--leader``
+  also elects a single active daemon through a renewable lease.
+- **Reloads.**  Edits made through ``core.workflow.service`` in this process
+  wake the daemon right away.  Edits from other processes (e.g. the
+  Streamlit app) are picked up by a full reload every ``reload_interval_s``,
+  or on SIGHUP when run from the CLI.
+
+CLI::
+
+    python -m core.workflow.scheduler --jitter 5 --reload-interval 60
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import logging
+import random
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import cron, service
+
+log = logging.getLogger(__name__)
+
+MISFIRE_POLICIES = ("coalesce", "skip")
+
+
+@dataclass
+class SchedulerStats:
+    reloads: int = 0
+    fired: int = 0
+    failed: int = 0
+    skipped: int = 0  # late fires dropped under misfire="skip", or still running
+    coalesced: int = 0  # missed slots folded into a single run
+
+
+# Cron slots counted one by one when coalescing; beyond this jump straight to now.
+_MAX_COALESCE_SLOTS = 1440
+
+
+@dataclass
+class _Job:
+    wf_id: int
+    interval: Optional[timedelta]
+    due: datetime  # grid time of the pending fire (naive UTC)
+    schedule: Optional[cron.CronSchedule] = None
+    window: Optional[object] = None  # MaintenanceWindow for cron fires
+
+    def advance(self, now: datetime) -> Tuple[Optional[datetime], int]:
+        """First slot strictly after ``now`` and how many slots were due (>= 1)."""
+        if self.interval is not None:
+            slots = int((now - self.due) / self.interval) + 1
+            return self.due + slots * self.interval, slots
+        nxt, slots = cron.next_fire(self.schedule, self.due, window=self.window), 1
+        while nxt is not None and nxt <= now:
+            if slots >= _MAX_COALESCE_SLOTS:
+                return cron.next_fire(self.schedule, now, window=self.window), slots
+            nxt = cron.next_fire(self.schedule, nxt, window=self.window)
+            slots += 1
+        return nxt, slots
+
+
+class SchedulerDaemon:
+    """
+    Heap-driven scheduler for enabled interval and cron workflows.
+
+    ``dispatch(wf_id)`` runs one workflow (returning False counts as skipped).
+    The default takes the workflow's ``service.workflow_guard`` lock, claims
+    the workflow in the database for ``worker_id`` (heartbeated, released
+    afterwards), then calls ``service.run_now(..., trigger=None)``, which
+    records the workflow's ``trigger_type`` (interval or cron).  A
+    slot that another daemon or replica already ran is skipped.  With
+    ``leader_lease`` set, only the daemon holding that named lease fires and
+    the others stand by.
+    Use ``start()``/``stop()`` for a background thread, or ``run_forever()``
+    in the foreground.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        dispatch: Optional[Callable[[int], Optional[bool]]] = None,
+        jitter_s: float = 0.0,
+        misfire: str = "coalesce",
+        misfire_grace_s: float = 60.0,
+        reload_interval_s: float = 300.0,
+        clock: Callable[[], datetime] = service._utcnow,
+        worker_id: str = service.WORKER_ID,
+        lease_s: float = service.CLAIM_LEASE_S,
+        leader_lease: Optional[str] = None,
+        leader_ttl_s: float = 30.0,
+    ):
+        if misfire not in MISFIRE_POLICIES:
+            raise ValueError(f"misfire must be one of {MISFIRE_POLICIES}")
+        self.session_factory = session_factory
+        self.dispatch = dispatch or self._run_workflow
+        self.jitter_s = max(0.0, float(jitter_s))
+        self.misfire = misfire
+        self.misfire_grace_s = float(misfire_grace_s)
+        self.reload_interval_s = max(1.0, float(reload_interval_s))
+        self.clock = clock
+        self.worker_id = worker_id
+        self.lease_s = float(lease_s)
+        self.leader_lease = leader_lease
+        self.leader_ttl_s = max(3.0, float(leader_ttl_s))
+        self.is_leader = False
+        self.stats = SchedulerStats()
+
+        self._jobs: Dict[int, _Job] = {}
+        self._heap: List[Tuple[datetime, int, datetime]] = []  # (fire_at, wf_id, due)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._dirty = False
+        self._last_reload = float("-inf")
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- Schedule state ------------------------------------------------------
+    def reload(self) -> int:
+        """Rebuild the heap from the workflows table; return the number of jobs."""
+        # Cleared before reading, so an edit made while we read triggers another reload.
+        self._dirty = False
+        with self.session_factory() as db:
+            workflows = service.list_workflows(db)
+            windows = service._agent_windows(db)
+        now = self.clock()
+        jobs: Dict[int, _Job] = {}
+        for wf in workflows:
+            ttype = service._getattr_or(wf, "trigger_type")
+            if ttype not in service.SCHEDULED_TRIGGERS:
+                continue
+            if not int(service._getattr_or(wf, "enabled", 1) or 0):
+                continue
+            wf_id = int(service._getattr_or(wf, "id"))
+            pending = service._getattr_or(wf, "next_run_at")
+            if ttype == "interval":
+                minutes = service._getattr_or(wf, "trigger_value")
+                if not minutes:
+                    continue
+                due = pending or service._compute_next_run("interval", minutes, after=now)
+                jobs[wf_id] = _Job(wf_id, timedelta(minutes=int(minutes)), due)
+                continue
+            try:
+                schedule = cron.parse_cron(service._getattr_or(wf, "trigger_expr") or "")
+            except ValueError as e:
+                log.warning("workflow %s: %s; not scheduled", wf_id, e)
+                continue
+            window = windows.get(int(service._getattr_or(wf, "agent_id") or 0))
+            due = pending or cron.next_fire(schedule, now, window=window)
+            if due is not None:
+                jobs[wf_id] = _Job(wf_id, None, due, schedule, window)
+        with self._lock:
+            self._jobs = jobs
+            self._heap = [(self._fire_at(j.due), j.wf_id, j.due) for j in jobs.values()]
+            heapq.heapify(self._heap)
+            self._last_reload = time.monotonic()
+            self.stats.reloads += 1
+        return len(jobs)
+
+    def next_fire(self) -> Optional[datetime]:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def _fire_at(self, due: datetime) -> datetime:
+        if not self.jitter_s:
+            return due
+        return due + timedelta(seconds=random.uniform(0.0, self.jitter_s))
+
+    # ---- Firing --------------------------------------------------------------
+    def run_pending(self, now: Optional[datetime] = None) -> int:
+        """Dispatch every job whose fire time has passed; return runs dispatched."""
+        now = now or self.clock()
+        fired = 0
+        while True:
+            with self._lock:
+                if not self._heap or self._heap[0][0] > now:
+                    return fired
+                _fire_at, wf_id, due = heapq.heappop(self._heap)
+                job = self._jobs.get(wf_id)
+                if job is None or job.due != due:
+                    continue  # stale entry (job removed or rescheduled by a reload)
+                # First slot strictly after now; every slot skipped is a missed fire.
+                next_due, slots = job.advance(now)
+                if next_due is None:
+                    del self._jobs[wf_id]  # cron calendar has no further fires
+                else:
+                    job.due = next_due
+                    heapq.heappush(self._heap, (self._fire_at(job.due), wf_id, job.due))
+            late_s = (now - due).total_seconds()
+            if self.misfire == "skip" and late_s > self.misfire_grace_s:
+                self.stats.skipped += 1
+                log.info("workflow %s: skipped fire due %s (%.0fs late)", wf_id, due, late_s)
+            else:
+                self.stats.coalesced += slots - 1
+                try:
+                    if self.dispatch(wf_id) is False:
+                        self.stats.skipped += 1  # previous run still in progress
+                    else:
+                        self.stats.fired += 1
+                        fired += 1
+                except Exception:
+                    self.stats.failed += 1
+                    log.exception("workflow %s: scheduled run failed", wf_id)
+            self._persist_next(wf_id, next_due)
+
+    def _run_workflow(self, wf_id: int) -> bool:
+        with service.workflow_guard(wf_id) as acquired:
+            if not acquired:
+                log.info("workflow %s: previous run still in progress; skipped", wf_id)
+                return False
+            with self.session_factory() as db:
+                # The claim stops other daemons/replicas from firing the same slot.
+                if not service.claim_workflow(db, wf_id, worker_id=self.worker_id, lease_s=self.lease_s):
+                    log.info("workflow %s: claimed by another worker; skipped", wf_id)
+                    return False
+                error: Optional[Exception] = None
+                with service.claim_heartbeat(
+                    self.session_factory, worker_id=self.worker_id, lease_s=self.lease_s
+                ) as alive:
+                    alive.add(wf_id)
+                    try:
+                        service.run_now(db, wf_id, trigger=None)
+                    except Exception as e:
+                        db.rollback()
+                        error = e
+                service.release_workflow(db, wf_id, worker_id=self.worker_id, advance=error is not None)
+            if error is not None:
+                raise error
+            return True
+
+    def _persist_next(self, wf_id: int, next_due: Optional[datetime]) -> None:
+        """Write the grid-aligned next fire back so the UI shows it (run_now sets now+interval)."""
+        try:
+            with self.session_factory() as db:
+                service.reschedule_workflow(db, wf_id, next_due)
+        except Exception:
+            log.exception("workflow %s: could not persist next_run_at", wf_id)
+
+    # ---- Loop ------------------------------------------------------------------
+    def request_reload(self, _wf_id: Optional[int] = None) -> None:
+        """Mark the schedule stale and wake the loop (service change listener)."""
+        self._dirty = True
+        self._wake.set()
+
+    def _renew_leadership(self) -> bool:
+        """Hold ``leader_lease`` (if configured); reload when taking over from another daemon."""
+        if not self.leader_lease:
+            return True
+        try:
+            with self.session_factory() as db:
+                leader = service.acquire_lease(
+                    db, self.leader_lease, holder=self.worker_id, ttl_s=self.leader_ttl_s
+                )
+        except Exception:
+            log.exception("could not renew scheduler lease %r", self.leader_lease)
+            leader = False
+        if leader and not self.is_leader:
+            log.info("acquired scheduler lease %r", self.leader_lease)
+            self._dirty = True  # the previous leader moved next_run_at on
+        self.is_leader = leader
+        return leader
+
+    def run_forever(self) -> None:
+        service.add_change_listener(self.request_reload)
+        try:
+            self.reload()
+            while not self._stop.is_set():
+                leader = self._renew_leadership()
+                if self._dirty or time.monotonic() - self._last_reload >= self.reload_interval_s:
+                    self.reload()
+                if leader:
+                    self.run_pending()
+                self._wake.wait(self._sleep_seconds(leader))
+                self._wake.clear()
+        finally:
+            service.remove_change_listener(self.request_reload)
+            if self.leader_lease and self.is_leader:
+                try:
+                    with self.session_factory() as db:
+                        service.release_lease(db, self.leader_lease, holder=self.worker_id)
+                except Exception:
+                    pass
+                self.is_leader = False
+
+    def _sleep_seconds(self, leader: bool = True) -> float:
+        until_reload = self.reload_interval_s - (time.monotonic() - self._last_reload)
+        if self.leader_lease:
+            # Renew well inside the TTL; standbys re-check at the same pace.
+            until_reload = min(until_reload, self.leader_ttl_s / 3.0)
+            if not leader:
+                return max(0.0, until_reload)
+        nxt = self.next_fire()
+        if nxt is None:
+            return max(0.0, until_reload)
+        until_fire = (nxt - self.clock()).total_seconds()
+        return max(0.0, min(until_fire, until_reload))
+
+    def start(self) -> "SchedulerDaemon":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="workflow-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from core.db.session import SessionLocal
+
+    ap = argparse.ArgumentParser(description="Run interval workflows on schedule.")
+    ap.add_argument("--jitter", type=float, default=0.0, help="Max random delay per fire (seconds)")
+    ap.add_argument("--misfire", choices=MISFIRE_POLICIES, default="coalesce")
+    ap.add_argument("--misfire-grace", type=float, default=60.0, help="Seconds late before 'skip' drops a fire")
+    ap.add_argument("--reload-interval", type=float, default=60.0, help="Full reload period (seconds)")
+    ap.add_argument("--leader", metavar="NAME", help="Only fire while holding this named lease")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    daemon = SchedulerDaemon(
+        SessionLocal,
+        jitter_s=args.jitter,
+        misfire=args.misfire,
+        misfire_grace_s=args.misfire_grace,
+        reload_interval_s=args.reload_interval,
+        leader_lease=args.leader,
+    )
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda *_: daemon.request_reload())
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop(timeout=0))
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
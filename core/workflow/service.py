@@ -1,7 +1,16 @@
 # core/workflow/service.py — lazy model resolution + Core fallback (no import-time errors)
 from __future__ import annotations
 
-from typing import Optional, Tuple, Set, Literal, Union, List
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple, Set, Literal, Union, List
 from types import SimpleNamespace
 from datetime import datetime, timedelta
 
@@ -9,15 +18,19 @@ from sqlalchemy import (
     Table, Column, Integer, String, DateTime, MetaData, select,
     update as sqla_update, insert as sqla_insert, delete as sqla_delete, inspect, func
 )
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
 
+from . import cron
 from .engine import execute_recipe_run
+from .journal import execution_journal
 from core.runstore_factory import make_runstore  # shared store
 from core.db.models import Base  # reuse project metadata/engine
 
 # --------------------------------------------------------------------------------------
 # Internal backend cache: ('orm', Model, cols) | ('core', Table, cols)
 _BACKEND: Optional[Tuple[Literal['orm','core'], object, Set[str]]] = None
+_BACKEND_LOCK = threading.Lock()  # first resolution may define the Core table
 
 
 def _try_resolve_workflow_model() -> Optional[Tuple[type, Set[str]]]:
@@ -86,6 +99,10 @@ def _ensure_core_table(session: Session) -> Tuple[Table, Set[str]]:
         Column("status", String(16), nullable=True),  # 'green'/'yellow'/'red'
         Column("last_run_at", DateTime(timezone=False), nullable=True),
         Column("next_run_at", DateTime(timezone=False), nullable=True),
+        Column("trigger_expr", String(128), nullable=True),  # cron expression
+        # Per-workflow claim so replicas never double-fire (see claim_due_workflows)
+        Column("claimed_by", String(128), nullable=True),
+        Column("claim_expires_at", DateTime(timezone=False), nullable=True),
     )
     metadata.create_all(bind=bind, tables=[tbl])
     return tbl, set(tbl.c.keys())
@@ -102,15 +119,18 @@ def _get_backend(session: Session) -> Tuple[Literal['orm','core'], object, Set[s
     if _BACKEND is not None:
         return _BACKEND
 
-    resolved = _try_resolve_workflow_model()
-    if resolved is not None:
-        model, cols = resolved
-        _BACKEND = ('orm', model, cols)
-        return _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is not None:
+            return _BACKEND
+        resolved = _try_resolve_workflow_model()
+        if resolved is not None:
+            model, cols = resolved
+            _BACKEND = ('orm', model, cols)
+            return _BACKEND
 
-    tbl, cols = _ensure_core_table(session)
-    _BACKEND = ('core', tbl, cols)
-    return _BACKEND
+        tbl, cols = _ensure_core_table(session)
+        _BACKEND = ('core', tbl, cols)
+        return _BACKEND
 
 
 # --------------------------------------------------------------------------------------
@@ -121,6 +141,123 @@ def _utcnow() -> datetime:
     return datetime.utcnow()
 
 
+# Trigger types that fire on their own (have a next_run_at).
+SCHEDULED_TRIGGERS = ("interval", "cron")
+
+
+def _compute_next_run(
+    trigger_type: Optional[str],
+    trigger_value: Optional[int],
+    *,
+    after: Optional[datetime] = None,
+    trigger_expr: Optional[str] = None,
+    window=None,
+) -> Optional[datetime]:
+    """
+    Next fire time (naive UTC) for a trigger, or None if it never fires on its
+    own.  Cron fires outside the maintenance ``window`` are skipped.
+    """
+    if trigger_type == "interval" and trigger_value:
+        return (after or _utcnow()) + timedelta(minutes=int(trigger_value))
+    if trigger_type == "cron" and trigger_expr:
+        return cron.next_fire(cron.parse_cron(trigger_expr), after or _utcnow(), window=window)
+    return None
+
+
+def _agent_windows(db: Session, agent_ids=None) -> Dict[int, object]:
+    """Maintenance windows by agent id, from ``AGENT_POLICIES`` keyed by agent name."""
+    try:
+        from core.agents.fixed.policies import AGENT_POLICIES
+        from core.db.models import Agent
+
+        q = db.query(Agent.id, Agent.name)
+        if agent_ids is not None:
+            q = q.filter(Agent.id.in_([int(a) for a in agent_ids if a is not None]))
+        rows = q.all()
+    except Exception:
+        db.rollback()
+        return {}
+    return {
+        int(agent_id): AGENT_POLICIES[name]["window"]
+        for agent_id, name in rows
+        if name in AGENT_POLICIES
+    }
+
+
+def _next_run_for(db: Session, wf, *, after: Optional[datetime] = None, windows=None) -> Optional[datetime]:
+    """Next fire for a workflow row/object (cron fires honour its agent's maintenance window)."""
+    ttype = _getattr_or(wf, "trigger_type")
+    window = None
+    if ttype == "cron":
+        agent_id = _getattr_or(wf, "agent_id")
+        if windows is None:
+            windows = _agent_windows(db, [agent_id])
+        window = windows.get(int(agent_id)) if agent_id is not None else None
+    return _compute_next_run(
+        ttype,
+        _getattr_or(wf, "trigger_value"),
+        after=after,
+        trigger_expr=_getattr_or(wf, "trigger_expr"),
+        window=window,
+    )
+
+
+def parse_topics(trigger_expr: Optional[str]) -> List[str]:
+    """Event-trigger topic patterns from ``trigger_expr`` (comma/space separated globs)."""
+    return [t for t in (trigger_expr or "").replace(",", " ").split() if t]
+
+
+def _check_trigger_expr(trigger_type: Optional[str], trigger_expr: Optional[str], cols: Set[str]) -> Optional[str]:
+    """Validate a cron/event trigger up front; return the normalized expression."""
+    if trigger_type not in ("cron", "event"):
+        return trigger_expr
+    if "trigger_expr" not in cols:
+        raise ValueError(f"{trigger_type} triggers need the workflows.trigger_expr column (run hotfix migrations).")
+    if not (trigger_expr or "").strip():
+        if trigger_type == "event":
+            raise ValueError("Event triggers need at least one topic, e.g. 'incident.*'.")
+        raise ValueError("Cron triggers need an expression, e.g. '30 7 * * MON-FRI'.")
+    if trigger_type == "event":
+        return ",".join(parse_topics(trigger_expr))
+    return cron.parse_cron(trigger_expr).expr
+
+
+def _stored_value(db: Session, wf_id: int, name: str):
+    kind, obj, cols = _get_backend(db)
+    if name not in cols:
+        return None
+    if kind == 'orm':
+        Model = obj  # type: ignore[assignment]
+        row = db.query(getattr(Model, name)).filter(Model.id == int(wf_id)).first()
+    else:
+        tbl: Table = obj  # type: ignore[assignment]
+        row = db.execute(select(tbl.c[name]).where(tbl.c.id == int(wf_id))).first()
+    return row[0] if row else None
+
+
+# In-process listeners told about workflow edits (the scheduler daemon reloads on them).
+_CHANGE_LISTENERS: List[Callable[[Optional[int]], None]] = []
+
+
+def add_change_listener(fn: Callable[[Optional[int]], None]) -> None:
+    """Call ``fn(wf_id)`` after a workflow is created, updated or deleted."""
+    if fn not in _CHANGE_LISTENERS:
+        _CHANGE_LISTENERS.append(fn)
+
+
+def remove_change_listener(fn: Callable[[Optional[int]], None]) -> None:
+    if fn in _CHANGE_LISTENERS:
+        _CHANGE_LISTENERS.remove(fn)
+
+
+def _notify_change(wf_id: Optional[int]) -> None:
+    for fn in list(_CHANGE_LISTENERS):
+        try:
+            fn(wf_id)
+        except Exception:
+            pass
+
+
 def _row_to_ns(row) -> SimpleNamespace:
     m = row._mapping if hasattr(row, "_mapping") else row
     return SimpleNamespace(**{k: m[k] for k in m.keys()})
@@ -182,8 +319,13 @@ def create_workflow(
     recipe_id: int,
     trigger_type: str = "manual",
     trigger_value: Optional[int] = None,
+    trigger_expr: Optional[str] = None,
 ):
-    """Create a workflow and schedule its next run if interval-triggered."""
+    """
+    Create a workflow and schedule its next run if interval- or cron-triggered.
+    ``trigger_expr`` holds the cron expression (e.g. ``"30 7 * * MON-FRI"``) or,
+    for ``trigger_type="event"``, the topic patterns (e.g. ``"incident.*"``).
+    """
     clean = (name or "").strip()
     if not clean:
         raise ValueError("Workflow name cannot be empty.")
@@ -191,6 +333,9 @@ def create_workflow(
         raise ValueError(f"Workflow '{clean}' already exists.")
 
     kind, obj, cols = _get_backend(db)
+    trigger_expr = _check_trigger_expr(trigger_type, trigger_expr, cols)
+    window = _agent_windows(db, [agent_id]).get(int(agent_id)) if trigger_type == "cron" else None
+    next_run_at = _compute_next_run(trigger_type, trigger_value, trigger_expr=trigger_expr, window=window)
     if kind == 'orm':
         Model = obj  # type: ignore[assignment]
         wf = Model(
@@ -202,16 +347,19 @@ def create_workflow(
             setattr(wf, "trigger_type", trigger_type)
         if "trigger_value" in cols:
             setattr(wf, "trigger_value", trigger_value)
+        if "trigger_expr" in cols:
+            setattr(wf, "trigger_expr", trigger_expr)
         if "status" in cols:
             setattr(wf, "status", "yellow")
         if "enabled" in cols:
             setattr(wf, "enabled", 1)
-        if (trigger_type == "interval" and trigger_value and "next_run_at" in cols):
-            setattr(wf, "next_run_at", _utcnow() + timedelta(minutes=int(trigger_value)))
+        if "next_run_at" in cols:
+            setattr(wf, "next_run_at", next_run_at)
 
         db.add(wf)
         db.commit()
         db.refresh(wf)
+        _notify_change(int(getattr(wf, "id")))
         return wf
     else:
         tbl: Table = obj  # type: ignore[assignment]
@@ -224,12 +372,15 @@ def create_workflow(
             enabled=1,
             status="yellow",
             last_run_at=None,
-            next_run_at=(_utcnow() + timedelta(minutes=int(trigger_value)))
-                       if (trigger_type == "interval" and trigger_value) else None,
+            next_run_at=next_run_at,
         )
+        if "trigger_expr" in cols:
+            values["trigger_expr"] = trigger_expr
         row = db.execute(sqla_insert(tbl).values(**values).returning(tbl)).first()
         db.commit()
-        return _row_to_ns(row)
+        wf = _row_to_ns(row)
+        _notify_change(int(wf.id))
+        return wf
 
 
 def update_workflow(db: Session, wf_id: int, **kwargs):
@@ -244,6 +395,12 @@ def update_workflow(db: Session, wf_id: int, **kwargs):
         if _workflow_name_exists(db, new_name, exclude_id=int(wf_id)):
             raise ValueError(f"Workflow '{new_name}' already exists.")
         kwargs["name"] = new_name
+    if kwargs.get("trigger_expr") or kwargs.get("trigger_type") in ("cron", "event"):
+        ttype = kwargs.get("trigger_type") or _stored_value(db, wf_id, "trigger_type")
+        kwargs["trigger_expr"] = _check_trigger_expr(ttype, kwargs.get("trigger_expr"), cols)
+    reschedule_cron = bool(
+        {"trigger_type", "trigger_expr", "agent_id"} & {k for k, v in kwargs.items() if v is not None}
+    )
 
     if kind == 'orm':
         Model = obj  # type: ignore[assignment]
@@ -262,10 +419,13 @@ def update_workflow(db: Session, wf_id: int, **kwargs):
 
             # Adjust schedule when trigger changes
             if k == "trigger_type" and "next_run_at" in cols:
-                if v == "manual":
+                if v not in SCHEDULED_TRIGGERS:
                     setattr(wf, "next_run_at", None)
                 elif v == "interval" and kwargs.get("trigger_value"):
-                    setattr(wf, "next_run_at", _utcnow() + timedelta(minutes=int(kwargs["trigger_value"])))
+                    setattr(wf, "next_run_at", _compute_next_run(v, kwargs["trigger_value"]))
+
+        if reschedule_cron and "next_run_at" in cols and getattr(wf, "trigger_type", None) == "cron":
+            setattr(wf, "next_run_at", _next_run_for(db, wf))
 
         if recipe_changed:
             if "last_run_at" in cols:
@@ -277,6 +437,7 @@ def update_workflow(db: Session, wf_id: int, **kwargs):
 
         db.commit()
         db.refresh(wf)
+        _notify_change(int(wf_id))
         return wf
 
     else:
@@ -286,13 +447,21 @@ def update_workflow(db: Session, wf_id: int, **kwargs):
         data = {k: v for k, v in kwargs.items() if k in allowed and v is not None}
 
         # Adjust schedule when trigger changes
-        if data.get("trigger_type") == "manual" and "next_run_at" in cols:
+        if data.get("trigger_type") and data["trigger_type"] not in SCHEDULED_TRIGGERS and "next_run_at" in cols:
             data["next_run_at"] = None
         elif (data.get("trigger_type") == "interval" and kwargs.get("trigger_value") and "next_run_at" in cols):
-            data["next_run_at"] = _utcnow() + timedelta(minutes=int(kwargs["trigger_value"]))
+            data["next_run_at"] = _compute_next_run("interval", kwargs["trigger_value"])
+
+        if reschedule_cron and "next_run_at" in cols:
+            row = db.execute(select(tbl).where(tbl.c.id == int(wf_id))).first()
+            if row is not None:
+                merged = {**dict(row._mapping), **data}
+                if merged.get("trigger_type") == "cron":
+                    data["next_run_at"] = _next_run_for(db, merged)
 
         db.execute(sqla_update(tbl).where(tbl.c.id == int(wf_id)).values(**data))
         db.commit()
+        _notify_change(int(wf_id))
         # Return the updated row for symmetry
         row = db.execute(select(tbl).where(tbl.c.id == int(wf_id))).first()
         return _row_to_ns(row) if row else None
@@ -308,11 +477,13 @@ def delete_workflow(db: Session, wf_id: int) -> bool:
             return False
         db.delete(wf)
         db.commit()
+        _notify_change(int(wf_id))
         return True
     else:
         tbl: Table = obj  # type: ignore[assignment]
         res = db.execute(sqla_delete(tbl).where(tbl.c.id == int(wf_id)))
         db.commit()
+        _notify_change(int(wf_id))
         return (res.rowcount or 0) > 0
 
 
@@ -341,9 +512,20 @@ def compute_status(wf) -> str:
     return "red"
 
 
-def run_now(db: Session, wf_id: int):
+def run_now(
+    db: Session,
+    wf_id: int,
+    *,
+    trigger: Optional[str] = "manual",
+    inputs: Optional[Dict[str, object]] = None,
+    meta: Optional[Dict[str, object]] = None,
+):
     """
     Trigger a workflow immediately and record it in the shared RunStore.
+    ``trigger`` is recorded on the run ("manual", "interval", "cron",
+    "event", ...); schedulers pass None to record the workflow's own
+    ``trigger_type``, so every scheduled path labels its runs alike.  ``inputs`` are passed to the recipe (e.g. an event
+    payload); ``meta`` is merged into the run's metadata.
     Safe for schema variants: only touches columns that exist.
     """
     kind, obj, cols = _get_backend(db)
@@ -366,106 +548,540 @@ def run_now(db: Session, wf_id: int):
         agent_id = wf.agent_id
         recipe_id = wf.recipe_id
         wf_name = wf.name
+    if trigger is None:
+        trigger = _getattr_or(wf, "trigger_type") or "manual"
 
+    # One journal: the Run/evidence rows and the workflow's timestamps share
+    # one app-DB commit, and the RunStore run one transaction (per flush window).
     store = make_runstore()
-    with store.workflow_run(
+    with execution_journal(
+        db,
+        store,
         workflow_id=str(wf_id),
         name=wf_name,
         agent_id=agent_id,
         recipe_id=recipe_id,
-        trigger="manual",
-        meta={"workflow_name": wf_name},
-    ) as rec:
-        run = execute_recipe_run(db, agent_id=agent_id, recipe_id=recipe_id)
-        rec.step(
+        trigger=trigger,
+        meta={"workflow_name": wf_name, **(meta or {}), **({"inputs": inputs} if inputs is not None else {})},
+    ) as journal:
+        with journal.span("execute_recipe", agent_id=agent_id, recipe_id=recipe_id) as sp:
+            run = execute_recipe_run(db, agent_id=agent_id, recipe_id=recipe_id, inputs=inputs, journal=journal)
+            sp.set(status=getattr(run, "status", None))
+        journal.step(
             phase="act",
             message=f"Executed recipe {getattr(run, 'recipe_id', recipe_id)}",
             payload=None,
             result={"status": "completed"},
         )
 
-    # Update timestamps/status if present
-    now = _utcnow()
+        # Stage timestamps/status if present (committed with the journal)
+        now = _utcnow()
+        if kind == 'orm':
+            if "last_run_at" in cols:
+                setattr(wf, "last_run_at", now)
+            if "status" in cols:
+                setattr(wf, "status", compute_status(wf))
+            if {"trigger_type", "trigger_value", "next_run_at"}.issubset(cols):
+                if getattr(wf, "trigger_type", None) in SCHEDULED_TRIGGERS:
+                    setattr(wf, "next_run_at", _next_run_for(db, wf, after=now))
+        else:
+            tbl: Table = obj  # type: ignore[assignment]
+            next_run_at = None
+            if {"trigger_type", "trigger_value", "next_run_at"}.issubset(cols):
+                if _getattr_or(wf, "trigger_type") in SCHEDULED_TRIGGERS:
+                    next_run_at = _next_run_for(db, wf, after=now)
+
+            data = {}
+            if "last_run_at" in cols:
+                data["last_run_at"] = now
+            if "status" in cols:
+                # recompute on the prospective new last_run_at
+                data["status"] = "green"
+            if "next_run_at" in cols:
+                data["next_run_at"] = next_run_at
+
+            if data:
+                db.execute(sqla_update(tbl).where(tbl.c.id == int(wf_id)).values(**data))
+
     if kind == 'orm':
-        if "last_run_at" in cols:
-            setattr(wf, "last_run_at", now)
-        if "status" in cols:
-            setattr(wf, "status", compute_status(wf))
-        if {"trigger_type", "trigger_value", "next_run_at"}.issubset(cols):
-            if getattr(wf, "trigger_type", None) == "interval" and getattr(wf, "trigger_value", None):
-                setattr(wf, "next_run_at", now + timedelta(minutes=int(getattr(wf, "trigger_value"))))
-        db.commit()
         db.refresh(wf)
-        return run
+    return run
+
+
+def reschedule_workflow(db: Session, wf_id: int, next_run_at: Optional[datetime]) -> bool:
+    """Set ``next_run_at`` only (used by the scheduler daemon; does not notify listeners)."""
+    kind, obj, cols = _get_backend(db)
+    if "next_run_at" not in cols:
+        return False
+    if kind == 'orm':
+        Model = obj  # type: ignore[assignment]
+        n = db.query(Model).filter(Model.id == int(wf_id)).update({"next_run_at": next_run_at})
     else:
         tbl: Table = obj  # type: ignore[assignment]
-        next_run_at = None
-        if {"trigger_type", "trigger_value", "next_run_at"}.issubset(cols):
-            ttype = _getattr_or(wf, "trigger_type")
-            tval = _getattr_or(wf, "trigger_value")
-            if ttype == "interval" and tval:
-                next_run_at = now + timedelta(minutes=int(tval))
-
-        data = {}
-        if "last_run_at" in cols:
-            data["last_run_at"] = now
-        if "status" in cols:
-            # recompute on the prospective new last_run_at
-            data["status"] = "green"
-        if "next_run_at" in cols:
-            data["next_run_at"] = next_run_at
+        n = db.execute(
+            sqla_update(tbl).where(tbl.c.id == int(wf_id)).values(next_run_at=next_run_at)
+        ).rowcount
+    db.commit()
+    return bool(n)
 
-        if data:
-            db.execute(sqla_update(tbl).where(tbl.c.id == int(wf_id)).values(**data))
-            db.commit()
-        return run
+
+def upcoming_fires(
+    db: Session, n: int = 5, *, after: Optional[datetime] = None
+) -> Dict[int, List[datetime]]:
+    """
+    Next ``n`` fire times (naive UTC) of every enabled interval/cron workflow,
+    keyed by workflow id, for capacity planning (see ``fire_density``).
+    """
+    after = after or _utcnow()
+    rows = [
+        wf for wf in list_workflows(db)
+        if _getattr_or(wf, "trigger_type") in SCHEDULED_TRIGGERS and int(_getattr_or(wf, "enabled", 1) or 0)
+    ]
+    windows = _agent_windows(db) if any(_getattr_or(wf, "trigger_type") == "cron" for wf in rows) else {}
+    out: Dict[int, List[datetime]] = {}
+    for wf in rows:
+        wf_id = int(_getattr_or(wf, "id"))
+        pending = _getattr_or(wf, "next_run_at")
+        fires: List[datetime] = []
+        try:
+            if _getattr_or(wf, "trigger_type") == "interval":
+                minutes = _getattr_or(wf, "trigger_value")
+                if minutes:
+                    first = pending or _compute_next_run("interval", minutes, after=after)
+                    fires = [first + timedelta(minutes=int(minutes) * k) for k in range(n)]
+            else:
+                window = windows.get(int(_getattr_or(wf, "agent_id") or 0))
+                schedule = cron.parse_cron(_getattr_or(wf, "trigger_expr") or "")
+                start = pending - timedelta(microseconds=1) if pending else after
+                fires = cron.next_fires(schedule, start, n, window=window)
+        except ValueError:
+            fires = []
+        out[wf_id] = fires
+    return out
 
 
-def tick(db: Session) -> int:
+def fire_density(fires: Dict[int, List[datetime]], *, bucket_s: int = 60) -> List[Tuple[datetime, List[int]]]:
     """
-    Run all due interval-triggered workflows.
-    If the model lacks scheduling columns, returns 0 (nothing to do).
+    Group ``upcoming_fires`` output into ``bucket_s`` buckets, busiest first,
+    as ``(bucket_start, [wf_id, ...])`` pairs; spot thundering herds here.
     """
-    kind, obj, cols = _get_backend(db)
-    sched_cols = {"enabled", "trigger_type", "next_run_at"}
-    if not sched_cols.issubset(cols):
-        return 0
+    epoch = datetime(1970, 1, 1)
+    buckets: Dict[datetime, List[int]] = {}
+    for wf_id, times in fires.items():
+        for t in times:
+            secs = int((t - epoch).total_seconds()) // bucket_s * bucket_s
+            buckets.setdefault(epoch + timedelta(seconds=secs), []).append(wf_id)
+    return sorted(buckets.items(), key=lambda kv: (-len(kv[1]), kv[0]))
 
-    now = _utcnow()
+
+@dataclass
+class TickSummary:
+    """What one ``tick`` did. ``queue_ms`` is submit-to-start wait in the pool."""
+    due: int = 0
+    dispatched: int = 0
+    skipped: int = 0  # already running (per-workflow lock held)
+    failed: int = 0
+    queue_ms_avg: float = 0.0
+    queue_ms_max: float = 0.0
+    duration_ms: float = 0.0
+    errors: Dict[int, str] = field(default_factory=dict)
+
+
+# Per-workflow mutual exclusion within this process (tick workers, scheduler daemon).
+_WF_LOCKS: Dict[int, threading.Lock] = {}
+_WF_LOCKS_GUARD = threading.Lock()
+
+
+def _workflow_lock(wf_id: int) -> threading.Lock:
+    with _WF_LOCKS_GUARD:
+        return _WF_LOCKS.setdefault(int(wf_id), threading.Lock())
+
+
+@contextmanager
+def workflow_guard(wf_id: int):
+    """Yield True if this caller holds ``wf_id``'s run lock, False if a run is in progress."""
+    lock = _workflow_lock(wf_id)
+    acquired = lock.acquire(blocking=False)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
+
+
+def _tick_workers() -> int:
+    try:
+        return max(1, int(os.getenv("IPAV_TICK_WORKERS", "1")))
+    except ValueError:
+        return 1
+
+
+def _due_workflow_ids(db: Session, now: datetime) -> List[int]:
+    kind, obj, _cols = _get_backend(db)
     if kind == 'orm':
         Model = obj  # type: ignore[assignment]
-        due = (
-            db.query(Model)
+        rows = (
+            db.query(Model.id)
             .filter(
                 getattr(Model, "enabled") == 1,
-                getattr(Model, "trigger_type") == "interval",
+                getattr(Model, "trigger_type").in_(SCHEDULED_TRIGGERS),
                 getattr(Model, "next_run_at") != None,  # noqa: E711
                 getattr(Model, "next_run_at") <= now,
             )
+            .order_by(getattr(Model, "next_run_at"))
             .all()
         )
-        count = 0
-        for wf in due:
-            run_now(db, int(getattr(wf, "id")))
-            count += 1
-        return count
     else:
         tbl: Table = obj  # type: ignore[assignment]
-        due_rows = db.execute(
-            select(tbl).where(
+        rows = db.execute(
+            select(tbl.c.id).where(
                 (tbl.c.enabled == 1)
-                & (tbl.c.trigger_type == "interval")
+                & (tbl.c.trigger_type.in_(SCHEDULED_TRIGGERS))
                 & (tbl.c.next_run_at != None)  # noqa: E711
                 & (tbl.c.next_run_at <= now)
-            )
+            ).order_by(tbl.c.next_run_at)
         ).all()
-        count = 0
-        for row in due_rows:
-            wf_id = int(row._mapping["id"])
+    return [int(r[0]) for r in rows]
+
+
+# --------------------------------------------------------------------------------------
+# Claims and leases (several app replicas / scheduler processes on one database)
+
+CLAIM_LEASE_S = 300.0
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _claim_table(db: Session) -> Optional[Table]:
+    """The workflows table if it has claim columns (see hotfix migrations), else None."""
+    kind, obj, cols = _get_backend(db)
+    if not {"claimed_by", "claim_expires_at", "next_run_at"}.issubset(cols):
+        return None
+    return obj.__table__ if kind == 'orm' else obj  # type: ignore[union-attr]
+
+
+def _claimable(tbl: Table, now: datetime):
+    return (tbl.c.claimed_by == None) | (tbl.c.claim_expires_at < now)  # noqa: E711
+
+
+def claim_due_workflows(
+    db: Session,
+    *,
+    worker_id: str = WORKER_ID,
+    lease_s: float = CLAIM_LEASE_S,
+    limit: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> List[int]:
+    """
+    Atomically claim due interval/cron workflows for ``worker_id`` and return their ids.
+
+    One ``UPDATE ... WHERE next_run_at <= now AND (claimed_by IS NULL OR
+    claim_expires_at < now) RETURNING id`` statement, so concurrent callers
+    (threads, processes or hosts on the same database) never get the same
+    workflow.  A claim expires after ``lease_s`` unless renewed with
+    ``heartbeat_claims``, so a crashed worker's workflows become claimable again.
+    """
+    tbl = _claim_table(db)
+    if tbl is None:
+        return []
+    now = now or _utcnow()
+    due = (
+        (tbl.c.enabled == 1)
+        & (tbl.c.trigger_type.in_(SCHEDULED_TRIGGERS))
+        & (tbl.c.next_run_at != None)  # noqa: E711
+        & (tbl.c.next_run_at <= now)
+        & _claimable(tbl, now)
+    )
+    pick = select(tbl.c.id).where(due).order_by(tbl.c.next_run_at)
+    if limit:
+        pick = pick.limit(int(limit))
+    rows = db.execute(
+        sqla_update(tbl)
+        .where(tbl.c.id.in_(pick.scalar_subquery()), due)
+        .values(claimed_by=worker_id, claim_expires_at=now + timedelta(seconds=lease_s))
+        .returning(tbl.c.id)
+    ).all()
+    db.commit()
+    return sorted(int(r[0]) for r in rows)
+
+
+def claim_workflow(
+    db: Session,
+    wf_id: int,
+    *,
+    worker_id: str = WORKER_ID,
+    lease_s: float = CLAIM_LEASE_S,
+    now: Optional[datetime] = None,
+) -> bool:
+    """Claim one workflow if it is due and unclaimed (scheduler daemon fires)."""
+    tbl = _claim_table(db)
+    if tbl is None:
+        return True  # schema without claim columns: nothing to coordinate
+    now = now or _utcnow()
+    n = db.execute(
+        sqla_update(tbl)
+        .where(
+            (tbl.c.id == int(wf_id))
+            & (tbl.c.next_run_at != None)  # noqa: E711
+            & (tbl.c.next_run_at <= now)
+            & _claimable(tbl, now)
+        )
+        .values(claimed_by=worker_id, claim_expires_at=now + timedelta(seconds=lease_s))
+    ).rowcount
+    db.commit()
+    return bool(n)
+
+
+def heartbeat_claims(
+    db: Session, wf_ids, *, worker_id: str = WORKER_ID, lease_s: float = CLAIM_LEASE_S
+) -> int:
+    """Extend ``worker_id``'s claims on ``wf_ids``; return how many are still held."""
+    tbl = _claim_table(db)
+    ids = [int(i) for i in wf_ids]
+    if tbl is None or not ids:
+        return 0
+    n = db.execute(
+        sqla_update(tbl)
+        .where(tbl.c.id.in_(ids), tbl.c.claimed_by == worker_id)
+        .values(claim_expires_at=_utcnow() + timedelta(seconds=lease_s))
+    ).rowcount
+    db.commit()
+    return n or 0
+
+
+def release_workflow(db: Session, wf_id: int, *, worker_id: str = WORKER_ID, advance: bool = False) -> bool:
+    """
+    Drop ``worker_id``'s claim.  ``advance=True`` (the run failed before
+    ``run_now`` moved ``next_run_at``) also schedules the next interval so the
+    workflow is not re-claimed immediately.
+    """
+    tbl = _claim_table(db)
+    if tbl is None:
+        return False
+    values: Dict[str, object] = {"claimed_by": None, "claim_expires_at": None}
+    if advance:
+        row = db.execute(select(tbl).where(tbl.c.id == int(wf_id))).first()
+        if row is not None:
+            values["next_run_at"] = _next_run_for(db, row)
+    n = db.execute(
+        sqla_update(tbl).where(tbl.c.id == int(wf_id), tbl.c.claimed_by == worker_id).values(**values)
+    ).rowcount
+    db.commit()
+    return bool(n)
+
+
+@contextmanager
+def claim_heartbeat(
+    session_factory: Callable[[], Session],
+    *,
+    worker_id: str = WORKER_ID,
+    lease_s: float = CLAIM_LEASE_S,
+    renew: Optional[Callable[..., Any]] = None,
+):
+    """
+    Renew claims in the background every ``lease_s / 3`` seconds while the
+    block runs.  Yields the (mutable) set of ids to keep alive.  ``renew``
+    (default ``heartbeat_claims``: workflow claims) is called as
+    ``renew(db, ids, worker_id=..., lease_s=...)``; the event dispatcher
+    passes its own for claimed events.
+    """
+    renew = renew or heartbeat_claims
+    held: Set[int] = set()
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(max(0.5, lease_s / 3.0)):
+            if held:
+                try:
+                    with session_factory() as hb_db:
+                        renew(hb_db, list(held), worker_id=worker_id, lease_s=lease_s)
+                except Exception:
+                    pass
+
+    t = threading.Thread(target=beat, name="claim-heartbeat", daemon=True)
+    t.start()
+    try:
+        yield held
+    finally:
+        stop.set()
+        t.join(timeout=5.0)
+
+
+def _lease_table(db: Session) -> Table:
+    bind = db.get_bind()
+    tbl = Base.metadata.tables.get("scheduler_leases")
+    if tbl is None:
+        tbl = Table(
+            "scheduler_leases", Base.metadata,
+            Column("name", String(64), primary_key=True),
+            Column("holder", String(128), nullable=False),
+            Column("expires_at", DateTime(timezone=False), nullable=False),
+        )
+    tbl.create(bind=bind, checkfirst=True)
+    return tbl
+
+
+def acquire_lease(db: Session, name: str, *, holder: str = WORKER_ID, ttl_s: float = 30.0) -> bool:
+    """
+    Take or renew the named lease (e.g. the leader role for scheduler
+    daemons).  Succeeds if the lease is free, expired or already ours.
+    """
+    tbl = _lease_table(db)
+    now = _utcnow()
+    expires = now + timedelta(seconds=ttl_s)
+    n = db.execute(
+        sqla_update(tbl)
+        .where((tbl.c.name == name) & ((tbl.c.holder == holder) | (tbl.c.expires_at < now)))
+        .values(holder=holder, expires_at=expires)
+    ).rowcount
+    if n:
+        db.commit()
+        return True
+    try:
+        db.execute(sqla_insert(tbl).values(name=name, holder=holder, expires_at=expires))
+        db.commit()
+        return True
+    except IntegrityError:  # held by someone else
+        db.rollback()
+        return False
+
+
+def release_lease(db: Session, name: str, *, holder: str = WORKER_ID) -> None:
+    tbl = _lease_table(db)
+    db.execute(sqla_delete(tbl).where(tbl.c.name == name, tbl.c.holder == holder))
+    db.commit()
+
+
+def _run_due(session_factory: Callable[[], Session], wf_id: int, submitted: float) -> float:
+    """Pool worker: run one workflow in its own session; return its queue time in ms."""
+    queue_ms = (time.monotonic() - submitted) * 1000.0
+    with session_factory() as db:
+        run_now(db, wf_id, trigger=None)
+    return queue_ms
+
+
+def _run_due_in_process(db_url: str, wf_id: int, submitted: float) -> float:
+    """Process-pool worker: builds its own engine/session (nothing unpicklable crosses over)."""
+    from core.db.connections import get_engine
+
+    return _run_due(sessionmaker(bind=get_engine(db_url), expire_on_commit=False), wf_id, submitted)
+
+
+def tick_with_summary(
+    db: Session,
+    *,
+    max_workers: Optional[int] = None,
+    session_factory: Optional[Callable[[], Session]] = None,
+    use_processes: bool = False,
+    worker_id: str = WORKER_ID,
+    lease_s: float = CLAIM_LEASE_S,
+) -> TickSummary:
+    """
+    Run all due interval/cron workflows and report what happened.
+
+    With ``max_workers`` > 1 (default ``$IPAV_TICK_WORKERS``, else 1) due
+    workflows run concurrently on a thread pool (or a process pool with
+    ``use_processes``, whose workers are spawned and open their own engines),
+    each with its own session from ``session_factory``
+    (default: a sessionmaker on ``db``'s engine).  A workflow whose previous
+    run is still going in this process is skipped, never overlapped.
+
+    When the workflows table has claim columns, due workflows are claimed
+    atomically for ``worker_id`` first (heartbeated while they wait or run,
+    released afterwards), so replicas ticking the same database share the
+    work and never double-fire.
+    """
+    summary = TickSummary()
+    kind, obj, cols = _get_backend(db)
+    if not {"enabled", "trigger_type", "next_run_at"}.issubset(cols):
+        return summary
+    t0 = time.monotonic()
+    claims = _claim_table(db) is not None
+    if claims:
+        due = claim_due_workflows(db, worker_id=worker_id, lease_s=lease_s)
+    else:
+        due = _due_workflow_ids(db, _utcnow())
+    summary.due = len(due)
+    if not due:
+        return summary
+    workers = max_workers if max_workers is not None else _tick_workers()
+    factory = session_factory or sessionmaker(bind=db.get_bind(), expire_on_commit=False)
+    queue_ms: List[float] = []
+
+    def finish(wf_id: int, error: Optional[BaseException]) -> None:
+        if error is None:
+            summary.dispatched += 1
+        else:
+            summary.failed += 1
+            summary.errors[wf_id] = f"{type(error).__name__}: {error}"
+        if claims:
+            release_workflow(db, wf_id, worker_id=worker_id, advance=error is not None)
+
+    with claim_heartbeat(factory, worker_id=worker_id, lease_s=lease_s) as alive:
+        alive.update(due)
+        if workers <= 1:
+            for wf_id in due:
+                with workflow_guard(wf_id) as ok:
+                    if not ok:
+                        summary.skipped += 1
+                        if claims:
+                            release_workflow(db, wf_id, worker_id=worker_id)
+                        continue
+                    err: Optional[BaseException] = None
+                    try:
+                        run_now(db, wf_id, trigger=None)
+                        queue_ms.append(0.0)
+                    except Exception as e:
+                        db.rollback()
+                        err = e
+                    alive.discard(wf_id)
+                    finish(wf_id, err)
+        else:
+            if use_processes:
+                # spawn, not fork: a forked child would inherit the parent's pooled
+                # SQLite connections through the get_engine()/make_runstore() caches.
+                pool: Executor = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                url = db.get_bind().url.render_as_string(hide_password=False)
+                submit = lambda wf_id: pool.submit(_run_due_in_process, url, wf_id, time.monotonic())  # noqa: E731
+            else:
+                pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tick")
+                submit = lambda wf_id: pool.submit(_run_due, factory, wf_id, time.monotonic())  # noqa: E731
+            futures: Dict[Future, int] = {}
+            held: List[threading.Lock] = []
             try:
-                run_now(db, wf_id)
-                count += 1
-            except Exception:
-                db.rollback()
-                continue
-        return count
+                for wf_id in due:
+                    lock = _workflow_lock(wf_id)
+                    if not lock.acquire(blocking=False):
+                        summary.skipped += 1
+                        if claims:
+                            release_workflow(db, wf_id, worker_id=worker_id)
+                        continue
+                    held.append(lock)
+                    futures[submit(wf_id)] = wf_id
+                for fut in as_completed(futures):
+                    wf_id = futures[fut]
+                    err = fut.exception()
+                    if err is None:
+                        queue_ms.append(fut.result())
+                    alive.discard(wf_id)
+                    finish(wf_id, err)
+            finally:
+                pool.shutdown(wait=True)
+                for lock in held:
+                    lock.release()
+
+    if queue_ms:
+        summary.queue_ms_avg = sum(queue_ms) / len(queue_ms)
+        summary.queue_ms_max = max(queue_ms)
+    summary.duration_ms = (time.monotonic() - t0) * 1000.0
+    return summary
+
+
+def tick(db: Session, **kwargs) -> int:
+    """
+    Run all due interval- and cron-triggered workflows; return how many ran.
+    If the model lacks scheduling columns, returns 0 (nothing to do).
+    Keyword arguments (``max_workers``, ...) go to ``tick_with_summary``.
+    """
+    return tick_with_summary(db, **kwargs).dispatched
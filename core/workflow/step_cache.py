@@ -0,0 +1,255 @@
+"""
+core/workflow/step_cache.py
+---------------------------
+
+Shared result cache for read-only recipe steps.
+
+Many steps only read: Zoom room health, Q-SYS component state, ServiceNow
+lookups.  When several workflows touch the same room within a few seconds,
+each repeats the same read.  A step opts in with a ``cache:`` attribute::
+
+    - id: room-health
+      action: get_room_health
+      using: mcp-zoom
+      params: {room: "{{inputs.roomId}}"}
+      cache: {ttl: 30s, key: [inputs.roomId]}
+
+and its result is keyed on the tool, the action and ``key`` (all rendered
+params when ``key`` is omitted), normalized to canonical JSON.
+
+``StepCache`` has two layers:
+
+- an in-process LRU (``$IPAV_STEP_CACHE_SIZE`` entries, default 1024);
+- optionally the run store's ``step_results`` table, shared by every
+  process that uses the same ``avops.db``.
+
+Concurrent misses on one key are coalesced (single-flight).  The first
+caller runs the tool, the others wait for its result, or its error.  Entries
+expire after their TTL in both layers.  Errors and None results (which
+trigger a step's ``fallback``) are never stored.  Entries are kept frozen
+and every caller gets its own mutable copy, so a step that edits its result
+does not change what the next run reads.  ``stats()`` reports hits and
+misses per process.  ``core.workflow.checkpoints`` and ``core.workflow.dag``
+record each run's hits as a ``cache`` step (``record_cache_summary``), and
+``engine.execute_recipe_run`` adds them to its ``verify`` evidence.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from ..recipes.cache import freeze, thaw
+
+log = logging.getLogger(__name__)
+
+__all__ = [
+    "StepCache", "StepCacheStats", "STEP_CACHE", "cache_digest", "cache_summary", "record_cache_summary",
+    "step_cache_for",
+]
+
+# Expired rows are pruned from the run store every this many writes.
+_PRUNE_EVERY = 256
+
+
+def cache_digest(key: Hashable) -> str:
+    """sha256 of the canonical JSON of ``(tool, action, args)``."""
+    canonical = json.dumps(key, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class StepCacheStats:
+    hits: int  # served from memory or the run store
+    store_hits: int  # of which from the run store
+    coalesced: int  # waited for a concurrent identical call
+    misses: int  # called the tool
+    expired: int
+    evictions: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.coalesced + self.misses
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class StepCache:
+    """Thread-safe TTL + LRU step result cache; see the module docstring."""
+
+    def __init__(self, store: Any = None, *, maxsize: Optional[int] = None):
+        self.store = store  # optional RunStore for the shared SQLite layer
+        self.maxsize = max(1, int(maxsize)) if maxsize is not None else _maxsize_from_env()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()  # digest -> (expires, value)
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._hits = self._store_hits = self._coalesced = self._misses = 0
+        self._expired = self._evictions = self._writes = 0
+
+    def get_or_call(self, key: Hashable, ttl_s: float, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        ``(value, hit)``: a copy of the cached result for ``key``, else
+        ``fn()`` (a frozen copy is stored for ``ttl_s``).
+        """
+        digest = cache_digest(key)
+        with self._lock:
+            value, found = self._lookup(digest)
+            if found:
+                self._hits += 1
+                return thaw(value), True
+            flight = self._flights.get(digest)
+            leader = flight is None
+            if leader:
+                flight = self._flights[digest] = _Flight()
+        if not leader:
+            flight.done.wait()
+            with self._lock:
+                self._coalesced += 1
+            if flight.error is not None:
+                raise flight.error
+            return thaw(flight.value), flight.value is not None
+
+        try:
+            shared = self.store.get_step_result(digest) if self.store is not None else None
+            if shared is not None:
+                value, left = shared
+                frozen = freeze(value)
+                with self._lock:
+                    self._hits += 1
+                    self._store_hits += 1
+                    self._remember(digest, frozen, left)
+                flight.value = frozen
+                return value, True
+            with self._lock:
+                self._misses += 1
+            value = fn()
+            frozen = freeze(value)
+            if value is not None:
+                with self._lock:
+                    self._remember(digest, frozen, ttl_s)
+                if self.store is not None:
+                    try:
+                        self._put_shared(digest, key, frozen, ttl_s)
+                    except Exception:  # the result is good; only sharing it failed
+                        log.warning("step cache: could not write %s to the run store", digest[:12], exc_info=True)
+            flight.value = frozen
+            return value, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(digest, None)
+            flight.done.set()
+
+    def _lookup(self, digest: str) -> Tuple[Any, bool]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None, False
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._entries[digest]
+            self._expired += 1
+            return None, False
+        self._entries.move_to_end(digest)
+        return value, True
+
+    def _remember(self, digest: str, value: Any, ttl_s: float) -> None:
+        self._entries[digest] = (time.monotonic() + ttl_s, value)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _put_shared(self, digest: str, key: Hashable, value: Any, ttl_s: float) -> None:
+        tool, action = (key[0], key[1]) if isinstance(key, tuple) and len(key) >= 2 else (None, None)
+        self.store.put_step_result(
+            digest, thaw(value), ttl_s=ttl_s,
+            tool=None if tool is None else str(tool), action=None if action is None else str(action),
+        )
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % _PRUNE_EVERY == 0
+        if prune:
+            self.store.prune_step_results()
+
+    def clear(self) -> None:
+        """Drop the in-process layer and reset the counters (the run store keeps its rows)."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._store_hits = self._coalesced = self._misses = 0
+            self._expired = self._evictions = 0
+
+    def stats(self) -> StepCacheStats:
+        with self._lock:
+            return StepCacheStats(
+                hits=self._hits,
+                store_hits=self._store_hits,
+                coalesced=self._coalesced,
+                misses=self._misses,
+                expired=self._expired,
+                evictions=self._evictions,
+                size=len(self._entries),
+                maxsize=self.maxsize,
+            )
+
+
+def cache_summary(plan: Any, outcomes: Iterable[Any]) -> Optional[Dict[str, Any]]:
+    """Hits and misses of the ``cache:`` steps a run executed (not resumed or skipped); None if there were none."""
+    cache_ids = {st.id for st in plan.steps if st.cache is not None}
+    cacheable = [o for o in outcomes if o.id in cache_ids and o.status not in ("resumed", "skipped")]
+    if not cacheable:
+        return None
+    hits = sum(1 for o in cacheable if o.cached)
+    return {"hits": hits, "misses": len(cacheable) - hits, "hit_rate": hits / len(cacheable),
+            "cached_steps": [o.id for o in cacheable if o.cached]}
+
+
+def record_cache_summary(rec: Any, plan: Any, outcomes: Iterable[Any]) -> None:
+    """Add the run's ``cache`` step (see ``cache_summary``) to recorder ``rec``."""
+    summary = cache_summary(plan, outcomes)
+    if summary is not None:
+        total = summary["hits"] + summary["misses"]
+        rec.step("cache", f"Step cache: {summary['hits']}/{total} hits", payload=summary)
+
+
+def _maxsize_from_env() -> int:
+    try:
+        return max(1, int(os.getenv("IPAV_STEP_CACHE_SIZE", "1024")))
+    except ValueError:
+        return 1024
+
+
+# In-process only; used when no run store is involved.
+STEP_CACHE = StepCache()
+
+_BY_STORE: Dict[str, StepCache] = {}
+_BY_STORE_LOCK = threading.Lock()
+
+
+def step_cache_for(store: Any = None) -> StepCache:
+    """The shared cache for a run store (one per database file), or ``STEP_CACHE``."""
+    if store is None:
+        return STEP_CACHE
+    path = str(store.db_path)
+    with _BY_STORE_LOCK:
+        cache = _BY_STORE.get(path)
+        if cache is None or cache.store is not store:
+            cache = _BY_STORE[path] = StepCache(store)
+        return cache
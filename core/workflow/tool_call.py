@@ -0,0 +1,96 @@
+"""
+core/workflow/tool_call.py
+--------------------------
+
+The ``ToolCall`` that compiled recipes run with in production
+(``engine.execute_recipe_run``; see ``core.recipes.compiler.RecipePlan.run``).
+
+A step's tool is dispatched, in order, to:
+
+- ``core.orchestrator_runtime.run_tool`` when the step's action (or tool
+  name) is one of its built-in tools (``servicenow_health``,
+  ``servicenow_publish_kb``, ``baseline_dashboard``, ...);
+- the HTTP endpoint registered for the tool in the Tools table, matched on
+  the step's tool name (``mcp-slack``) or its target (``slack``):
+  ``POST <endpoint>`` with ``{"action": ..., "params": ...}`` and, for
+  checkpointed runs, an ``Idempotency-Key`` header.  The JSON response is
+  the step's result.
+
+Anything else returns None, so a step with a ``fallback`` is simulated and
+one without gets no result, as when a plan runs without a ``call``.
+Endpoints are read from the Tools table once per ``make_tool_call()``, so
+the returned callable does not touch the session and can be shared by the
+DAG executor's worker threads.
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Mapping, Optional
+
+import requests
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..db.models import Tool
+from ..recipes.cache import thaw
+from ..recipes.compiler import ToolBinding, ToolCall
+
+__all__ = ["BUILTIN_TOOLS", "make_tool_call", "tool_endpoints"]
+
+# Tool names core.orchestrator_runtime.run_tool implements.
+BUILTIN_TOOLS = frozenset(
+    {
+        "servicenow_health",
+        "servicenow_publish_kb",
+        "mcp_create_servicenow",
+        "mcp_test_servicenow",
+        "baseline_dashboard",
+    }
+)
+
+
+def _timeout_from_env() -> float:
+    try:
+        return max(1.0, float(os.getenv("IPAV_TOOL_TIMEOUT_S", "30")))
+    except ValueError:
+        return 30.0
+
+
+def tool_endpoints(db: Session) -> Dict[str, str]:
+    """``{tool name: endpoint}`` for the Tools table rows that have an endpoint."""
+    rows = db.execute(select(Tool.name, Tool.endpoint).where(Tool.endpoint.isnot(None))).all()
+    return {name: endpoint for name, endpoint in rows if endpoint}
+
+
+def make_tool_call(
+    db: Optional[Session] = None,
+    *,
+    endpoints: Optional[Mapping[str, str]] = None,
+    timeout_s: Optional[float] = None,
+) -> ToolCall:
+    """
+    A ``call(tool, action, params, idempotency_key=None)`` for
+    ``RecipePlan.run`` / ``DagExecutor`` / ``run_recipe``.  ``endpoints``
+    defaults to the Tools table of ``db`` (none without a session).
+    """
+    if endpoints is None:
+        endpoints = tool_endpoints(db) if db is not None else {}
+    endpoints = dict(endpoints)
+    timeout = _timeout_from_env() if timeout_s is None else float(timeout_s)
+
+    def call(tool: ToolBinding, action: Optional[str], params: Any, idempotency_key: Optional[str] = None) -> Any:
+        params = thaw(params)
+        builtin = action if action in BUILTIN_TOOLS else tool.name if tool.name in BUILTIN_TOOLS else None
+        if builtin is not None:
+            from ..orchestrator_runtime import run_tool
+
+            return run_tool(builtin, params if isinstance(params, dict) else {"value": params}, {})
+        endpoint = tool.endpoint or endpoints.get(tool.name) or endpoints.get(tool.target)
+        if not endpoint:
+            return None
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        r = requests.post(endpoint, json={"action": action, "params": params}, headers=headers, timeout=timeout)
+        r.raise_for_status()
+        return r.json() if r.content else None
+
+    return call
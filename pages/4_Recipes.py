@@ -4,20 +4,22 @@ Recipes page for the AV operations assistant.
 This script provides a UI for creating, viewing and editing YAML recipes
 that encode operational workflows.  Guardrails (timeouts, rollback
 actions and success metrics) help avoid runaway automation and should be
-included in every recipe.  The page also displays success metrics for
-previous runs and integrates with version control to surface git hints.
+included in every recipe.  The page also displays success metrics and
+p50/p95/p99 latency (from the run store's rollup sketches) for previous
+runs and integrates with version control to surface git hints.
 """
 from __future__ import annotations  # <-- must be here (after docstring)
 import os
 import subprocess
 import json  # Added import so json.dumps works:contentReference[oaicite:2]{index=2}
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from core.db.models import Recipe
 from core.db.session import get_session
 from core.recipes.service import load_recipe_dict, save_recipe_yaml
 from core.recipes.validator import validate_yaml_text
 from core.runs_store import RunStore
+from core.runstore_factory import make_runstore
 from core.ui.page_tips import show as show_tip
 import io, zipfile
 from typing import List, Dict, Any
@@ -149,13 +151,8 @@ os.makedirs(RECIPES_DIR, exist_ok=True)
 
 
 def _make_store() -> RunStore:
-    """Create a RunStore instance for accessing run metrics."""
-    db_path = Path(__file__).resolve().parents[1] / "avops.db"
-    try:
-        return RunStore(db_path=db_path)
-    except TypeError:
-        # Fall back to default in-memory store when db_path is not accepted
-        return RunStore()
+    """Return the shared RunStore used for run metrics."""
+    return make_runstore()
 
 
 def _git_commit_hint(path: str) -> str:
@@ -227,6 +224,18 @@ st.divider()
 st.subheader("Existing Recipes")
 
 recipe_search = st.text_input("Search recipes", placeholder="Filter by name...")
+latency_window = st.selectbox("Latency window", ["24h", "7d", "30d", "All"], index=1)
+_WINDOW_HOURS = {"24h": 24, "7d": 24 * 7, "30d": 24 * 30}
+latency_since = (
+    datetime.now(timezone.utc) - timedelta(hours=_WINDOW_HOURS[latency_window])
+    if latency_window in _WINDOW_HOURS
+    else None
+)
+# One grouped read of the hourly latency sketches covers every recipe.
+try:
+    latency_by_recipe = store.latency_sketches(since=latency_since, by="recipe_id")
+except Exception:
+    latency_by_recipe = {}
 
 with get_session() as db:  # type: ignore
     recipes = db.query(Recipe).order_by(Recipe.name).all()
@@ -263,6 +272,13 @@ with get_session() as db:  # type: ignore
                 f"{dot} Success: {success:.1f}% over {metrics.get('runs', 0)} run(s) · "
                 f"Avg: {metrics.get('avg_ms', 0):.0f} ms · Last status: {metrics.get('last_status')}"
             )
+            sketch = latency_by_recipe.get(r.id)
+            if sketch is not None and sketch.count:
+                pct = sketch.percentiles()
+                st.caption(
+                    f"Latency ({latency_window}, {sketch.count} run(s)): "
+                    f"p50 {pct['p50_ms']:.0f} ms · p95 {pct['p95_ms']:.0f} ms · p99 {pct['p99_ms']:.0f} ms"
+                )
             st.caption(f"Version: updated {updated_at} · Git: {git_hint}")
 
             # Warn/inform about missing guardrails or success metrics
@@ -9,7 +9,7 @@ from core.db.session import get_session
 from core.db.models import Base, Agent, Recipe
 from core.workflow.service import (
     list_workflows, create_workflow, update_workflow, delete_workflow,
-    run_now, compute_status, tick
+    run_now, compute_status, tick_with_summary, upcoming_fires, fire_density
 )
 from core.ui.page_tips import show as show_tip
 from core.io.port import export_zip, import_zip
@@ -66,8 +66,37 @@ with get_session() as db:  # keep DB open for the whole page render
 
     colL, colR = st.columns([1, 3])
     if colL.button("⏱️ Tick scheduler"):
-        n = tick(db)
-        st.toast(f"Ticked. Ran {n} workflow(s).")
+        summary = tick_with_summary(db)  # $IPAV_TICK_WORKERS > 1 runs due workflows in parallel
+        st.toast(
+            f"Ticked. Ran {summary.dispatched} of {summary.due} due workflow(s) · "
+            f"skipped {summary.skipped} · failed {summary.failed} · "
+            f"max queue {summary.queue_ms_max:.0f} ms"
+        )
+        for wf_id, err in summary.errors.items():
+            st.error(f"Workflow #{wf_id} failed: {err}")
+    colR.caption(
+        "Interval and cron workflows run automatically while the scheduler daemon is up "
+        "(`python -m core.workflow.scheduler`); the Tick button runs anything due right now."
+    )
+
+    with st.expander("Upcoming fires"):
+        n_fires = st.number_input("Fires per workflow", min_value=1, max_value=50, value=5)
+        fires = upcoming_fires(db, int(n_fires))
+        names = {wf.id: wf.name for wf in wfs}
+        if not any(fires.values()):
+            st.caption("No scheduled workflows.")
+        else:
+            st.table([
+                {"workflow": names.get(wf_id, wf_id), "next fires (UTC)": ", ".join(f"{t:%a %m-%d %H:%M}" for t in times)}
+                for wf_id, times in fires.items()
+            ])
+            herds = [(t, ids) for t, ids in fire_density(fires) if len(ids) > 1]
+            if herds:
+                st.warning(
+                    "Workflows starting in the same minute: "
+                    + "; ".join(f"{t:%m-%d %H:%M} ×{len(ids)}" for t, ids in herds[:5])
+                    + ". Stagger their schedules (or run the daemon with `--jitter`)."
+                )
 
     # --- New Workflow (ID-based, avoid ORM instances in widget state) ---
     st.subheader("New Workflow")
@@ -94,8 +123,24 @@ with get_session() as db:  # keep DB open for the whole page render
             ) if recipe_opts else None
         )
 
-        trig = st.selectbox("Trigger", ["manual", "interval"])
+        trig = st.selectbox("Trigger", ["manual", "interval", "cron", "event"])
         minutes = st.number_input("Interval minutes", min_value=1, value=60) if trig == "interval" else None
+        cron_expr = (
+            st.text_input(
+                "Cron expression",
+                value="30 7 * * MON-FRI",
+                help="minute hour day month weekday, evaluated in $IPAV_SCHEDULER_TZ (default UTC). "
+                     "Fires outside the agent's maintenance window are skipped.",
+            ) if trig == "cron" else None
+        )
+        topics = (
+            st.text_input(
+                "Event topics",
+                value="incident.*",
+                help="Comma-separated topic globs. Events come from core.workflow.events.publish_event "
+                     "or POST /events on `python -m core.workflow.events`; the payload becomes recipe inputs.",
+            ) if trig == "event" else None
+        )
 
         ok = st.form_submit_button("Create Workflow")
 
@@ -129,6 +174,7 @@ with get_session() as db:  # keep DB open for the whole page render
                     recipe_id=int(recipe_id),
                     trigger_type=trig,
                     trigger_value=int(minutes) if minutes else None,
+                    trigger_expr=cron_expr or topics,
                 )
                 st.success("Workflow created.")
                 st.rerun()
@@ -151,7 +197,7 @@ with get_session() as db:  # keep DB open for the whole page render
                 top[0].markdown(
                     f"""**{wf.name}**
 Agent ID: `{wf.agent_id}` · Recipe ID: `{wf.recipe_id}`
-Trigger: `{wf.trigger_type}` {wf.trigger_value or ''}"""
+Trigger: `{wf.trigger_type}` {getattr(wf, "trigger_expr", None) or wf.trigger_value or ''}"""
                 )
                 top[1].markdown(
                     f"<div style='text-align:right;font-size:24px'>{color}</div>",
@@ -8,13 +8,17 @@ exploration and a quick summary of current workflows.  The page makes
 minimal assumptions about the underlying run log store by delegating to a
 factory (`make_runstore`) that returns a compatible interface.  It falls
 back gracefully when optional dependencies (e.g. streamlit_autorefresh)
-aren't installed.
+aren't installed.  Each rerun first asks the store's change feed whether any
+run or step was written since the previous render; if not, the KPIs, runs
+page, trend and run details are served from the session cache, so
+auto-refresh costs one cheap query per tick instead of a full reload.
 """
 
 from __future__ import annotations
 
 import json
 import math
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
@@ -72,6 +76,43 @@ elif win == "30d":
     since = now - timedelta(days=30)
 
 
+# ---------------------------------------------------------------------------
+# Change feed: reuse the previous render's data while nothing is written
+# ---------------------------------------------------------------------------
+DASH_CACHE_TTL_S = 60.0  # refresh anyway so sliding time windows stay current
+
+
+def _feed_changed(store) -> bool:
+    """Advance this session's feed cursor; True if runs/steps changed since the last render."""
+    if not hasattr(store, "changes_since"):
+        return True
+    cursor = st.session_state.get("feed_cursor")
+    try:
+        if cursor is None:
+            st.session_state["feed_cursor"] = store.change_cursor()
+            return True
+        feed = store.changes_since(cursor)
+    except Exception:
+        return True
+    st.session_state["feed_cursor"] = feed["cursor"]
+    return bool(feed["runs"] or feed["more"] or feed["reset"])
+
+
+if _feed_changed(store):
+    st.session_state["dash_cache"] = {}
+
+
+def _cached(name: str, key: Any, loader):
+    """Return the value cached under ``name`` for ``key``, calling ``loader`` on a miss."""
+    cache = st.session_state.setdefault("dash_cache", {})
+    hit = cache.get(name)
+    if hit is not None and hit[0] == key and time.monotonic() - hit[2] < DASH_CACHE_TTL_S:
+        return hit[1]
+    value = loader()
+    cache[name] = (key, value, time.monotonic())
+    return value
+
+
 # ---------------------------------------------------------------------------
 # Helpers for heterogeneous stores
 # ---------------------------------------------------------------------------
@@ -105,21 +146,23 @@ def _stats_compat(store, *, hours: Optional[int] = None, since: Optional[datetim
 
 def _latest_runs_compat(store, *, limit: int, statuses: List[str], since: Optional[datetime]) -> List[Dict[str, Any]]:
     """Fetch runs from the store using whatever API it supports."""
-    # Try the current RunStore API first
+    # Try the current RunStore API first; it filters status/since in SQL.
+    try:
+        return store.latest_runs(limit=limit, status=statuses, since=since)
+    except Exception:
+        pass
+
+    # Fallback to alternative methods for other store implementations
     try:
-        rows = store.latest_runs(limit=limit, status=statuses)
+        hours = None
+        if since:
+            hours = max(1, int((datetime.now(timezone.utc) - since).total_seconds() // 3600))
+        rows = store.recent(limit=limit, hours=hours or 24)
     except Exception:
-        # Fallback to alternative methods for other store implementations
         try:
-            hours = None
-            if since:
-                hours = max(1, int((datetime.now(timezone.utc) - since).total_seconds() // 3600))
-            rows = store.recent(limit=limit, hours=hours or 24)
+            rows = store.list_runs()
         except Exception:
-            try:
-                rows = store.list_runs()
-            except Exception:
-                rows = []
+            rows = []
 
     out: List[Dict[str, Any]] = []
     for r in rows:
@@ -163,6 +206,23 @@ def _latest_runs_compat(store, *, limit: int, statuses: List[str], since: Option
     return out
 
 
+def _page_runs_compat(
+    store, *, cursor: Optional[str], page_size: int, statuses: List[str], since: Optional[datetime]
+) -> Dict[str, Any]:
+    """One page of runs plus cursors; keyset-paginated when the store supports it."""
+    if hasattr(store, "page_runs"):
+        return store.page_runs(cursor=cursor, page_size=page_size, status=statuses, since=since)
+    # Offset paging over a bounded fetch for stores without page_runs().
+    rows = _latest_runs_compat(store, limit=200, statuses=statuses, since=since)
+    offset = int(cursor) if cursor and cursor.isdigit() else 0
+    nxt = offset + page_size
+    return {
+        "runs": rows[offset:nxt],
+        "next_cursor": str(nxt) if nxt < len(rows) else None,
+        "prev_cursor": str(max(0, offset - page_size)) if offset else None,
+    }
+
+
 def _normalize_run(r: Dict[str, Any]) -> Dict[str, Any]:
     """Normalize a run dict into a common shape for display."""
     meta = r.get("meta") or {}
@@ -220,12 +280,41 @@ def _normalize_run(r: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def _run_details_compat(store, run_id: Any) -> Dict[str, Any]:
-    """Fetch detailed run data from the store, with fallback."""
+def _run_header_compat(store, run_id: Any) -> Dict[str, Any]:
+    """Run header with step/artifact counts; older stores fall back to run_details."""
+    if hasattr(store, "run_header"):
+        try:
+            return store.run_header(run_id) or {"id": run_id, "step_count": 0, "artifact_count": 0}
+        except Exception:
+            pass
+    try:
+        detail = store.run_details(run_id)
+    except Exception:
+        detail = {"id": run_id, "steps": [], "artifacts": []}
+    detail["step_count"] = len(detail.get("steps") or [])
+    detail["artifact_count"] = len(detail.get("artifacts") or [])
+    return detail
+
+
+def _section_page_compat(store, header: Dict[str, Any], section: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+    """One page of ``steps``/``artifacts`` without their payloads when the store supports it."""
+    if section in header:  # fallback header already carries every row
+        return header[section][offset:offset + limit]
     try:
-        return store.run_details(run_id)
+        return getattr(store, section)(header["id"], offset=offset, limit=limit)["items"]
     except Exception:
-        return {"id": run_id, "steps": [], "artifacts": []}
+        return []
+
+
+def _payload_compat(store, section: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Load a row's payload on demand (already inline for fallback stores)."""
+    if section == "steps":
+        if "payload" in row or "result" in row:
+            return {"payload": row.get("payload"), "result": row.get("result")}
+        return store.step_payload(row["id"])
+    if "data" in row:
+        return {"data": row.get("data")}
+    return {"data": store.artifact_data(row["id"])}
 
 
 # ---------------------------------------------------------------------------
@@ -235,7 +324,7 @@ hours_for_stats = None
 if since:
     hours_for_stats = max(1, int((datetime.now(timezone.utc) - since).total_seconds() // 3600))
 
-stats = _stats_compat(store, hours=hours_for_stats, since=since)
+stats = _cached("stats", win, lambda: _stats_compat(store, hours=hours_for_stats, since=since))
 runs_total = stats.get("runs") or stats.get("count") or 0
 success_rate = stats.get("success_rate")
 if success_rate is None:
@@ -247,22 +336,92 @@ if p95_ms is None:
     p95_ms = (float(p95_s) * 1000.0) if p95_s is not None else 0.0
 last_error = stats.get("last_error") or ""
 
+latency = _cached(
+    "latency",
+    win,
+    lambda: store.latency_percentiles(since=since) if hasattr(store, "latency_percentiles") else {},
+)
+
 c1, c2, c3, c4 = st.columns(4)
 c1.metric("Runs", f"{runs_total}")
 c2.metric("Success rate", f"{success_rate:.1f}%")
-c3.metric("p95 duration", f"{p95_ms:.0f} ms")
+if latency.get("runs"):
+    c3.metric(
+        "p95 duration",
+        f"{latency['p95_ms']:.0f} ms",
+        help=f"p50 {latency['p50_ms']:.0f} ms · p99 {latency['p99_ms']:.0f} ms (from hourly rollups)",
+    )
+    c3.caption(f"p50 {latency['p50_ms']:.0f} ms · p99 {latency['p99_ms']:.0f} ms")
+else:
+    c3.metric("p95 duration", f"{p95_ms:.0f} ms")
 c4.metric("Last error", last_error or "—")
 
 
 # ---------------------------------------------------------------------------
 # Recent runs table with pagination
 # ---------------------------------------------------------------------------
-rows_raw = _latest_runs_compat(store, limit=200, statuses=statuses, since=since)
-rows = [_normalize_run(r) for r in rows_raw]
+filter_key = (win, tuple(statuses), page_size)
+if st.session_state.get("runs_filter_key") != filter_key:
+    st.session_state["runs_filter_key"] = filter_key
+    st.session_state["runs_cursor"] = None
+    st.session_state["runs_page"] = 1
+
+page_data = _cached(
+    "runs_page",
+    (filter_key, st.session_state.get("runs_cursor")),
+    lambda: _page_runs_compat(
+        store,
+        cursor=st.session_state.get("runs_cursor"),
+        page_size=max(1, int(page_size)),
+        statuses=statuses,
+        since=since,
+    ),
+)
+rows = [_normalize_run(r) for r in page_data.get("runs", [])]
 
 # Drop runs with no timestamp to avoid pandas sort errors
 rows = [r for r in rows if r["started_at"] is not None]
 
+# ---------------------------------------------------------------------------
+# Full-text search across runs
+# ---------------------------------------------------------------------------
+if hasattr(store, "search"):
+    st.subheader("Search Runs")
+    query = st.text_input(
+        "Search step messages, errors and artifacts",
+        placeholder="e.g. HDMI_RX_1 OR 401",
+        key="run_search_query",
+    )
+    search_all = st.checkbox("Search all time", key="run_search_all", help="Ignore the time window and status filter.")
+    if query.strip():
+        if search_all:
+            found = store.search(query, limit=25)
+            st.caption(f"{found['total']} matching run(s).")
+        else:
+            found = store.search(query, since=since, status=statuses, limit=25)
+            st.caption(f"{found['total']} matching run(s) in this window.")
+        if found["hits"]:
+            st.data_editor(
+                pd.DataFrame(
+                    {
+                        "id": h["run"]["id"],
+                        "name": h["run"]["name"],
+                        "status": h["run"]["status"],
+                        "started_at": h["run"]["started_at"],
+                        "matches": h["matches"],
+                        "snippet": " · ".join(m["snippet"] for m in h["snippets"]),
+                        "Details": f"/Run_Detail?run_id={h['run']['id']}",
+                    }
+                    for h in found["hits"]
+                ),
+                use_container_width=True,
+                hide_index=True,
+                disabled=True,
+                column_config={"Details": st.column_config.LinkColumn("Details", display_text="Open")},
+                key="run_search_results",
+            )
+
+
 if not rows:
     st.info("No runs in this window. Trigger a workflow from **🧩 Workflows** or use **/sop** in **💬 Chat**.")
     st.stop()
@@ -280,36 +439,16 @@ records = [
     }
     for r in rows
 ]
-df_all = pd.DataFrame(records)
-df_all.sort_values("started_at", ascending=False, inplace=True)
-
-total_runs = len(df_all)
-page_size = max(1, int(page_size))
-total_pages = max(1, math.ceil(total_runs / page_size))
-if "runs_page" not in st.session_state:
-    st.session_state["runs_page"] = 1
-if st.session_state["runs_page"] > total_pages:
-    st.session_state["runs_page"] = total_pages
-
-page = int(
-    st.number_input(
-        "Page",
-        min_value=1,
-        max_value=total_pages,
-        value=st.session_state["runs_page"],
-        step=1,
-        key="runs_page_widget",
-    )
-)
-st.session_state["runs_page"] = page
-
-start_idx = (page - 1) * page_size
-end_idx = min(start_idx + page_size, total_runs)
-df_page = df_all.iloc[start_idx:end_idx].copy()
+df_page = pd.DataFrame(records)
 df_page["Details"] = df_page["id"].apply(lambda rid: f"/Run_Detail?run_id={rid}")
 
 st.subheader("Recent Runs")
-st.caption(f"Showing runs {start_idx + 1}-{end_idx} of {total_runs}.")
+page = int(st.session_state.get("runs_page", 1))
+if hasattr(store, "count_runs"):
+    matching = _cached("runs_count", filter_key, lambda: store.count_runs(status=statuses, since=since))
+    st.caption(f"Page {page} · {len(df_page)} run(s) · {matching} matching run(s) in window.")
+else:
+    st.caption(f"Page {page} · {len(df_page)} run(s) · {runs_total} run(s) in window (all statuses).")
 st.data_editor(
     df_page,
     use_container_width=True,
@@ -320,25 +459,50 @@ st.data_editor(
     },
 )
 
+nav_prev, nav_next, _ = st.columns([1, 1, 6])
+if nav_prev.button("◀ Newer", disabled=not page_data.get("prev_cursor")):
+    st.session_state["runs_cursor"] = page_data["prev_cursor"]
+    st.session_state["runs_page"] = max(1, page - 1)
+    st.rerun()
+if nav_next.button("Older ▶", disabled=not page_data.get("next_cursor")):
+    st.session_state["runs_cursor"] = page_data["next_cursor"]
+    st.session_state["runs_page"] = page + 1
+    st.rerun()
+
 
 # ---------------------------------------------------------------------------
 # Trend chart
 # ---------------------------------------------------------------------------
 st.subheader("Run Trend")
-trend = (
-    df_all.groupby(df_all["started_at"].dt.floor("H"))["id"]
-    .count()
-    .reset_index()
-    .rename(columns={"id": "runs"})
-)
-st.line_chart(trend.set_index("started_at"))
+
+
+def _trend_compat(store, *, since: Optional[datetime]) -> pd.DataFrame:
+    """Plot data from the store's rollups, or from the current page of runs."""
+    if hasattr(store, "run_series"):
+        grain = "hour" if win in ("24h", "7d") else "day"
+        series = store.run_series(since=since, until=now, grain=grain)
+        if series:
+            return (
+                pd.DataFrame(series)
+                .set_index("bucket_start")[["successes", "failures"]]
+            )
+    trend = (
+        df_page.groupby(df_page["started_at"].dt.floor("H"))["id"]
+        .count()
+        .reset_index()
+        .rename(columns={"id": "runs"})
+    )
+    return trend.set_index("started_at")
+
+
+st.line_chart(_cached("trend", win, lambda: _trend_compat(store, since=since)))
 
 
 # ---------------------------------------------------------------------------
 # Run details explorer
 # ---------------------------------------------------------------------------
 st.subheader("Run Details")
-selected_id = st.selectbox("Select a run ID", options=df_all["id"].tolist(), index=0)
+selected_id = st.selectbox("Select a run ID", options=df_page["id"].tolist(), index=0)
 try:
     selected_id_int = int(selected_id)
 except (TypeError, ValueError):
@@ -350,7 +514,7 @@ if st.session_state.get("current_detail_id") != selected_id_int:
     st.session_state[f"steps_page_{selected_id_int}"] = 1
     st.session_state[f"artifacts_page_{selected_id_int}"] = 1
 
-detail = _run_details_compat(store, selected_id_int)
+detail = _cached("detail", selected_id_int, lambda: _run_header_compat(store, selected_id_int))
 
 left, right = st.columns([2, 1], vertical_alignment="top")
 
@@ -372,12 +536,11 @@ with left:
 
     # Steps
     st.markdown("**Steps**")
-    steps = detail.get("steps", [])
-    if not steps:
+    step_total = int(detail.get("step_count") or 0)
+    if not step_total:
         st.caption("No step events recorded yet.")
     else:
         step_page_size = 5
-        step_total = len(steps)
         step_pages = max(1, math.ceil(step_total / step_page_size))
         step_state_key = f"steps_page_{selected_id_int}"
         current_step_page = min(st.session_state.get(step_state_key, 1), step_pages)
@@ -395,29 +558,36 @@ with left:
         step_start = (current_step_page - 1) * step_page_size
         step_end = min(step_start + step_page_size, step_total)
         st.caption(f"Showing steps {step_start + 1}-{step_end} of {step_total}.")
-        for s in steps[step_start:step_end]:
+        step_rows = _cached(
+            "steps",
+            (selected_id_int, step_start),
+            lambda: _section_page_compat(store, detail, "steps", step_start, step_page_size),
+        )
+        for s in step_rows:
             phase = s.get("phase") or "—"
             msg = s.get("message") or s.get("msg") or "—"
             stts = s.get("status") or "—"
             ts = s.get("ts") or s.get("time") or "—"
             with st.expander(f"[{phase}] {msg}  —  {stts} · {ts}", expanded=False):
-                c1, c2 = st.columns(2)
-                with c1:
-                    st.markdown("**Payload**")
-                    st.json(s.get("payload") or {})
-                with c2:
-                    st.markdown("**Result**")
-                    st.json(s.get("result") or {})
+                # Payloads are fetched only when asked for, one row at a time.
+                if st.toggle("Load payload", key=f"step_payload_{selected_id_int}_{s.get('id')}"):
+                    body = _payload_compat(store, "steps", s)
+                    c1, c2 = st.columns(2)
+                    with c1:
+                        st.markdown("**Payload**")
+                        st.json(body.get("payload") or {})
+                    with c2:
+                        st.markdown("**Result**")
+                        st.json(body.get("result") or {})
 
 with right:
     st.markdown("**Artifacts**")
-    arts = detail.get("artifacts", [])
-    if not arts:
+    art_total = int(detail.get("artifact_count") or 0)
+    if not art_total:
         st.caption("No artifacts captured.")
         st.write("—")
     else:
         art_page_size = 4
-        art_total = len(arts)
         art_pages = max(1, math.ceil(art_total / art_page_size))
         art_state_key = f"artifacts_page_{selected_id_int}"
         current_art_page = min(st.session_state.get(art_state_key, 1), art_pages)
@@ -435,15 +605,21 @@ with right:
         art_start = (current_art_page - 1) * art_page_size
         art_end = min(art_start + art_page_size, art_total)
         st.caption(f"Showing artifacts {art_start + 1}-{art_end} of {art_total}.")
-        for a in arts[art_start:art_end]:
+        art_rows = _cached(
+            "artifacts",
+            (selected_id_int, art_start),
+            lambda: _section_page_compat(store, detail, "artifacts", art_start, art_page_size),
+        )
+        for a in art_rows:
             with st.container(border=True):
                 st.write(f"**{a.get('kind','artifact')}** — {a.get('title','')}")
                 if a.get("url"):
                     st.write(a["url"])
                 if a.get("external_id"):
                     st.caption(f"id: {a['external_id']}")
-                if a.get("data"):
-                    st.json(a["data"])
+                if st.toggle("Show data", key=f"art_data_{selected_id_int}_{a.get('id')}"):
+                    data = _payload_compat(store, "artifacts", a).get("data")
+                    st.json(data or {})
 
 
 # ---------------------------------------------------------------------------
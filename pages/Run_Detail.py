@@ -4,19 +4,33 @@ pages/Run_Detail.py
 
 Dedicated page for viewing the full details of a workflow run.  This page is
 linked from the Dashboard and accepts a ``run_id`` query parameter.  It
-retrieves the run information via the shared run store and presents all
-step events and artifacts without pagination.  If no run ID is provided or
+retrieves the run header via the shared run store, then pages through step
+events and artifacts; payloads are loaded per row only when expanded, so
+runs with thousands of steps render quickly.  Runs instrumented with spans
+get a per-span latency breakdown and a waterfall chart, and failed
+checkpointed recipe runs a Resume button.  If no run ID is provided or
 the run is not found, informative messages are shown instead of crashing.
 """
 
 from __future__ import annotations
 
+import json
+import math
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 
+import pandas as pd
 import streamlit as st
 
+try:  # bundled with streamlit, but keep the page usable without it
+    import altair as alt
+except Exception:
+    alt = None
+
+from core.db.session import get_session
 from core.runstore_factory import make_runstore
+from core.workflow.checkpoints import resume
+from core.workflow.tool_call import make_tool_call
 
 st.set_page_config(page_title="Run Details", page_icon="🔎", layout="wide")
 st.title("🔎 Run Details")
@@ -33,10 +47,13 @@ if run_id is None:
     st.info("No run_id provided in the URL.")
     st.stop()
 
-# Instantiate run store and fetch details
+STEP_PAGE_SIZE = 50
+ARTIFACT_PAGE_SIZE = 20
+
+# Instantiate run store and fetch the header (counts only, no steps)
 store = make_runstore()
 try:
-    detail = store.run_details(run_id)  # type: ignore[attr-defined]
+    detail = store.run_header(run_id)  # type: ignore[attr-defined]
 except Exception:
     detail = {}
 
@@ -44,6 +61,15 @@ if not detail:
     st.warning(f"Run with ID {run_id} not found.")
     st.stop()
 
+
+def _page_number(label: str, total: int, page_size: int, key: str) -> int:
+    pages = max(1, math.ceil(total / page_size))
+    page = int(st.number_input(label, min_value=1, max_value=pages, value=1, step=1, key=key))
+    start = (page - 1) * page_size
+    st.caption(f"Showing {start + 1}-{min(start + page_size, total)} of {total}.")
+    return start
+
+
 # Header
 st.header(f"Run #{run_id}: {detail.get('name') or 'Run'}")
 st.caption(
@@ -52,35 +78,97 @@ st.caption(
     f"Started: {detail.get('started_at')} · Finished: {detail.get('finished_at')}"
 )
 
+# Failed checkpointed recipe runs continue from their last completed step
+# (core.workflow.checkpoints); completed tool calls are not repeated.
+if detail.get("status") == "failed" and (detail.get("meta") or {}).get("recipe"):
+    if st.button("▶️ Resume from the last completed step", key="resume_run"):
+        try:
+            with get_session() as db:
+                call = make_tool_call(db)
+            attempt = resume(run_id, call=call, store=store)
+        except Exception as e:
+            st.error(f"Resume failed: {e}")
+        else:
+            st.success(f"Resumed as run #{attempt.run_id} ({len(attempt.resumed)} step(s) restored).")
+            st.markdown(f"[Open run #{attempt.run_id}](?run_id={attempt.run_id})")
+
+# Latency breakdown (spans recorded with rec.span(...))
+breakdown = store.latency_breakdown(run_id) if hasattr(store, "latency_breakdown") else {}
+spans: List[Dict[str, Any]] = breakdown.get("spans", [])
+if spans:
+    with st.expander(f"⏱️ Latency breakdown ({len(spans)} spans)", expanded=True):
+        wf = pd.DataFrame(
+            {
+                "order": i,
+                "span": f"{'  ' * sp['depth']}{sp['name']}",
+                "start_ms": round(sp["offset_ms"], 1),
+                "end_ms": round(sp["offset_ms"] + sp["duration_ms"], 1),
+                "duration_ms": round(sp["duration_ms"], 1),
+                "self_ms": round(sp["self_ms"], 1),
+                "status": sp["status"],
+                "attrs": json.dumps(sp["attrs"], default=str),
+            }
+            for i, sp in enumerate(spans)
+        )
+        if alt is not None:
+            chart = (
+                alt.Chart(wf)
+                .mark_bar()
+                .encode(
+                    x=alt.X("start_ms:Q", title="ms since run start"),
+                    x2="end_ms:Q",
+                    y=alt.Y("span:N", sort=alt.EncodingSortField("order"), title=None),
+                    color=alt.Color(
+                        "status:N",
+                        scale=alt.Scale(domain=["ok", "error"], range=["#4c78a8", "#e45756"]),
+                    ),
+                    tooltip=["span", "duration_ms", "self_ms", "status", "attrs"],
+                )
+                .properties(height=max(120, 24 * len(wf)))
+            )
+            st.altair_chart(chart, use_container_width=True)
+        else:
+            st.dataframe(wf.drop(columns=["order"]), use_container_width=True, hide_index=True)
+        st.markdown("**Time by span** (self time excludes child spans)")
+        st.dataframe(
+            pd.DataFrame(breakdown["by_name"]).round(1), use_container_width=True, hide_index=True
+        )
+
 left, right = st.columns([2, 1], vertical_alignment="top")
 
 with left:
     st.markdown("**Steps**")
-    steps: List[Dict[str, Any]] = detail.get("steps", [])  # type: ignore[assignment]
-    if not steps:
+    step_total = int(detail.get("step_count") or 0)
+    if not step_total:
         st.caption("No step events recorded.")
     else:
+        offset = _page_number("Step page", step_total, STEP_PAGE_SIZE, f"rd_steps_{run_id}")
+        steps: List[Dict[str, Any]] = store.steps(run_id, offset=offset, limit=STEP_PAGE_SIZE)["items"]
         for s in steps:
             phase = s.get("phase") or "—"
             msg = s.get("message") or s.get("msg") or "—"
             stts = s.get("status") or "—"
             ts = s.get("ts") or s.get("time") or "—"
             with st.expander(f"[{phase}] {msg}  —  {stts} · {ts}", expanded=False):
-                c1, c2 = st.columns(2)
-                with c1:
-                    st.markdown("**Payload**")
-                    st.json(s.get("payload") or {})
-                with c2:
-                    st.markdown("**Result**")
-                    st.json(s.get("result") or {})
+                if st.toggle("Load payload", key=f"rd_step_{s['id']}"):
+                    body = store.step_payload(s["id"])
+                    c1, c2 = st.columns(2)
+                    with c1:
+                        st.markdown("**Payload**")
+                        st.json(body.get("payload") or {})
+                    with c2:
+                        st.markdown("**Result**")
+                        st.json(body.get("result") or {})
 
 with right:
     st.markdown("**Artifacts**")
-    arts: List[Dict[str, Any]] = detail.get("artifacts", [])  # type: ignore[assignment]
-    if not arts:
+    art_total = int(detail.get("artifact_count") or 0)
+    if not art_total:
         st.caption("No artifacts captured.")
         st.write("—")
     else:
+        offset = _page_number("Artifact page", art_total, ARTIFACT_PAGE_SIZE, f"rd_arts_{run_id}")
+        arts: List[Dict[str, Any]] = store.artifacts(run_id, offset=offset, limit=ARTIFACT_PAGE_SIZE)["items"]
         for a in arts:
             with st.container(border=True):
                 st.write(f"**{a.get('kind','artifact')}** — {a.get('title','')}")
@@ -88,5 +176,5 @@ with right:
                     st.write(a["url"])
                 if a.get("external_id"):
                     st.caption(f"id: {a['external_id']}")
-                if a.get("data"):
-                    st.json(a["data"])
+                if st.toggle("Show data", key=f"rd_art_{a['id']}"):
+                    st.json(store.artifact_data(a["id"]) or {})
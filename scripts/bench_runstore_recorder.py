@@ -0,0 +1,48 @@
+"""Benchmark RunStore step recording: per-row commits vs. the buffered recorder.
+
+Usage: python scripts/bench_runstore_recorder.py [--steps 1000] [--flush-size 100]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.runs_store import RunStore
+
+
+def _run(store: RunStore, n_steps: int, **kwargs) -> float:
+    start = time.perf_counter()
+    with store.workflow_run(
+        workflow_id="bench", name="bench", agent_id=None, recipe_id=None, **kwargs
+    ) as rec:
+        for i in range(n_steps):
+            rec.step("act", f"step {i}", payload={"i": i}, result={"ok": True})
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--steps", type=int, default=1000)
+    ap.add_argument("--flush-size", type=int, default=100)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RunStore(db_path=Path(tmp) / "bench.db")
+        unbuffered = _run(store, args.steps)
+        buffered = _run(store, args.steps, buffered=True, flush_size=args.flush_size)
+
+    print(f"steps={args.steps} flush_size={args.flush_size}")
+    print(f"unbuffered: {args.steps / unbuffered:10.0f} steps/s  ({unbuffered * 1000:.0f} ms)")
+    print(f"buffered:   {args.steps / buffered:10.0f} steps/s  ({buffered * 1000:.0f} ms)")
+    print(f"speedup:    {unbuffered / buffered:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
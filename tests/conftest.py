@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.db.models import Base
+from core.runs_store import RunStore
+from core.workflow import service
+
+# What service._utcnow() returns inside the session_factory fixture.
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture()
+def store(tmp_path):
+    s = RunStore(db_path=tmp_path / "runs.db")
+    try:
+        yield s
+    finally:
+        s.engine.dispose()
+
+
+@pytest.fixture()
+def session_factory(tmp_path, monkeypatch):
+    """Sessions on a fresh app DB, with the workflow service's clock frozen at ``T0``."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'wf.db'}", future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(service, "_BACKEND", None)
+    monkeypatch.setattr(service, "_utcnow", lambda: T0)
+    try:
+        yield sessionmaker(bind=engine, expire_on_commit=False)
+    finally:
+        engine.dispose()
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+from sqlalchemy import text
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.db.connections import connection_stats, get_engine, raw_connection, sqlite_url
+
+
+def test_sqlite_profile_applied_once_per_connection(tmp_path):
+    url = sqlite_url(tmp_path / "profile.db")
+    engine = get_engine(url)
+    assert get_engine(url) is engine
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+    raw = raw_connection(tmp_path / "profile.db")
+    raw.execute("CREATE TABLE t (x INTEGER)")
+    raw.commit()
+    raw.close()  # back to the pool, not closed
+    raw = raw_connection(tmp_path / "profile.db")
+    raw.execute("INSERT INTO t VALUES (1)")
+    raw.commit()
+    raw.close()
+
+    stats = connection_stats(url)[url]
+    assert stats["connects"] == 1
+    assert stats["checkouts"] >= 3
+
+
+def test_lock_contention_is_counted(tmp_path):
+    path = tmp_path / "locked.db"
+    url = sqlite_url(path)
+    engine = get_engine(url, pragmas={"busy_timeout": 100})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+
+    holder = raw_connection(path)
+    holder.execute("BEGIN IMMEDIATE")
+    holder.execute("INSERT INTO t VALUES (1)")
+    errors = []
+
+    def writer():
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO t VALUES (2)"))
+        except Exception as e:  # expected: database is locked
+            errors.append(e)
+
+    t = threading.Thread(target=writer)
+    t.start()
+    t.join()
+    holder.rollback()
+    holder.close()
+
+    assert errors
+    stats = connection_stats(url)[url]
+    assert stats["lock_errors"] >= 1
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.recipes.cache import RECIPE_CACHE, FrozenDict, RecipeCache, thaw
+from core.recipes.service import load_recipe_dict, recipe_cache_stats
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    RECIPE_CACHE.clear()
+    yield
+    RECIPE_CACHE.clear()
+
+
+def test_file_recipes_cached_until_mtime_or_size_changes(tmp_path):
+    p = tmp_path / "r.yaml"
+    p.write_text("name: one\nplan: [a, b]\n", encoding="utf-8")
+
+    first = load_recipe_dict(p)
+    assert load_recipe_dict(str(p)) is first
+    st = recipe_cache_stats()
+    assert (st.hits, st.misses) == (1, 1)
+
+    p.write_text("name: two\nplan: [a, b, c]\n", encoding="utf-8")
+    bumped = p.stat().st_mtime_ns + 1_000_000
+    os.utime(p, ns=(bumped, bumped))
+    assert load_recipe_dict(p)["name"] == "two"
+    assert recipe_cache_stats().misses == 2
+
+
+def test_cached_recipes_are_read_only_but_serialisable(tmp_path):
+    text = "name: inline\ninputs:\n  channel: {default: '#av'}\nact: [{tool: slack}]\n"
+    rec = load_recipe_dict(text)
+    assert isinstance(rec, FrozenDict) and load_recipe_dict(text) is rec
+
+    with pytest.raises(TypeError):
+        rec["name"] = "x"
+    with pytest.raises(TypeError):
+        rec["act"].append({})
+    with pytest.raises(TypeError):
+        rec["act"][0]["tool"] = "email"
+
+    assert json.loads(json.dumps(rec)) == yaml.safe_load(text)
+    assert yaml.safe_load(yaml.safe_dump(rec)) == yaml.safe_load(text)
+    mutable = thaw(rec)
+    mutable["act"].append({"tool": "email"})
+    assert len(load_recipe_dict(text)["act"]) == 1
+
+
+def test_lru_evicts_least_recently_used():
+    cache = RecipeCache(maxsize=2)
+    cache.get_or_load("a", lambda: {"n": 1})
+    cache.get_or_load("b", lambda: {"n": 2})
+    cache.get_or_load("a", lambda: pytest.fail("a should be cached"))
+    cache.get_or_load("c", lambda: {"n": 3})
+    assert cache.get_or_load("b", lambda: {"n": 22}) == {"n": 22}
+    st = cache.stats()
+    assert (st.hits, st.misses, st.evictions, st.size) == (1, 4, 2, 2)
+
+
+def test_invalid_recipe_errors_are_not_cached():
+    with pytest.raises(ValueError, match="mapping"):
+        load_recipe_dict("- just\n- a list\n")
+    with pytest.raises(ValueError, match="mapping"):
+        load_recipe_dict("- just\n- a list\n")
+    assert recipe_cache_stats().size == 0
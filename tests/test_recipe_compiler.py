@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.recipes.cache import RECIPE_CACHE
+from core.recipes.compiler import (
+    JsonPath,
+    RecipeCompileError,
+    RecipeInputError,
+    Template,
+    compile_recipe,
+    load_recipe_plan,
+)
+
+
+def test_templates_render_values_filters_and_expressions():
+    ctx = {"inputs": {"reporter": "ana", "details": None}, "s": {"ok": False, "metrics": {"cpu": 22}}}
+    assert Template.compile("Hi {{inputs.reporter}}").render(ctx) == "Hi ana"
+    assert Template.compile('{{inputs.details|default("n/a")}}').render(ctx) == "n/a"
+    assert Template.compile("{{s.metrics}}").render(ctx) == {"cpu": 22}
+    assert Template.compile("M: {{s.metrics | to_json}}").render(ctx) == 'M: {"cpu": 22}'
+    assert Template.compile("{{ 'OK' if s.ok else 'Issues' }}").render(ctx) == "Issues"
+    assert Template.compile("{{not s.ok and s.metrics.cpu > 20}}").render(ctx) is True
+    assert Template.compile("{{ 'Room 4A' | slug }}").render(ctx) == "room-4a"
+
+    for bad in ("{{ __import__('os') }}", "{{ s.x | nope }}", "{{ [x for x in s] }}", "{{ s. }}"):
+        with pytest.raises(RecipeCompileError):
+            Template.compile(bad)
+
+
+def test_jsonpath_extractors():
+    doc = {"number": "INC1", "items": [{"id": 1}, {"id": 2}], "a b": {"c": [5, 6]}}
+    assert JsonPath.compile("$.number").extract(doc) == "INC1"
+    assert JsonPath.compile("$.items[*].id").extract(doc) == [1, 2]
+    assert JsonPath.compile("$['a b'].c[-1]").extract(doc) == 6
+    assert JsonPath.compile("$.missing.deeper").extract(doc) is None
+    with pytest.raises(RecipeCompileError):
+        JsonPath.compile("number")
+
+
+def test_incident_triage_plan_binds_inputs_and_runs():
+    RECIPE_CACHE.clear()
+    plan = load_recipe_plan("incident-triage.yaml")
+    assert load_recipe_plan("incident-triage.yaml") is plan  # compiled once
+    assert [t.name for t in plan.tools] == ["local-llm", "mcp-slack", "mcp-servicenow"]
+    assert plan.tools[1].kind == "mcp" and plan.tools[1].target == "slack"
+
+    with pytest.raises(RecipeInputError, match="reporter: required"):
+        plan.bind_inputs({"summary": "Room 4 dark"})
+    with pytest.raises(RecipeInputError, match="urgency"):
+        plan.bind_inputs({"reporter": "ana", "summary": "x", "urgency": "whenever"})
+
+    calls = []
+
+    def call(tool, action, params):
+        calls.append((tool.name, action, params))
+        if action == "classify_incident":
+            return {"sev": "P2", "category": "room", "confidence": 0.9}
+        if action == "create_incident":
+            return {"number": "INC0012345", "sys_id": "abc"}
+        return None  # Slack not configured -> fallback
+
+    result = plan.run({"reporter": "ana", "summary": "Room 4 dark"}, call=call)
+    assert result.inputs["channel"] == "#av-support"
+    assert result.state["snow_incident"] == "INC0012345"
+    assert [o.status for o in result.steps] == ["ok", "simulated", "ok", "ok", "simulated"]
+    create = next(p for _, a, p in calls if a == "create_incident")
+    assert create["short_description"] == "[P2] Room 4 dark"
+    assert create["urgency"] == "medium"
+    assert result.verified
+    assert result.outputs["triage_summary"]["incident"] == "INC0012345"
+
+
+def test_when_foreach_and_step_results():
+    plan = compile_recipe({
+        "params": {"files": ["a.pdf", "b.pdf"]},
+        "steps": [
+            {"id": "act.create", "tool": "kb.create", "input": {"title": "{{inputs.t}}"}},
+            {"id": "act.attach", "tool": "kb.attach", "foreach": "{{params.files}}",
+             "input": {"sys_id": "{{act.create.result.sys_id}}", "file": "{{item}}"}},
+            {"id": "never", "when": "{{inputs.t == 'other'}}", "tool": "x"},
+        ],
+        "assertions": ["act.create.result.sys_id != null"],
+        "outputs": {"id": "{{act.create.result.sys_id}}"},
+    })
+    seen = []
+
+    def call(tool, action, params):
+        seen.append((tool.name, dict(params)))
+        return {"sys_id": "kb1"} if tool.name == "kb.create" else {"ok": True}
+
+    result = plan.run({"t": "Doc"}, call=call)
+    assert seen[1:] == [("kb.attach", {"sys_id": "kb1", "file": "a.pdf"}), ("kb.attach", {"sys_id": "kb1", "file": "b.pdf"})]
+    assert [o.status for o in result.steps][-1] == "skipped"
+    assert result.outputs == {"id": "kb1"} and result.verified
+
+
+def test_empty_foreach_is_skipped():
+    plan = compile_recipe({
+        "params": {"files": []},
+        "steps": [
+            {"id": "attach", "tool": "kb.attach", "foreach": "{{params.files}}", "input": {"file": "{{item}}"}},
+            {"id": "after", "tool": "kb.publish"},
+        ],
+    })
+    result = plan.run(call=lambda tool, action, params: {"ok": True})
+    assert [(o.id, o.status) for o in result.steps] == [("attach", "skipped"), ("after", "ok")]
+
+
+def test_shipped_recipes_compile():
+    for path in sorted((ROOT / "recipes").glob("*.yaml")):
+        load_recipe_plan(path)
+
+
+@pytest.mark.parametrize("path", sorted((ROOT / "recipes").glob("*.yaml")), ids=lambda p: p.name)
+def test_shipped_recipes_run(path):
+    result = load_recipe_plan(path).run(validate=False)  # no tools: fallbacks are simulated
+    assert all(o.status in ("ok", "simulated", "skipped") for o in result.steps)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.runs_export import export_runs, iter_chunks
+
+
+@pytest.fixture()
+def store(store):
+    """The shared run store with five runs, the odd ones failed."""
+    for i in range(5):
+        try:
+            with store.workflow_run(workflow_id="wf", name=f"run {i}", agent_id=None, recipe_id=1) as rec:
+                with rec.span("act", tool="test"):
+                    rec.step("act", f"step {i}", payload={"i": i})
+                rec.artifact("incident", f"INC{i}")
+                if i % 2:
+                    raise RuntimeError("fail")
+        except RuntimeError:
+            pass
+    return store
+
+
+def _read_ndjson(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_export_ndjson_filters_by_status(store, tmp_path):
+    counts = export_runs(store, tmp_path / "out", status=["failed"], chunk_size=1)
+    assert counts == {"workflow_runs": 2, "step_events": 2, "artifacts": 2, "run_spans": 2}
+
+    runs = _read_ndjson(tmp_path / "out" / "workflow_runs.ndjson")
+    assert [r["name"] for r in runs] == ["run 1", "run 3"]
+    steps = _read_ndjson(tmp_path / "out" / "step_events.ndjson")
+    assert [s["payload"] for s in steps] == [{"i": 1}, {"i": 3}]
+
+
+def test_iter_chunks_respects_chunk_size(store):
+    sizes = [len(c) for c in iter_chunks(store, "step_events", chunk_size=2)]
+    assert sizes == [2, 2, 1]
+
+
+def test_export_parquet(store, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    counts = export_runs(store, tmp_path / "pq", fmt="parquet", chunk_size=2)
+    assert counts["workflow_runs"] == 5
+    table = pq.read_table(tmp_path / "pq" / "step_events.parquet")
+    assert table.num_rows == 5
+    assert json.loads(table.column("payload")[0].as_py()) == {"i": 0}
+    spans = pq.read_table(tmp_path / "pq" / "run_spans.parquet")
+    assert spans.column("name").to_pylist() == ["act"] * 5
@@ -0,0 +1,481 @@
+from __future__ import annotations
+
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import text
+
+from core.runs_store import BufferedRecorder, RunStore, StepEvent, WorkflowRun
+
+
+def _run_kwargs(**extra):
+    return dict(workflow_id="wf-1", name="Test", agent_id=1, recipe_id=2, **extra)
+
+
+def test_buffered_recorder_flushes_on_exit(store):
+    with store.workflow_run(**_run_kwargs(buffered=True, flush_size=1000)) as rec:
+        assert isinstance(rec, BufferedRecorder)
+        for i in range(25):
+            rec.step("act", f"step {i}", payload={"i": i})
+        rec.artifact("incident", "INC001", external_id="INC001")
+        assert rec.pending == 26
+        run_id = rec.run_id
+        assert store.run_details(run_id)["steps"] == []
+
+    detail = store.run_details(run_id)
+    assert detail["status"] == "success"
+    assert [s["message"] for s in detail["steps"]] == [f"step {i}" for i in range(25)]
+    assert detail["artifacts"][0]["external_id"] == "INC001"
+
+
+def test_buffered_recorder_flushes_on_size_threshold(store):
+    with store.workflow_run(**_run_kwargs(buffered=True, flush_size=10)) as rec:
+        for i in range(15):
+            rec.step("act", f"step {i}")
+        assert rec.pending == 5
+        assert len(store.run_details(rec.run_id)["steps"]) == 10
+
+
+def test_buffered_recorder_flushes_on_failure(store):
+    with pytest.raises(RuntimeError, match="boom"):
+        with store.workflow_run(**_run_kwargs(buffered=True)) as rec:
+            rec.step("intake", "started")
+            raise RuntimeError("boom")
+
+    detail = store.run_details(rec.run_id)
+    assert detail["status"] == "failed"
+    assert detail["error"] == "RuntimeError: boom"
+    assert [s["message"] for s in detail["steps"]] == ["started"]
+
+
+def _insert_runs(store, rows):
+    with store.Session() as s:
+        s.add_all(WorkflowRun(workflow_id="wf-1", name="Test", **row) for row in rows)
+        s.commit()
+
+
+def test_stats_aggregates_in_sql(store):
+    durations = [float(d) for d in range(1, 1001)]
+    _insert_runs(store, [
+        {"recipe_id": 7, "status": "success" if d % 4 else "failed", "duration_ms": d,
+         "error": None if d % 4 else f"err {int(d)}"}
+        for d in durations
+    ])
+
+    st = store.stats()
+    assert st["runs"] == 1000
+    assert st["success_rate"] == pytest.approx(75.0)
+    assert st["avg_ms"] == pytest.approx(500.5)
+    assert st["last_error"] == "err 1000"
+    # Bucketed estimate stays within one bucket width of the exact p95 (950.05).
+    assert st["p95_ms"] == pytest.approx(950.05, rel=0.1)
+
+    m = store.recipe_metrics(7, limit=100)
+    assert m["runs"] == 100
+    assert m["success_rate"] == pytest.approx(75.0)
+    assert m["avg_ms"] == pytest.approx(950.5)
+    assert m["last_status"] == "failed"
+
+
+def test_stats_empty_window(store):
+    assert store.stats() == {
+        "runs": 0, "success_rate": 0.0, "p95_ms": 0.0, "avg_ms": 0.0, "last_error": "",
+    }
+    assert store.recipe_metrics(1)["last_status"] == "unknown"
+
+
+def test_rollups_updated_when_run_finishes(store):
+    for i in range(3):
+        with store.workflow_run(**_run_kwargs()) as rec:
+            rec.step("act", "ok")
+    with pytest.raises(ValueError):
+        with store.workflow_run(**_run_kwargs()):
+            raise ValueError("nope")
+
+    now = datetime.now(timezone.utc)
+    series = store.run_series(since=now - timedelta(hours=2), grain="hour")
+    assert len(series) == 3
+    assert [p["runs"] for p in series] == [0, 0, 4]
+    assert series[-1]["successes"] == 3 and series[-1]["failures"] == 1
+    assert series[-1]["avg_ms"] > 0
+
+    day = store.run_series(grain="day", recipe_id=2)
+    assert [p["runs"] for p in day] == [4]
+    assert store.run_series(grain="day", workflow_id="other")[-1]["runs"] == 0
+
+
+def test_rebuild_rollups_matches_incremental(store):
+    for _ in range(5):
+        with store.workflow_run(**_run_kwargs()):
+            pass
+    before = store.run_series(grain="hour")
+    assert store.rebuild_rollups(batch_size=2) == 5
+    assert store.run_series(grain="hour") == before
+
+
+def test_page_runs_keyset_cursors(store):
+    _insert_runs(store, [
+        {"recipe_id": 1, "status": "success" if i % 2 else "failed", "duration_ms": 1.0}
+        for i in range(1, 12)
+    ])
+
+    first = store.page_runs(page_size=4)
+    assert [r["id"] for r in first["runs"]] == [11, 10, 9, 8]
+    assert first["prev_cursor"] is None
+
+    second = store.page_runs(cursor=first["next_cursor"], page_size=4)
+    assert [r["id"] for r in second["runs"]] == [7, 6, 5, 4]
+    last = store.page_runs(cursor=second["next_cursor"], page_size=4)
+    assert [r["id"] for r in last["runs"]] == [3, 2, 1]
+    assert last["next_cursor"] is None
+
+    back = store.page_runs(cursor=last["prev_cursor"], page_size=4)
+    assert [r["id"] for r in back["runs"]] == [7, 6, 5, 4]
+    assert store.page_runs(cursor=back["prev_cursor"], page_size=4)["runs"] == first["runs"]
+
+    failed = store.page_runs(status=["failed"], before_id=9, page_size=10)
+    assert [r["id"] for r in failed["runs"]] == [8, 6, 4, 2]
+    assert store.count_runs(status=["failed"]) == 5
+    assert store.count_runs(recipe_id=1) == store.count_runs() == 11
+
+
+def test_indexes_added_to_existing_database(tmp_path):
+    from sqlalchemy import create_engine, inspect, text
+
+    db = tmp_path / "old.db"
+    eng = create_engine(f"sqlite:///{db}")
+    with eng.begin() as conn:
+        conn.execute(text("CREATE TABLE workflow_runs (id INTEGER PRIMARY KEY, workflow_id VARCHAR(64), "
+                          "name VARCHAR(255), agent_id INTEGER, recipe_id INTEGER, trigger VARCHAR(32), "
+                          "status VARCHAR(16), started_at DATETIME, finished_at DATETIME, "
+                          "duration_ms FLOAT, error VARCHAR(2000), meta JSON)"))
+    eng.dispose()
+
+    s = RunStore(db_path=db)
+    names = {ix["name"] for ix in inspect(s.engine).get_indexes("workflow_runs")}
+    s.engine.dispose()
+    assert {"ix_workflow_runs_status_started", "ix_workflow_runs_recipe_id"} <= names
+
+
+def test_rollups_backfilled_for_existing_database(tmp_path):
+    db = tmp_path / "old.db"
+    old = RunStore(db_path=db)
+    for _ in range(3):
+        with old.workflow_run(**_run_kwargs()):
+            time.sleep(0.002)
+    with old.engine.begin() as conn:  # as if written before rollups existed
+        conn.execute(text("DROP TABLE run_rollup_buckets"))
+        conn.execute(text("DROP TABLE run_rollups"))
+    old.engine.dispose()
+
+    s = RunStore(db_path=db)
+    assert s.run_series(grain="day")[-1]["runs"] == 3
+    assert s.latency_percentiles()["runs"] == 3
+    s.engine.dispose()
+
+
+def test_large_payloads_offloaded_to_blob_store(tmp_path):
+    from core.blob_store import LazyBlob, is_blob_ref
+
+    store = RunStore(db_path=tmp_path / "blobs.db", blob_threshold=256)
+    big = {"dump": ["x" * 50] * 20}
+    with store.workflow_run(**_run_kwargs()) as rec:
+        rec.step("act", "small", payload={"ok": 1})
+        rec.step("act", "big", payload=big, result=big)
+    with store.workflow_run(**_run_kwargs(buffered=True)) as rec2:
+        rec2.step("act", "big again", payload=big)
+
+    with store.Session() as s:
+        raw = [ev.payload for ev in s.query(StepEvent).order_by(StepEvent.id)]
+        n_blobs = s.execute(text("SELECT COUNT(*) FROM blobs")).scalar()
+    assert raw[0] == {"ok": 1}
+    assert is_blob_ref(raw[1]) and raw[1] == raw[2]
+    assert n_blobs == 1  # identical payloads stored once
+
+    detail = store.run_details(rec.run_id)
+    assert detail["steps"][1]["payload"] == big and detail["steps"][1]["result"] == big
+
+    lazy = store.run_details(rec2.run_id, resolve_blobs=False)["steps"][0]["payload"]
+    assert isinstance(lazy, LazyBlob) and lazy.value == big
+    store.engine.dispose()
+
+
+def test_incomplete_blob_backend_fails_at_construction():
+    from core.blob_store import BlobStore
+
+    class PutOnly(BlobStore):
+        def put(self, data: bytes) -> str:
+            return "digest"
+
+    with pytest.raises(TypeError):
+        PutOnly()
+
+
+def test_joined_blob_puts_create_the_table_once(tmp_path):
+    from sqlalchemy import create_engine, event
+
+    from core.blob_store import SQLiteBlobStore
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    blobs = SQLiteBlobStore(engine)
+    with engine.connect() as conn:
+        blobs.put(b"a" * 10, conn)
+        conn.rollback()  # the CREATE rolls back too
+    with engine.begin() as conn:
+        blobs.put(b"b" * 10, conn)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    with engine.begin() as conn:
+        blobs.put(b"c" * 10, conn)
+    assert len(statements) == 1 and statements[0].startswith("INSERT")
+    engine.dispose()
+
+
+def test_paged_run_details(store):
+    with store.workflow_run(**_run_kwargs(buffered=True)) as rec:
+        for i in range(7):
+            rec.step("act", f"step {i}", payload={"i": i}, result={"ok": i})
+        rec.artifact("kb", "Article", data={"body": "x"})
+
+    head = store.run_header(rec.run_id)
+    assert head["step_count"] == 7 and head["artifact_count"] == 1
+    assert "steps" not in head
+
+    page1 = store.steps(rec.run_id, limit=3)
+    assert [s["message"] for s in page1["items"]] == ["step 0", "step 1", "step 2"]
+    assert "payload" not in page1["items"][0]
+    page2 = store.steps(rec.run_id, after_id=page1["next_cursor"], limit=3)
+    assert [s["message"] for s in page2["items"]] == ["step 3", "step 4", "step 5"]
+    assert store.steps(rec.run_id, offset=6, limit=3)["next_cursor"] is None
+
+    first = page1["items"][0]["id"]
+    assert store.step_payload(first) == {"payload": {"i": 0}, "result": {"ok": 0}}
+    with_fields = store.steps(rec.run_id, limit=1, fields=("message", "payload"))["items"][0]
+    assert with_fields == {"id": first, "message": "step 0", "payload": {"i": 0}}
+
+    arts = store.artifacts(rec.run_id)
+    assert arts["items"][0]["title"] == "Article" and "data" not in arts["items"][0]
+    assert store.artifact_data(arts["items"][0]["id"]) == {"body": "x"}
+
+
+def test_change_feed_tails_runs_and_steps(store):
+    head = store.change_cursor()
+    assert store.changes_since(head) == {"cursor": head, "runs": [], "steps": [], "more": False, "reset": False}
+
+    with store.workflow_run(**_run_kwargs(buffered=True)) as rec:
+        rec.step("act", "a", payload={"big": 1})
+        rec.step("act", "b")
+        feed = store.changes_since(head)
+        assert [r["status"] for r in feed["runs"]] == ["running"]
+        assert feed["steps"] == []  # still buffered
+        cursor = feed["cursor"]
+
+    feed = store.changes_since(cursor)
+    assert [r["status"] for r in feed["runs"]] == ["success"]
+    assert [s["message"] for s in feed["steps"]] == ["a", "b"]
+    assert "payload" not in feed["steps"][0]
+    assert store.changes_since(feed["cursor"])["runs"] == []
+
+    assert store.changes_since(10**6)["reset"] is True
+    assert store.prune_changes(keep=1) > 0
+    assert store.changes_since(1)["reset"] is True
+
+
+def test_wait_for_changes_wakes_on_write(store):
+    import threading
+    import time
+
+    cursor = store.change_cursor()
+    assert store.wait_for_changes(cursor, timeout=0.05)["runs"] == []
+
+    def writer():
+        time.sleep(0.1)
+        with store.workflow_run(**_run_kwargs()) as rec:
+            rec.step("act", "hello")
+
+    t = threading.Thread(target=writer)
+    t.start()
+    t0 = time.monotonic()
+    feed = store.wait_for_changes(cursor, timeout=5.0, poll_interval=5.0)
+    t.join()
+    assert feed["runs"] and time.monotonic() - t0 < 2.0
+
+
+@pytest.mark.parametrize("buffered", [False, True])
+def test_spans_nest_and_build_latency_breakdown(store, buffered):
+    import time
+
+    with pytest.raises(TimeoutError):
+        with store.workflow_run(**_run_kwargs(buffered=buffered)) as rec:
+            with rec.span("triage", recipe="incident-triage"):
+                with rec.span("llm.classify", tool="llm") as sp:
+                    time.sleep(0.02)
+                    sp.set(tokens=42)
+                with rec.span("servicenow.create", tool="servicenow", retries=0):
+                    time.sleep(0.01)
+            with rec.span("slack.post", tool="slack"):
+                raise TimeoutError("slack")
+
+    bd = store.latency_breakdown(rec.run_id)
+    names = [(sp["name"], sp["depth"]) for sp in bd["spans"]]
+    assert names == [("triage", 0), ("llm.classify", 1), ("servicenow.create", 1), ("slack.post", 0)]
+    triage, llm, snow, slack = bd["spans"]
+    assert llm["parent_id"] == triage["id"] and slack["parent_id"] is None
+    assert llm["attrs"] == {"tool": "llm", "tokens": 42}
+    assert llm["duration_ms"] >= 20 and snow["offset_ms"] >= llm["offset_ms"] + llm["duration_ms"] - 1
+    assert triage["self_ms"] == pytest.approx(triage["duration_ms"] - llm["duration_ms"] - snow["duration_ms"])
+    assert slack["status"] == "error" and slack["attrs"]["error"] == "TimeoutError: slack"
+    assert bd["by_name"][0]["name"] == "llm.classify"
+
+
+def test_latency_sketch_merge_and_roundtrip():
+    from core.latency import LatencySketch
+
+    a, b = LatencySketch(), LatencySketch()
+    for ms in range(1, 501):
+        a.add(ms)
+    for ms in range(501, 1001):
+        b.add(ms)
+    merged = a + b
+    assert merged.count == 1000 and a.count == 500
+    assert merged.quantile(0.5) == pytest.approx(500, rel=0.1)
+    assert merged.percentiles((0.99,))["p99_ms"] == pytest.approx(990, rel=0.1)
+    assert LatencySketch.from_dict(merged.to_dict()) == merged
+
+
+def test_latency_percentiles_from_rollups(store):
+    # Mid-hour, so `since=now - 1 minute` never reaches into the previous hourly bucket.
+    now = datetime.now(timezone.utc).replace(minute=30, second=0, microsecond=0)
+    _insert_runs(store, [
+        {"recipe_id": 1 + (d % 2), "status": "success", "duration_ms": float(d),
+         "started_at": now - timedelta(hours=d % 3)}
+        for d in range(1, 1001)
+    ])
+    store.rebuild_rollups()
+
+    pct = store.latency_percentiles()
+    assert pct["runs"] == 1000
+    assert pct["p50_ms"] == pytest.approx(500, rel=0.1)
+    assert pct["p95_ms"] == pytest.approx(950, rel=0.1)
+    assert pct["p99_ms"] == pytest.approx(990, rel=0.1)
+
+    recent = store.latency_percentiles(since=now - timedelta(minutes=1), recipe_id=2)
+    assert recent["runs"] == len([d for d in range(1, 1001) if d % 2 == 1 and d % 3 == 0])
+
+    per_recipe = store.latency_sketches(by="recipe_id")
+    assert sorted(per_recipe) == [1, 2]
+    assert per_recipe[1].count + per_recipe[2].count == 1000
+
+
+def test_search_ranks_runs_by_step_error_and_artifact_text(store):
+    with store.workflow_run(**_run_kwargs(buffered=True)) as rec:
+        rec.step("act", "Display lost HDMI_RX_1 signal")
+        rec.step("verify", "HDMI_RX_1 still down after reboot")
+        rec.artifact("incident", "Room 4 projector", external_id="INC0042")
+    hdmi_run = rec.run_id
+    with pytest.raises(PermissionError):
+        with store.workflow_run(**_run_kwargs()) as rec:
+            rec.step("act", "calling ServiceNow")
+            raise PermissionError("HTTP 401 Unauthorized")
+    auth_run = rec.run_id
+    with store.workflow_run(**_run_kwargs()) as rec:
+        rec.step("act", "HDMI ok on RX_2")
+
+    res = store.search("HDMI_RX_1 OR 401")
+    assert res["total"] == 2
+    assert {h["run"]["id"] for h in res["hits"]} == {hdmi_run, auth_run}
+    hdmi = next(h for h in res["hits"] if h["run"]["id"] == hdmi_run)
+    assert hdmi["matches"] == 2 and "[HDMI_RX_1]" in hdmi["snippets"][0]["snippet"].replace(" ", "_")
+
+    assert [h["run"]["id"] for h in store.search("401", status=["failed"])["hits"]] == [auth_run]
+    assert store.search("401", status=["success"])["total"] == 0
+    assert store.search("INC0042")["hits"][0]["run"]["id"] == hdmi_run
+    assert store.search("proj*")["total"] == 1
+    assert store.search('"unbalanced')["total"] == 0
+    assert store.search("HDMI", since=datetime.now(timezone.utc) + timedelta(hours=1))["total"] == 0
+    first, second = (store.search("HDMI", limit=1, offset=i) for i in (0, 1))
+    assert first["total"] == second["total"] == 2
+    assert first["hits"][0]["run"]["id"] != second["hits"][0]["run"]["id"]
+
+    assert store.rebuild_search_index() == 9
+    assert store.search("HDMI_RX_1 OR 401")["total"] == 2
+
+    store.fts_enabled = False  # SQLite builds without FTS5
+    assert store.search("HDMI_RX_1 OR 401")["total"] == 2
+
+
+def test_concurrent_search_index_creation_backfills_once(store):
+    import threading
+
+    with store.workflow_run(**_run_kwargs()) as rec:
+        rec.step("act", "Display lost HDMI_RX_1 signal")
+    with store.engine.begin() as conn:
+        conn.execute(text("DROP TABLE run_search"))
+
+    results, barrier = [], threading.Barrier(6)
+
+    def ensure():
+        barrier.wait()
+        results.append(store._ensure_search_index())
+
+    threads = [threading.Thread(target=ensure) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [True] * 6
+    with store.engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM run_search")).scalar() == 2  # name + step, once
+    assert store.search("HDMI_RX_1")["total"] == 1
+
+
+def test_deferred_run_offloads_large_payloads_in_its_transaction(tmp_path):
+    from core.blob_store import is_blob_ref
+
+    store = RunStore(db_path=tmp_path / "blobs.db", blob_threshold=100)
+    big = {"dump": "x" * 1000}
+    with store.workflow_run(**_run_kwargs(deferred=True, flush_interval_s=60)) as rec:
+        rec.step("act", "big", payload=big, result=big)
+        rec.artifact("state", "device dump", data=big)
+    with store.Session() as s:
+        assert is_blob_ref(s.query(StepEvent).one().payload)
+    d = store.run_details(rec.run_id)
+    assert d["status"] == "success"
+    assert d["steps"][0]["payload"] == big and d["artifacts"][0]["data"] == big
+    store.engine.dispose()
+
+
+def test_deferred_run_is_written_in_one_transaction(store):
+    from sqlalchemy import event
+
+    commits = []
+    event.listen(store.engine, "commit", lambda conn: commits.append(1))
+    with store.workflow_run(**_run_kwargs(deferred=True, flush_size=1000, flush_interval_s=60)) as rec:
+        for i in range(5):
+            rec.step("act", f"step {i}")
+        with rec.span("call"):
+            pass
+        assert rec.run_id is None and store.page_runs()["runs"] == []
+    assert len(commits) == 1
+
+    d = store.run_details(rec.run_id)
+    assert d["status"] == "success" and d["started_at"] is not None
+    assert [s["message"] for s in d["steps"]] == [f"step {i}" for i in range(5)]
+    assert [sp["name"] for sp in store.latency_breakdown(rec.run_id)["spans"]] == ["call"]
+
+    with pytest.raises(RuntimeError):
+        with store.workflow_run(**_run_kwargs(deferred=True)) as rec:
+            rec.step("act", "before failure")
+            raise RuntimeError("boom")
+    d = store.run_details(rec.run_id)
+    assert d["status"] == "failed" and "boom" in d["error"]
+    assert [s["message"] for s in d["steps"]] == ["before failure"]
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.runstore_factory import make_runstore, reset_runstores, runstore_url
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry():
+    reset_runstores()
+    yield
+    reset_runstores()
+
+
+def test_make_runstore_reuses_store_per_database(tmp_path, monkeypatch):
+    a = make_runstore(tmp_path / "a.db")
+    assert make_runstore(tmp_path / "sub" / ".." / "a.db") is a
+    assert make_runstore(tmp_path / "b.db") is not a
+
+    monkeypatch.setenv("IPAV_DB_PATH", str(tmp_path / "a.db"))
+    assert make_runstore() is a
+    assert runstore_url() == f"sqlite:///{(tmp_path / 'a.db').resolve()}"
+
+
+def test_make_runstore_is_thread_safe(tmp_path):
+    seen = []
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        seen.append(make_runstore(tmp_path / "shared.db"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(s) for s in seen}) == 1
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.recipes.compiler import compile_recipe
+from core.workflow.checkpoints import idempotency_key, resume, run_recipe
+
+TRIAGE_RESULTS = {
+    "classify_incident": {"sev": "P2", "category": "room", "confidence": 0.9},
+    "create_incident": {"number": "INC0012345", "sys_id": "abc"},
+    "propose_immediate_steps": {"steps": ["check power"]},
+    "post_message": {"ts": "1700000000.1"},
+}
+INPUTS = {"reporter": "ana", "summary": "Room 4 dark"}
+
+# incident-triage without fallbacks, so a failing tool call fails the run.
+RECIPE = {
+    "id": "triage",
+    "inputs": {"reporter": {"type": "string", "required": True}, "summary": {"type": "string", "required": True}},
+    "steps": [
+        {"id": "classify", "action": "classify_incident", "using": "local-llm",
+         "params": {"text": "{{inputs.summary}}"}, "saves": {"sev": "$.sev", "category": "$.category"}},
+        {"id": "ack", "action": "post_message", "using": "mcp-slack",
+         "params": {"text": "Ack {{inputs.reporter}} ({{s.sev}})"}},
+        {"id": "create-incident", "action": "create_incident", "using": "mcp-servicenow",
+         "params": {"short_description": "[{{s.sev}}] {{inputs.summary}}"},
+         "saves": {"snow_incident": "$.number"}},
+        {"id": "suggest-fixes", "action": "propose_immediate_steps", "using": "local-llm",
+         "params": {"category": "{{s.category}}"}, "saves": {"quick_steps": "$.steps"}},
+        {"id": "post-update", "action": "post_message", "using": "mcp-slack",
+         "params": {"text": "{{s.snow_incident}}: {{ack.result.ts}}"}},
+    ],
+    "verify": [{"assert": "s.snow_incident is not null"}],
+}
+
+
+class FlakyTools:
+    """Fake tool endpoint; ``fail_on`` actions raise once, after doing their side effect."""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.calls = []
+        self.incidents = {}  # idempotency key -> incident number
+
+    def __call__(self, tool, action, params, idempotency_key=None):
+        self.calls.append((action, idempotency_key))
+        result = TRIAGE_RESULTS.get(action)
+        if action == "create_incident":
+            result = {"number": self.incidents.setdefault(idempotency_key, f"INC{len(self.incidents) + 1:07d}"),
+                      "sys_id": "abc"}
+        if action in self.fail_on:
+            self.fail_on.discard(action)
+            raise TimeoutError(f"{action} timed out")
+        return result
+
+
+def test_resume_skips_completed_steps_and_reuses_idempotency_keys(store):
+    tools = FlakyTools(fail_on={"create_incident"})
+    with pytest.raises(TimeoutError):
+        run_recipe(compile_recipe(RECIPE), INPUTS, call=tools, store=store)
+    first = store.latest_runs(limit=1)[0]
+    assert first["status"] == "failed"
+    cps = {cp["step_id"]: cp for cp in store.checkpoints(first["id"])}
+    assert [cp["status"] for cp in store.checkpoints(first["id"])] == ["ok", "ok", "failed"]
+    assert cps["classify"]["saved"] == {"sev": "P2", "category": "room"}
+    assert cps["classify"]["idempotency_key"] is None  # local step
+    key = cps["create-incident"]["idempotency_key"]
+    assert key == idempotency_key(first["id"], "create-incident")
+
+    tools.calls.clear()
+    out = resume(first["id"], call=tools, store=store)
+    assert out.root_run_id == first["id"] and out.run_id != first["id"]
+    assert out.resumed == ["classify", "ack"]
+    assert [a for a, _ in tools.calls] == ["create_incident", "propose_immediate_steps", "post_message"]
+    assert tools.calls[0][1] == key  # the retry carries the same key...
+    assert len(tools.incidents) == 1  # ...so no duplicate incident
+    assert out.result.state["sev"] == "P2"  # restored from the checkpoint
+    assert out.result.state["snow_incident"] == "INC0000001"
+    assert out.result.verified
+    assert [o.status for o in out.result.steps] == ["resumed", "resumed", "ok", "ok", "ok"]
+
+    attempt = store.run_header(out.run_id)
+    assert attempt["status"] == "success" and attempt["meta"]["resume_of"] == first["id"]
+    assert all(cp["status"] == "ok" for cp in store.checkpoints(first["id"]))
+
+
+def test_resume_of_a_resumed_attempt_uses_the_first_run(store):
+    tools = FlakyTools(fail_on={"create_incident", "propose_immediate_steps"})
+    with pytest.raises(TimeoutError):
+        run_recipe(compile_recipe(RECIPE), INPUTS, call=tools, store=store)
+    root = store.latest_runs(limit=1)[0]["id"]
+    with pytest.raises(TimeoutError):
+        resume(root, call=tools, store=store)
+    second = store.latest_runs(limit=1)[0]["id"]
+
+    out = resume(second, call=tools, store=store)
+    assert out.root_run_id == root
+    assert out.resumed == ["classify", "ack", "create-incident"]
+    assert len(tools.incidents) == 1
+
+
+def test_resume_rejects_unknown_runs(store):
+    with pytest.raises(ValueError):
+        resume(999, store=store)
+    with store.workflow_run(workflow_id="wf", name="plain", agent_id=None, recipe_id=None) as rec:
+        rec.step("act", "not a recipe run")
+    with pytest.raises(ValueError):
+        resume(rec.run_id, store=store)
+
+
+def test_resume_rejects_finished_runs(store):
+    tools = FlakyTools()
+    done = run_recipe(compile_recipe(RECIPE), INPUTS, call=tools, store=store)
+    with pytest.raises(ValueError, match="success"):
+        resume(done.run_id, call=tools, store=store)
+
+    tools.fail_on.add("create_incident")
+    with pytest.raises(TimeoutError):
+        run_recipe(compile_recipe(RECIPE), INPUTS, call=tools, store=store)
+    failed = store.latest_runs(limit=1)[0]["id"]
+    retry = resume(failed, call=tools, store=store)
+    with pytest.raises(ValueError, match="success"):
+        resume(retry.run_id, call=tools, store=store)
+    with pytest.raises(ValueError, match="no steps left"):
+        resume(failed, call=tools, store=store)  # the retry completed every step
+
+
+def test_empty_foreach_is_checkpointed_as_skipped(store):
+    recipe = {
+        "id": "kb",
+        "params": {"files": []},
+        "steps": [
+            {"id": "attach", "action": "attach", "using": "mcp-kb", "foreach": "{{params.files}}",
+             "params": {"file": "{{item}}"}},
+            {"id": "publish", "action": "publish", "using": "mcp-kb"},
+        ],
+    }
+    out = run_recipe(compile_recipe(recipe), call=lambda *a, **kw: {"ok": True}, store=store)
+    assert [o.status for o in out.result.steps] == ["skipped", "ok"]
+    assert [cp["status"] for cp in store.checkpoints(out.run_id)] == ["skipped", "ok"]
+
+
+def test_running_runs_are_resumed_only_once_stale(store):
+    from core.runs_store import WorkflowRun
+
+    tools = FlakyTools(fail_on={"create_incident"})
+    with pytest.raises(TimeoutError):
+        run_recipe(compile_recipe(RECIPE), INPUTS, call=tools, store=store)
+    run_id = store.latest_runs(limit=1)[0]["id"]
+    with store.Session() as s:  # as if the process had been killed mid-step
+        s.get(WorkflowRun, run_id).status = "running"
+        s.commit()
+
+    with pytest.raises(ValueError, match="still running"):
+        resume(run_id, call=tools, store=store)
+    out = resume(run_id, call=tools, store=store, stale_after_s=0)
+    assert out.resumed == ["classify", "ack"] and out.result.verified
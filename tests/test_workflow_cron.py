@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.agents.fixed.policies import STANDARD_MAINTENANCE
+from core.workflow import cron
+
+FRI_8AM = datetime(2026, 1, 2, 8, 0)  # a Friday
+
+
+def test_parse_and_next_fire():
+    weekdays = cron.parse_cron("30 7 * * MON-FRI")
+    assert cron.parse_cron("30  7 * * MON-FRI") is weekdays  # cached on the normalized text
+    assert weekdays.times == (7 * 60 + 30,)
+    assert cron.next_fire(weekdays, FRI_8AM) == datetime(2026, 1, 5, 7, 30)
+    assert cron.next_fires(cron.parse_cron("@hourly"), FRI_8AM, 2) == [
+        datetime(2026, 1, 2, 9, 0),
+        datetime(2026, 1, 2, 10, 0),
+    ]
+    # Day-of-month and day-of-week both restricted: either one matches.
+    assert cron.next_fire(cron.parse_cron("0 0 13 * FRI"), FRI_8AM) == datetime(2026, 1, 9)
+    assert cron.next_fire(cron.parse_cron("0 12 */10 JAN,MAR *"), FRI_8AM) == datetime(2026, 1, 11, 12)
+    assert cron.next_fire(cron.parse_cron("0 0 30 FEB *"), FRI_8AM) is None
+
+    for bad in ("", "* * * *", "61 * * * *", "* * * * FUNDAY", "*/0 * * * *", "5-1 * * * *"):
+        with pytest.raises(ValueError):
+            cron.parse_cron(bad)
+
+
+def test_timezone_and_maintenance_window(monkeypatch):
+    monkeypatch.setenv("IPAV_SCHEDULER_TZ", "America/New_York")
+    weekdays = cron.parse_cron("30 7 * * MON-FRI")
+    # 07:30 EST is 12:30 UTC; 08:00 UTC Friday is still 03:00 in New York.
+    assert cron.next_fire(weekdays, FRI_8AM) == datetime(2026, 1, 2, 12, 30)
+
+    monkeypatch.delenv("IPAV_SCHEDULER_TZ")
+    hourly = cron.parse_cron("0 * * * *")
+    fri_evening = datetime(2026, 1, 2, 19, 30)
+    assert cron.next_fire(hourly, fri_evening, window=STANDARD_MAINTENANCE) == datetime(2026, 1, 2, 20, 0)
+    # 21:00 Friday is outside 08:00-20:00 Mon-Fri; jump to Monday's opening.
+    assert cron.next_fire(hourly, datetime(2026, 1, 2, 20, 0), window=STANDARD_MAINTENANCE) == datetime(2026, 1, 5, 8, 0)
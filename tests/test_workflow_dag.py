@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.recipes.compiler import compile_recipe, load_recipe_plan, set_step_result
+from core.workflow.dag import DagExecutor, build_graph
+
+TRIAGE_RESULTS = {
+    "classify_incident": {"sev": "P2", "category": "room", "confidence": 0.9},
+    "create_incident": {"number": "INC0012345", "sys_id": "abc"},
+    "propose_immediate_steps": {"steps": ["check power"]},
+}
+
+
+def test_triage_graph_runs_independent_steps_concurrently():
+    plan = load_recipe_plan("incident-triage.yaml")
+    ex = DagExecutor(plan, max_workers=4)
+    assert ex.graph.edges() == {
+        "classify": [],
+        "ack-slack": ["classify"],
+        "create-incident": ["classify"],
+        "suggest-fixes": ["classify"],
+        "post-update": ["create-incident", "suggest-fixes"],
+    }
+
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def call(tool, action, params):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.08 if action == "create_incident" else 0.05)  # no tie for the critical path
+        with lock:
+            active[0] -= 1
+        return TRIAGE_RESULTS.get(action)
+
+    inputs = {"reporter": "ana", "summary": "Room 4 dark"}
+    result = ex.run(inputs, call=call)
+    assert peak[0] == 3
+    assert result.critical_path == ["classify", "create-incident", "post-update"]
+    assert result.wall_ms < result.sum_ms * 0.8
+    assert [o.id for o in result.steps] == [s.id for s in plan.steps]  # reported in plan order
+    assert [o.status for o in result.steps] == ["ok", "simulated", "ok", "ok", "simulated"]
+
+    sequential = plan.run(inputs, call=lambda t, a, p: TRIAGE_RESULTS.get(a))
+    assert result.state == sequential.state and result.outputs == sequential.outputs
+    assert result.verified
+
+
+def test_write_after_read_and_explicit_needs_keep_sequential_results():
+    plan = compile_recipe({
+        "steps": [
+            {"id": "a", "tool": "t", "saves": {"x": "$.v"}},
+            {"id": "b", "tool": "t", "params": {"x": "{{s.x}}"}, "saves": {"seen": "$.echo"}},
+            {"id": "c", "tool": "t", "saves": {"x": "$.v"}},  # must wait for b's read of x
+            {"id": "d", "tool": "t", "needs": ["a"]},
+        ],
+    })
+    assert build_graph(plan).edges() == {"a": [], "b": ["a"], "c": ["a", "b"], "d": ["a"]}
+
+    def call(tool, action, params):
+        time.sleep(0.01)
+        return {"v": time.perf_counter(), "echo": params.get("x")}
+
+    result = DagExecutor(plan, max_workers=4).run(call=call)
+    assert result.state["seen"] == result.steps[0].result["v"]
+
+    with pytest.raises(ValueError, match="unknown step"):
+        build_graph(compile_recipe({"steps": [{"id": "a", "needs": ["zz"]}]}))
+    with pytest.raises(ValueError, match="cycle"):
+        build_graph(compile_recipe({"steps": [{"id": "a", "needs": ["b"]}, {"id": "b", "needs": ["a"]}]}))
+
+
+def test_failure_without_fallback_stops_the_run():
+    plan = compile_recipe({
+        "steps": [
+            {"id": "flaky", "tool": "t", "action": "boom", "fallback": {"simulate": True, "saves": {"ok": False}}},
+            {"id": "hard", "tool": "t", "action": "fail"},
+            {"id": "after", "tool": "t", "params": {"ok": "{{s.ok}}"}, "needs": ["hard"]},
+        ],
+    })
+    calls = []
+
+    def call(tool, action, params):
+        calls.append(action)
+        raise RuntimeError(action)
+
+    with pytest.raises(RuntimeError, match="fail"):
+        DagExecutor(plan).run(call=call)
+    assert sorted(calls) == ["boom", "fail"]
+
+
+def test_empty_foreach_is_skipped(tmp_path):
+    from core.runs_store import RunStore
+
+    store = RunStore(db_path=tmp_path / "runs.db")
+    plan = compile_recipe({
+        "params": {"files": []},
+        "steps": [
+            {"id": "attach", "tool": "kb.attach", "foreach": "{{params.files}}", "input": {"file": "{{item}}"}},
+            {"id": "after", "tool": "kb.publish", "needs": ["attach"]},
+        ],
+    })
+    with store.workflow_run(workflow_id="1", name="kb", agent_id=None, recipe_id=None) as rec:
+        result = DagExecutor(plan, recorder=rec).run(call=lambda t, a, p: {"ok": True})
+    assert [(o.id, o.status) for o in result.steps] == [("attach", "skipped"), ("after", "ok")]
+    spans = {sp["name"]: sp for sp in store.latency_breakdown(rec.run_id)["spans"]}
+    assert spans["step.attach"]["attrs"]["status"] == "skipped"
+    store.engine.dispose()
+
+
+def test_step_spans_recorded(tmp_path):
+    from core.runs_store import RunStore
+
+    store = RunStore(db_path=tmp_path / "runs.db")
+    plan = load_recipe_plan("incident-triage.yaml")
+    with store.workflow_run(workflow_id="1", name="triage", agent_id=None, recipe_id=None, buffered=True) as rec:
+        with rec.span("dag") as root:
+            DagExecutor(plan, recorder=rec).run(
+                {"reporter": "ana", "summary": "x"}, call=lambda t, a, p: TRIAGE_RESULTS.get(a)
+            )
+    spans = [sp for sp in store.latency_breakdown(rec.run_id)["spans"] if sp["name"] != "dag"]
+    assert sorted(sp["name"] for sp in spans) == sorted(f"step.{s.id}" for s in plan.steps)
+    assert {sp["parent_id"] for sp in spans} == {root.id}
+    store.engine.dispose()
+
+
+def test_step_results_are_copied_on_write():
+    ctx = {"s": {}}
+    set_step_result(ctx, "act.create", {"result": {"sys_id": "abc"}})
+    snapshot = {**ctx, "s": dict(ctx["s"])}  # what a running step sees
+    set_step_result(ctx, "act.attach", {"result": []})
+    assert snapshot["act"] == {"create": {"result": {"sys_id": "abc"}}}
+    assert ctx["act"] == {"create": {"result": {"sys_id": "abc"}}, "attach": {"result": []}}
@@ -65,3 +65,307 @@ def test_execute_recipe_run_creates_evidence(db_session):
     assert len(refreshed.evidence) == 4
     phases = {ev.payload.get("phase") for ev in refreshed.evidence}
     assert phases == {"intake", "plan", "act", "verify"}
+
+
+def test_failed_run_keeps_its_evidence(db_session, monkeypatch):
+    from core.workflow import engine
+
+    def phases(recipe):
+        yield "intake", "intake steps: 1"
+        raise RuntimeError("plan failed")
+
+    monkeypatch.setattr(engine, "run_workflow_phases", phases)
+    agent = Agent(name="Test Agent", domain="testing", config_json={})
+    recipe = Recipe(name="Test Recipe", yaml_path="backup_room_failover.yaml")
+    db_session.add_all([agent, recipe])
+    db_session.commit()
+
+    with pytest.raises(RuntimeError, match="plan failed"):
+        execute_recipe_run(db_session, agent_id=agent.id, recipe_id=recipe.id, inputs={})
+
+    (run,) = db_session.query(Run).all()
+    assert run.status == "failed"
+    assert [ev.payload.get("phase") for ev in run.evidence] == ["inputs", "intake"]
+
+
+def test_attach_json_offloads_large_evidence(db_session, monkeypatch):
+    from core.blob_store import is_blob_ref
+    from core.db.models import RunEvidence
+    from core.utils.evidence import attach_json, load_evidence_payload
+
+    monkeypatch.setenv("IPAV_BLOB_THRESHOLD_BYTES", "128")
+    run = Run(status="running")
+    db_session.add(run)
+    db_session.commit()
+
+    big = {"room_health": ["ok" * 20] * 10}
+    ev_id = attach_json(db_session, run.id, big)
+    ev = db_session.get(RunEvidence, ev_id)
+    assert is_blob_ref(ev.payload)
+    assert load_evidence_payload(db_session, ev) == big
+
+
+def test_execute_recipe_run_records_inputs_with_defaults(db_session):
+    agent = Agent(name="Test Agent", domain="testing", config_json={})
+    recipe = Recipe(name="Triage", yaml_path="incident-triage.yaml")
+    db_session.add_all([agent, recipe])
+    db_session.commit()
+
+    run = execute_recipe_run(
+        db_session, agent_id=agent.id, recipe_id=recipe.id, inputs={"summary": "Room 4 dark"}
+    )
+
+    (ev,) = [ev for ev in db_session.get(Run, run.id).evidence if ev.payload.get("phase") == "inputs"]
+    assert ev.payload["inputs"] == {"channel": "#av-support", "summary": "Room 4 dark"}
+
+
+def test_execute_recipe_run_with_journal_commits_once_per_database(db_session, tmp_path):
+    from sqlalchemy import event
+
+    from core.runs_store import RunStore
+    from core.workflow.journal import execution_journal
+
+    agent = Agent(name="Test Agent", domain="testing", config_json={})
+    recipe = Recipe(name="Test Recipe", yaml_path="backup_room_failover.yaml")
+    db_session.add_all([agent, recipe])
+    db_session.commit()
+    store = RunStore(db_path=tmp_path / "runs.db")
+
+    app_commits, store_commits = [], []
+    event.listen(db_session.get_bind(), "commit", lambda conn: app_commits.append(1))
+    event.listen(store.engine, "commit", lambda conn: store_commits.append(1))
+    with execution_journal(
+        db_session, store, workflow_id="1", name="wf", agent_id=agent.id, recipe_id=recipe.id,
+        flush_interval_s=60,
+    ) as journal:
+        run = execute_recipe_run(db_session, agent_id=agent.id, recipe_id=recipe.id, journal=journal)
+        assert run.id is None
+    assert len(app_commits) == 1 and len(store_commits) == 1
+
+    # Both views come from the same entries.
+    refreshed = db_session.get(Run, run.id)
+    assert refreshed.status == "completed"
+    assert [ev.payload["phase"] for ev in refreshed.evidence] == ["intake", "plan", "act", "verify"]
+    d = store.run_details(journal.rec.run_id)
+    assert d["status"] == "success"
+    assert [(s["phase"], s["message"]) for s in d["steps"]] == [
+        (ev.payload["phase"], ev.payload["message"]) for ev in refreshed.evidence
+    ]
+    store.engine.dispose()
+
+
+def test_journal_offloads_large_evidence_and_steps(db_session, tmp_path, monkeypatch):
+    from core.blob_store import is_blob_ref
+    from core.runs_store import RunStore
+    from core.utils.evidence import load_evidence_payload
+    from core.workflow.journal import execution_journal
+
+    monkeypatch.setenv("IPAV_BLOB_THRESHOLD_BYTES", "256")
+    agent = Agent(name="Test Agent", domain="testing", config_json={})
+    recipe = Recipe(name="Test Recipe", yaml_path="backup_room_failover.yaml")
+    db_session.add_all([agent, recipe])
+    db_session.commit()
+    store = RunStore(db_path=tmp_path / "runs.db", blob_threshold=256)
+    notes = "x" * 2000
+
+    with execution_journal(
+        db_session, store, workflow_id="1", name="wf", agent_id=agent.id, recipe_id=recipe.id,
+        flush_interval_s=60,
+    ) as journal:
+        run = execute_recipe_run(
+            db_session, agent_id=agent.id, recipe_id=recipe.id, inputs={"notes": notes}, journal=journal
+        )
+
+    (ev,) = [ev for ev in db_session.get(Run, run.id).evidence if is_blob_ref(ev.payload)]
+    assert load_evidence_payload(db_session, ev)["inputs"]["notes"] == notes
+    steps = store.run_details(journal.rec.run_id)["steps"]
+    assert next(s for s in steps if s["phase"] == "inputs")["payload"]["inputs"]["notes"] == notes
+    store.engine.dispose()
+
+
+def test_evidence_batch_writes_one_executemany(db_session, monkeypatch):
+    from sqlalchemy import event
+
+    from core.db.models import RunEvidence
+    from core.utils.evidence import EvidenceBatch, load_evidence_payload
+
+    monkeypatch.setenv("IPAV_BLOB_THRESHOLD_BYTES", "128")
+    run = Run(status="running")
+    db_session.add(run)
+    db_session.commit()
+
+    inserts = []
+    event.listen(
+        db_session.get_bind(), "before_cursor_execute",
+        lambda conn, cur, stmt, params, ctx, many: inserts.append(many) if stmt.startswith("INSERT INTO run_evidence") else None,
+    )
+    big = {"room_health": ["ok" * 20] * 10}
+    with EvidenceBatch(db_session, run.id) as ev:
+        for i in range(10):
+            ev.add({"phase": "act", "i": i}, label=f"step {i}")
+        ev.add(big, kind="snapshot")
+    assert inserts == [True]
+
+    rows = db_session.query(RunEvidence).filter_by(run_id=run.id).order_by(RunEvidence.id).all()
+    assert [r.payload["i"] for r in rows[:10]] == list(range(10))
+    assert rows[3].label == "step 3" and rows[-1].kind == "snapshot" and rows[-1].created_at is not None
+    assert load_evidence_payload(db_session, rows[-1]) == big
+
+
+def test_execute_recipe_run_runs_recipe_steps(db_session):
+    agent = Agent(name="Test Agent", domain="testing", config_json={})
+    recipe = Recipe(name="Triage", yaml_path="incident-triage.yaml")
+    db_session.add_all([agent, recipe])
+    db_session.commit()
+
+    calls = []
+
+    def call(tool, action, params, idempotency_key=None):
+        calls.append((tool.name, action))
+        if action == "classify_incident":
+            return {"sev": "P2", "category": "display"}
+        return None  # no endpoint: fallbacks simulate
+
+    run = execute_recipe_run(
+        db_session, agent_id=agent.id, recipe_id=recipe.id, inputs={"summary": "Room 4 dark"}, call=call
+    )
+
+    evidence = [ev.payload for ev in db_session.get(Run, run.id).evidence]
+    assert [p["phase"] for p in evidence] == ["inputs", "act", "act", "act", "act", "act", "verify"]
+    assert [(p["step"], p["status"]) for p in evidence if p["phase"] == "act"] == [
+        ("classify", "ok"), ("ack-slack", "simulated"), ("create-incident", "simulated"),
+        ("suggest-fixes", "ok"), ("post-update", "simulated"),
+    ]
+    assert calls[0] == ("local-llm", "classify_incident") and len(calls) == 5
+    assert all(c["ok"] for c in evidence[-1]["checks"])
+    assert evidence[-1]["outputs"]["triage_summary"]["sev"] == "P2"
+
+
+def test_tool_call_dispatches_builtins_and_registered_endpoints(db_session, monkeypatch):
+    from core.db.models import Tool
+    from core.recipes.compiler import ToolBinding
+    from core.workflow import tool_call
+
+    db_session.add(Tool(name="slack", endpoint="http://mcp-slack.local/call"))
+    db_session.commit()
+    posted = []
+
+    class Response:
+        content = b'{"ts": "1"}'
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"ts": "1"}
+
+    def post(url, json=None, headers=None, timeout=None):
+        posted.append((url, json, headers))
+        return Response()
+
+    monkeypatch.setattr(tool_call.requests, "post", post)
+    call = tool_call.make_tool_call(db_session)
+
+    local = ToolBinding.resolve("local")
+    assert call(local, "baseline_dashboard", {"baseline": {"incidents_per_month": 2}})["minutes_lost"] == 20
+    assert call(ToolBinding.resolve("mcp-slack"), "post_message", {"text": "hi"}, idempotency_key="k-1") == {"ts": "1"}
+    assert posted == [
+        ("http://mcp-slack.local/call", {"action": "post_message", "params": {"text": "hi"}}, {"Idempotency-Key": "k-1"})
+    ]
+    assert call(ToolBinding.resolve("mcp-zoom"), "get_room_status", {}) is None
+
+
+def test_execute_recipe_run_runs_steps_concurrently_when_configured(db_session, tmp_path, monkeypatch):
+    from core.runs_store import RunStore
+    from core.workflow.journal import execution_journal
+
+    monkeypatch.setenv("IPAV_STEP_WORKERS", "4")
+    agent = Agent(name="Test Agent", domain="testing", config_json={})
+    recipe = Recipe(name="Triage", yaml_path="incident-triage.yaml")
+    db_session.add_all([agent, recipe])
+    db_session.commit()
+    store = RunStore(db_path=tmp_path / "runs.db")
+
+    with execution_journal(
+        db_session, store, workflow_id="1", name="wf", agent_id=agent.id, recipe_id=recipe.id,
+    ) as journal:
+        with journal.span("execute_recipe") as root:
+            run = execute_recipe_run(
+                db_session, agent_id=agent.id, recipe_id=recipe.id, journal=journal,
+                inputs={"reporter": "ana", "summary": "Room 4 dark"}, call=lambda *a, **k: None,
+            )
+
+    verify = [ev.payload for ev in db_session.get(Run, run.id).evidence][-1]
+    assert verify["phase"] == "verify" and verify["critical_path"][0] == "classify"
+    spans = [sp for sp in store.latency_breakdown(journal.rec.run_id)["spans"] if sp["name"].startswith("step.")]
+    assert len(spans) == 5 and {sp["parent_id"] for sp in spans} == {root.id}
+    store.engine.dispose()
+
+
+@pytest.mark.parametrize("yaml_path, names", [
+    ("backup_room_failover.yaml", ["phase.intake", "phase.plan", "phase.act", "phase.verify"]),
+    ("incident-triage.yaml", ["step.classify", "step.ack-slack", "step.create-incident", "step.suggest-fixes", "step.post-update"]),
+])
+def test_journaled_runs_span_each_phase_or_step(db_session, tmp_path, monkeypatch, yaml_path, names):
+    from core.runs_store import RunStore
+    from core.workflow.journal import execution_journal
+
+    monkeypatch.delenv("IPAV_STEP_WORKERS", raising=False)
+    agent = Agent(name="Test Agent", domain="testing", config_json={})
+    recipe = Recipe(name="Recipe", yaml_path=yaml_path)
+    db_session.add_all([agent, recipe])
+    db_session.commit()
+    store = RunStore(db_path=tmp_path / "runs.db")
+
+    with execution_journal(
+        db_session, store, workflow_id="1", name="wf", agent_id=agent.id, recipe_id=recipe.id,
+    ) as journal:
+        with journal.span("execute_recipe") as root:
+            execute_recipe_run(
+                db_session, agent_id=agent.id, recipe_id=recipe.id, journal=journal,
+                inputs={"reporter": "ana", "summary": "Room 4 dark"}, call=lambda *a, **k: None,
+            )
+
+    spans = [sp for sp in store.latency_breakdown(journal.rec.run_id)["spans"] if sp["name"] != "execute_recipe"]
+    assert sorted(sp["name"] for sp in spans) == sorted(names)
+    assert {sp["parent_id"] for sp in spans} == {root.id}
+    store.engine.dispose()
+
+
+def test_failed_journaled_run_resumes_from_its_checkpoints(db_session, tmp_path, monkeypatch):
+    from core.runs_store import RunStore
+    from core.workflow.checkpoints import resume
+    from core.workflow.journal import execution_journal
+
+    monkeypatch.delenv("IPAV_STEP_WORKERS", raising=False)
+    agent = Agent(name="Test Agent", domain="testing", config_json={})
+    recipe = Recipe(name="Triage", yaml_path="incident-triage.yaml")
+    db_session.add_all([agent, recipe])
+    db_session.commit()
+    store = RunStore(db_path=tmp_path / "runs.db")
+    calls, fail = [], {"propose_immediate_steps"}
+
+    def call(tool, action, params, idempotency_key=None):
+        calls.append(action)
+        if action in fail:
+            fail.discard(action)
+            raise TimeoutError("llm timed out")  # no fallback: the run fails
+        return {"sev": "P2", "category": "room"} if action == "classify_incident" else None
+
+    with pytest.raises(TimeoutError):
+        with execution_journal(
+            db_session, store, workflow_id="1", name="wf", agent_id=agent.id, recipe_id=recipe.id,
+        ) as journal:
+            execute_recipe_run(
+                db_session, agent_id=agent.id, recipe_id=recipe.id, journal=journal,
+                inputs={"reporter": "ana", "summary": "Room 4 dark"}, call=call,
+            )
+    first = store.run_header(journal.rec.run_id)
+    assert first["status"] == "failed" and first["meta"]["inputs"]["summary"] == "Room 4 dark"
+
+    calls.clear()
+    out = resume(first["id"], call=call, store=store)
+    assert out.resumed == ["classify", "ack-slack", "create-incident"]
+    assert calls == ["propose_immediate_steps", "post_message"]
+    assert store.run_header(out.run_id)["status"] == "success"
+    store.engine.dispose()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import urllib.error
+import urllib.request
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import select
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from conftest import T0
+from core.workflow import events, service
+
+real_utcnow = service._utcnow
+
+
+def _rows(session_factory):
+    with session_factory() as db:
+        return {r.id: r for r in db.execute(select(events.event_queue)).all()}
+
+
+def test_dispatcher_launches_subscribed_workflows_with_payload(session_factory):
+    with session_factory() as db:
+        triage = service.create_workflow(db, "triage", 1, 1, trigger_type="event", trigger_expr="incident.*")
+        hdmi = service.create_workflow(
+            db, "hdmi", 1, 1, trigger_type="event", trigger_expr="device.alarm.hdmi, incident.p1"
+        )
+        with pytest.raises(ValueError):
+            service.create_workflow(db, "no-topic", 1, 1, trigger_type="event")
+        p1 = events.publish_event(db, "incident.p1", {"summary": "Room 4 dark"}, source="servicenow")
+        alarm, other = events.publish_events(
+            db, [{"topic": "device.alarm.hdmi", "payload": "no signal"}, {"topic": "calendar.changed"}]
+        )
+
+    launched = []
+    dispatcher = events.EventDispatcher(session_factory, launch=lambda wf_id, ev: launched.append((wf_id, ev)))
+    assert dispatcher.dispatch_pending() == 3
+    assert [(wf_id, ev["id"]) for wf_id, ev in launched] == [(triage.id, p1), (hdmi.id, p1), (hdmi.id, alarm)]
+    assert launched[0][1]["payload"] == {"summary": "Room 4 dark"}
+    assert launched[0][1]["source"] == "servicenow"
+
+    rows = _rows(session_factory)
+    assert (rows[p1].status, rows[p1].runs) == ("done", [triage.id, hdmi.id])
+    assert rows[other].status == "ignored"
+    assert dispatcher.dispatch_pending() == 0
+    with session_factory() as db:
+        assert events.queue_depth(db) == {"done": 2, "ignored": 1}
+    assert dispatcher.stats.runs == 3 and dispatcher.stats.latency.count == 3
+
+
+def test_failed_launch_retries_only_the_failed_workflow(session_factory, monkeypatch):
+    with session_factory() as db:
+        ok = service.create_workflow(db, "ok", 1, 1, trigger_type="event", trigger_expr="device.*")
+        flaky = service.create_workflow(db, "flaky", 1, 1, trigger_type="event", trigger_expr="device.*")
+        ev_id = events.publish_event(db, "device.reboot")
+
+    calls = []
+
+    def launch(wf_id, ev):
+        calls.append(wf_id)
+        if wf_id == flaky.id:
+            raise RuntimeError("codec busy")
+
+    dispatcher = events.EventDispatcher(session_factory, launch=launch, max_attempts=2)
+    dispatcher.dispatch_pending()
+    row = _rows(session_factory)[ev_id]
+    assert (row.status, row.runs, row.attempts) == ("pending", [ok.id], 1)
+    assert "codec busy" in row.error
+    assert row.available_at == T0 + timedelta(seconds=5)
+
+    assert dispatcher.dispatch_pending() == 0  # backing off
+    monkeypatch.setattr(service, "_utcnow", lambda: T0 + timedelta(seconds=5))
+    assert dispatcher.dispatch_pending() == 1
+    assert calls == [ok.id, flaky.id, flaky.id]
+    assert _rows(session_factory)[ev_id].status == "failed"
+    assert (dispatcher.stats.retried, dispatcher.stats.failed) == (1, 1)
+
+
+def test_long_launch_keeps_its_claim(session_factory, monkeypatch):
+    with session_factory() as db:
+        service.create_workflow(db, "slow", 1, 1, trigger_type="event", trigger_expr="room.*")
+        ev_id = events.publish_event(db, "room.reset")
+    monkeypatch.setattr(service, "_utcnow", real_utcnow)
+
+    stolen = []
+
+    def launch(wf_id, ev):
+        time.sleep(2.0)  # longer than the lease
+        other = events.EventDispatcher(session_factory, launch=lambda *a: None, worker_id="other")
+        with session_factory() as db:
+            stolen.extend(other._claim(db))
+
+    events.EventDispatcher(session_factory, launch=launch, lease_s=1.5).dispatch_pending()
+    assert stolen == []
+    assert _rows(session_factory)[ev_id].status == "done"
+
+
+def test_event_launch_waits_for_a_running_workflow(session_factory, monkeypatch):
+    with session_factory() as db:
+        wf = service.create_workflow(db, "triage", 1, 1, trigger_type="event", trigger_expr="incident.*")
+        ev_id = events.publish_event(db, "incident.p1")
+    ran = []
+    monkeypatch.setattr(service, "run_now", lambda db, wf_id, **kw: ran.append(wf_id))
+
+    dispatcher = events.EventDispatcher(session_factory)
+    with service.workflow_guard(wf.id):  # e.g. a tick running it
+        dispatcher.dispatch_pending()
+    row = _rows(session_factory)[ev_id]
+    assert ran == [] and row.status == "pending" and "already running" in row.error
+
+    monkeypatch.setattr(service, "_utcnow", lambda: T0 + timedelta(minutes=1))
+    dispatcher.dispatch_pending()
+    assert ran == [wf.id] and _rows(session_factory)[ev_id].status == "done"
+
+
+def test_background_dispatcher_wakes_on_publish(session_factory):
+    with session_factory() as db:
+        service.create_workflow(db, "triage", 1, 1, trigger_type="event", trigger_expr="incident.*")
+
+    fired = threading.Event()
+    dispatcher = events.EventDispatcher(
+        session_factory, launch=lambda wf_id, ev: fired.set(), poll_interval_s=30.0
+    ).start()
+    try:
+        with session_factory() as db:
+            events.publish_event(db, "incident.p2")
+        assert fired.wait(1.0)  # woken by the publish, not the 30s poll
+    finally:
+        dispatcher.stop()
+
+
+def test_http_endpoint_enqueues_events(session_factory):
+    server = events.make_http_server(session_factory, port=0, token="s3cret")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def post(body, token="s3cret"):
+        req = urllib.request.Request(
+            f"{url}/events",
+            data=json.dumps(body).encode(),
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=5) as resp:
+                return resp.status, json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    try:
+        status, body = post([{"topic": "calendar.changed", "payload": {"room": "4A"}}, {"topic": "incident.p3"}])
+        assert status == 202 and len(body["ids"]) == 2
+        assert post({"payload": {}})[0] == 400
+        assert post({"topic": "x"}, token="wrong")[0] == 401
+        with urllib.request.urlopen(f"{url}/healthz", timeout=5) as resp:
+            assert json.loads(resp.read())["queue"] == {"pending": 2}
+    finally:
+        server.shutdown()
+        server.server_close()
+    rows = _rows(session_factory)
+    assert {r.topic for r in rows.values()} == {"calendar.changed", "incident.p3"}
+    assert {r.source for r in rows.values()} == {"http"}
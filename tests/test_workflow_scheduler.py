@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from conftest import T0
+from core.workflow import service
+from core.workflow.scheduler import SchedulerDaemon
+
+
+def _daemon(session_factory, calls, **kwargs):
+    return SchedulerDaemon(session_factory, dispatch=calls.append, clock=lambda: T0, **kwargs)
+
+
+def test_daemon_fires_due_workflows_in_order(session_factory):
+    with session_factory() as db:
+        fast = service.create_workflow(db, "fast", 1, 1, trigger_type="interval", trigger_value=5)
+        slow = service.create_workflow(db, "slow", 1, 1, trigger_type="interval", trigger_value=15)
+        service.create_workflow(db, "manual", 1, 1)
+
+    calls = []
+    daemon = _daemon(session_factory, calls)
+    assert daemon.reload() == 2
+    assert daemon.next_fire() == T0 + timedelta(minutes=5)
+
+    assert daemon.run_pending(T0 + timedelta(minutes=4)) == 0
+    assert daemon.run_pending(T0 + timedelta(minutes=15)) == 2
+    assert calls == [fast.id, slow.id]
+    # "fast" was due at +5 and also missed +10/+15; it runs once and moves to +20.
+    assert daemon.stats.coalesced == 2
+    assert daemon.next_fire() == T0 + timedelta(minutes=20)
+    with session_factory() as db:
+        by_id = {wf.id: wf for wf in service.list_workflows(db)}
+    assert by_id[fast.id].next_run_at == T0 + timedelta(minutes=20)
+    assert by_id[slow.id].next_run_at == T0 + timedelta(minutes=30)
+
+
+def test_daemon_skips_late_fires_and_applies_jitter(session_factory):
+    with session_factory() as db:
+        service.create_workflow(db, "wf", 1, 1, trigger_type="interval", trigger_value=10)
+
+    calls = []
+    daemon = _daemon(session_factory, calls, misfire="skip", misfire_grace_s=30)
+    daemon.reload()
+    assert daemon.run_pending(T0 + timedelta(minutes=25)) == 0
+    assert calls == [] and daemon.stats.skipped == 1
+    assert daemon.next_fire() == T0 + timedelta(minutes=30)
+
+    jittery = _daemon(session_factory, calls, jitter_s=20)
+    jittery.reload()
+    due = T0 + timedelta(minutes=30)
+    assert due <= jittery.next_fire() <= due + timedelta(seconds=20)
+
+
+def test_service_edits_wake_a_running_daemon(session_factory):
+    import threading
+
+    fired = threading.Event()
+    daemon = SchedulerDaemon(session_factory, dispatch=lambda wf_id: fired.set(), clock=lambda: T0)
+    daemon.start()
+    try:
+        with session_factory() as db:
+            wf = service.create_workflow(db, "later", 1, 1, trigger_type="interval", trigger_value=60)
+            # Make it due now; the listener triggers an immediate reload.
+            service.reschedule_workflow(db, wf.id, T0 - timedelta(seconds=1))
+            service.update_workflow(db, wf.id, enabled=1)
+        assert fired.wait(5.0)
+    finally:
+        daemon.stop()
+    assert daemon.stats.reloads >= 2
+
+
+def _due_workflows(session_factory, n):
+    ids = []
+    with session_factory() as db:
+        for i in range(n):
+            wf = service.create_workflow(db, f"room-{i}", 1, 1, trigger_type="interval", trigger_value=5)
+            service.reschedule_workflow(db, wf.id, T0 - timedelta(minutes=1))
+            ids.append(wf.id)
+    return ids
+
+
+def test_parallel_tick_runs_due_workflows_concurrently(session_factory, monkeypatch):
+    import threading
+    import time
+
+    ids = _due_workflows(session_factory, 4)
+    threads = set()
+
+    def fake_run_now(db, wf_id, *, trigger="manual"):
+        assert trigger is None  # run_now records the workflow's trigger_type
+        threads.add(threading.get_ident())
+        time.sleep(0.2)
+        if wf_id == ids[-1]:
+            raise RuntimeError("device offline")
+
+    monkeypatch.setattr(service, "run_now", fake_run_now)
+    with session_factory() as db:
+        t0 = time.monotonic()
+        summary = service.tick_with_summary(db, max_workers=4, session_factory=session_factory)
+        elapsed = time.monotonic() - t0
+    assert (summary.due, summary.dispatched, summary.failed, summary.skipped) == (4, 3, 1, 0)
+    assert summary.errors == {ids[-1]: "RuntimeError: device offline"}
+    assert len(threads) == 4 and elapsed < 0.6
+    assert summary.queue_ms_max >= summary.queue_ms_avg >= 0.0
+
+
+def test_scheduled_runs_record_the_workflow_trigger_type(session_factory, tmp_path, monkeypatch):
+    from core.db.models import Agent, Recipe
+    from core.runs_store import RunStore
+
+    store = RunStore(db_path=tmp_path / "runs.db")
+    monkeypatch.setattr(service, "make_runstore", lambda: store)
+    with session_factory() as db:
+        agent = Agent(name="Ops", domain="av", config_json={})
+        recipe = Recipe(name="Failover", yaml_path="backup_room_failover.yaml")
+        db.add_all([agent, recipe])
+        db.commit()
+        every = service.create_workflow(db, "every", agent.id, recipe.id, trigger_type="interval", trigger_value=5)
+        nightly = service.create_workflow(db, "nightly", agent.id, recipe.id, trigger_type="cron", trigger_expr="0 2 * * *")
+        for wf in (every, nightly):
+            service.reschedule_workflow(db, wf.id, T0 - timedelta(minutes=1))
+        assert service.tick_with_summary(db).dispatched == 2
+
+    triggers = {r["workflow_id"]: r["trigger"] for r in store.latest_runs()}
+    assert triggers == {str(every.id): "interval", str(nightly.id): "cron"}
+    store.engine.dispose()
+
+
+def test_tick_skips_workflow_already_running(session_factory, monkeypatch):
+    ids = _due_workflows(session_factory, 2)
+    ran = []
+    monkeypatch.setattr(service, "run_now", lambda db, wf_id, *, trigger="manual": ran.append(wf_id))
+
+    with service.workflow_guard(ids[0]) as held:
+        assert held
+        with session_factory() as db:
+            summary = service.tick_with_summary(db, max_workers=2, session_factory=session_factory)
+            assert service.tick(db) == 1  # sequential mode honours the lock too
+    assert summary.skipped == 1 and summary.dispatched == 1
+    assert ran == [ids[1], ids[1]]
+
+
+def test_process_tick_spawns_workers(session_factory, monkeypatch):
+    from concurrent.futures import Future
+
+    ids = _due_workflows(session_factory, 2)
+    pools = []
+
+    class FakeProcessPool:
+        def __init__(self, max_workers, mp_context=None):
+            pools.append(mp_context)
+
+        def submit(self, fn, *args):
+            fut = Future()
+            fut.set_result(fn(*args))
+            return fut
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            pass
+
+    ran = []
+    monkeypatch.setattr(service, "ProcessPoolExecutor", FakeProcessPool)
+    monkeypatch.setattr(service, "_run_due_in_process", lambda url, wf_id, submitted: ran.append(wf_id) or 0.0)
+    with session_factory() as db:
+        summary = service.tick_with_summary(db, max_workers=2, session_factory=session_factory, use_processes=True)
+    assert summary.dispatched == 2 and sorted(ran) == sorted(ids)
+    assert [ctx.get_start_method() for ctx in pools] == ["spawn"]
+
+
+def _claim_worker(db_url, worker_id, out):
+    engine = create_engine(db_url, future=True, connect_args={"timeout": 30})
+    try:
+        with sessionmaker(bind=engine)() as db:
+            claimed = []
+            while True:
+                got = service.claim_due_workflows(db, worker_id=worker_id, limit=2)
+                if not got:
+                    break
+                claimed.extend(got)
+        out.put((worker_id, claimed))
+    finally:
+        engine.dispose()
+
+
+def test_claims_are_exclusive_across_processes(session_factory):
+    import multiprocessing as mp
+
+    ids = _due_workflows(session_factory, 24)
+    db_url = str(session_factory.kw["bind"].url)
+    ctx = mp.get_context("fork")
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_claim_worker, args=(db_url, f"w{i}", out)) for i in range(4)]
+    for p in procs:
+        p.start()
+    results = dict(out.get(timeout=30) for _ in procs)
+    for p in procs:
+        p.join(timeout=10)
+
+    claimed = [wf_id for got in results.values() for wf_id in got]
+    assert sorted(claimed) == ids  # every due workflow claimed exactly once
+    with session_factory() as db:
+        assert service.claim_due_workflows(db, worker_id="late") == []
+
+
+def test_claims_expire_and_release(session_factory, monkeypatch):
+    ids = _due_workflows(session_factory, 2)
+    with session_factory() as db:
+        assert service.claim_due_workflows(db, worker_id="a", lease_s=60) == ids
+        assert not service.claim_workflow(db, ids[0], worker_id="b")
+        assert service.heartbeat_claims(db, ids, worker_id="b") == 0
+
+        # "a" keeps ids[0] alive, then crashes; ids[1] is released.
+        monkeypatch.setattr(service, "_utcnow", lambda: T0 + timedelta(seconds=50))
+        assert service.heartbeat_claims(db, [ids[0]], worker_id="a", lease_s=60) == 1
+        assert service.release_workflow(db, ids[1], worker_id="a")
+        monkeypatch.setattr(service, "_utcnow", lambda: T0 + timedelta(seconds=90))
+        assert service.claim_due_workflows(db, worker_id="b") == [ids[1]]
+        monkeypatch.setattr(service, "_utcnow", lambda: T0 + timedelta(seconds=120))
+        assert service.claim_due_workflows(db, worker_id="b") == [ids[0]]
+
+        # A failed run releases with advance=True so it is not re-claimed at once.
+        assert service.release_workflow(db, ids[0], worker_id="b", advance=True)
+        assert service.claim_due_workflows(db, worker_id="c") == []
+
+
+def test_daemon_skips_workflow_claimed_elsewhere(session_factory, monkeypatch):
+    ids = _due_workflows(session_factory, 2)
+    ran = []
+    monkeypatch.setattr(service, "run_now", lambda db, wf_id, *, trigger="manual": ran.append(wf_id))
+    with session_factory() as db:
+        assert service.claim_workflow(db, ids[0], worker_id="replica-2")
+
+    daemon = SchedulerDaemon(session_factory, clock=lambda: T0, worker_id="replica-1")
+    daemon.reload()
+    assert daemon.run_pending(T0) == 1
+    assert ran == [ids[1]] and daemon.stats.skipped == 1
+    with session_factory() as db:
+        rows = {wf.id: wf for wf in service.list_workflows(db)}
+    assert rows[ids[0]].claimed_by == "replica-2"
+    assert rows[ids[1]].claimed_by is None  # released after the run
+    assert rows[ids[1]].next_run_at > T0
+
+
+def test_leader_lease_is_exclusive_until_expiry(session_factory, monkeypatch):
+    with session_factory() as db:
+        assert service.acquire_lease(db, "scheduler", holder="a", ttl_s=30)
+        assert service.acquire_lease(db, "scheduler", holder="a", ttl_s=30)  # renew
+        assert not service.acquire_lease(db, "scheduler", holder="b", ttl_s=30)
+        monkeypatch.setattr(service, "_utcnow", lambda: T0 + timedelta(seconds=31))
+        assert service.acquire_lease(db, "scheduler", holder="b", ttl_s=30)
+        service.release_lease(db, "scheduler", holder="b")
+        assert service.acquire_lease(db, "scheduler", holder="a", ttl_s=30)
+
+
+def test_cron_workflows_honour_agent_window_and_report_upcoming_fires(session_factory):
+    from core.db.models import Agent
+
+    with session_factory() as db:
+        act = Agent(name="ActAgent", config_json={})  # STANDARD_MAINTENANCE: 08:00-20:00 Mon-Fri
+        db.add(act)
+        db.commit()
+        # T0 is Thursday 12:00; 06:00 fires fall outside the window.
+        sweep = service.create_workflow(
+            db, "preflight", act.id, 1, trigger_type="cron", trigger_expr="0 6,9 * * *"
+        )
+        assert sweep.next_run_at == datetime(2026, 1, 2, 9, 0)
+        every = service.create_workflow(db, "poll", act.id, 1, trigger_type="interval", trigger_value=60 * 21)
+        with pytest.raises(ValueError):
+            service.create_workflow(db, "bad", act.id, 1, trigger_type="cron", trigger_expr="0 25 * * *")
+
+        fires = service.upcoming_fires(db, 3)
+        assert fires[sweep.id] == [datetime(2026, 1, 2, 9), datetime(2026, 1, 5, 9), datetime(2026, 1, 6, 9)]
+        assert fires[every.id][0] == datetime(2026, 1, 2, 9)
+        busiest, ids = service.fire_density(fires)[0]
+        assert busiest == datetime(2026, 1, 2, 9) and sorted(ids) == [sweep.id, every.id]
+
+        service.update_workflow(db, sweep.id, trigger_expr="30 8 * * MON-FRI")
+        service.update_workflow(db, every.id, trigger_type="cron", trigger_expr="30 7 * * MON-FRI")
+        by_id = {wf.id: wf for wf in service.list_workflows(db)}
+        assert by_id[sweep.id].trigger_expr == "30 8 * * MON-FRI"
+        assert by_id[sweep.id].next_run_at == datetime(2026, 1, 2, 8, 30)
+        assert by_id[every.id].next_run_at is None  # 07:30 is never inside the window
+
+
+def test_daemon_coalesces_missed_cron_fires(session_factory):
+    with session_factory() as db:
+        wf = service.create_workflow(db, "sweep", 1, 1, trigger_type="cron", trigger_expr="*/10 * * * *")
+
+    calls = []
+    daemon = _daemon(session_factory, calls)
+    assert daemon.reload() == 1
+    assert daemon.next_fire() == T0 + timedelta(minutes=10)
+    assert daemon.run_pending(T0 + timedelta(minutes=35)) == 1
+    assert calls == [wf.id] and daemon.stats.coalesced == 2  # 12:10, 12:20, 12:30 -> one run
+    assert daemon.next_fire() == T0 + timedelta(minutes=40)
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.recipes.compiler import RecipeCompileError, compile_recipe
+from core.workflow.checkpoints import run_recipe
+from core.workflow.step_cache import StepCache
+
+RECIPE = {
+    "id": "room-check",
+    "inputs": {"roomId": {"type": "string", "required": True}},
+    "steps": [
+        {"id": "health", "action": "get_room_health", "using": "mcp-zoom",
+         "params": {"room": "{{inputs.roomId}}", "trace": "{{inputs.trace|default('')}}"},
+         "cache": {"ttl": "30s", "key": ["inputs.roomId"]},
+         "saves": {"status": "$.status"}},
+        {"id": "notify", "action": "post_message", "using": "mcp-slack",
+         "params": {"text": "{{inputs.roomId}}: {{s.status}}"}},
+    ],
+}
+
+
+def test_cache_attribute_compiles():
+    step = compile_recipe(RECIPE).steps[0]
+    assert step.cache.ttl_s == 30.0
+    assert step.cache.args({"inputs": {"roomId": "r1", "trace": "x"}}, {}) == ["r1"]
+    assert ("inputs", "roomId") in step.refs
+    assert compile_recipe({"steps": [{"id": "a", "cache": True}]}).steps[0].cache.key is None
+    assert compile_recipe({"steps": [{"id": "a", "cache": {"ttl": "500ms"}}]}).steps[0].cache.ttl_s == 0.5
+    with pytest.raises(RecipeCompileError):
+        compile_recipe({"steps": [{"id": "a", "cache": {"ttl": "soon"}}]})
+
+
+def test_cache_size_from_env_is_clamped(monkeypatch):
+    monkeypatch.setenv("IPAV_STEP_CACHE_SIZE", "0")
+    cache = StepCache()
+    assert cache.maxsize == 1
+    cache.get_or_call(("a",), 30, lambda: 1)
+    assert cache.stats().size == 1
+
+
+def test_concurrent_misses_are_coalesced():
+    cache = StepCache()
+    calls = []
+
+    def read():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"status": "ok"}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_call(("mcp-zoom", "get", ["r1"]), 30, read)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(hit for _, hit in results) == [False] + [True] * 7
+    stats = cache.stats()
+    assert stats.misses == 1 and stats.hits + stats.coalesced == 7 and stats.hit_rate == 7 / 8
+
+
+def test_entries_expire_and_errors_are_not_cached():
+    cache = StepCache()
+    key = ("mcp-qsys", "component_state", ["amp-1"])
+    assert cache.get_or_call(key, 0.05, lambda: 1) == (1, False)
+    assert cache.get_or_call(key, 0.05, lambda: 2) == (1, True)
+    time.sleep(0.06)
+    assert cache.get_or_call(key, 0.05, lambda: 3) == (3, False)
+    assert cache.stats().expired == 1
+
+    def boom():
+        raise TimeoutError("qsys")
+
+    with pytest.raises(TimeoutError):
+        cache.get_or_call(("x",), 30, boom)
+    assert cache.get_or_call(("x",), 30, lambda: None) == (None, False)
+    assert cache.get_or_call(("x",), 30, lambda: 4) == (4, False)
+
+
+def test_results_are_shared_through_the_run_store(store):
+    key = ("servicenow.lookup", "get_user", {"email": "ana@example.com"})
+    StepCache(store).get_or_call(key, 30, lambda: {"sys_id": "u1"})
+    other = StepCache(store)  # e.g. another process on the same avops.db
+    assert other.get_or_call(key, 30, lambda: pytest.fail("should be cached")) == ({"sys_id": "u1"}, True)
+    assert other.stats().store_hits == 1
+    assert store.prune_step_results(now=datetime.now(timezone.utc) + timedelta(minutes=1)) == 1
+
+
+def test_run_record_carries_cache_hits(store):
+    calls = []
+
+    def call(tool, action, params, idempotency_key=None):
+        calls.append((action, params.get("room")))
+        return {"status": "healthy"} if action == "get_room_health" else {"ok": True}
+
+    cache = StepCache(store)
+    plan = compile_recipe(RECIPE)
+    first = run_recipe(plan, {"roomId": "r1", "trace": "a"}, call=call, store=store, cache=cache)
+    second = run_recipe(plan, {"roomId": "r1", "trace": "b"}, call=call, store=store, cache=cache)
+    other_room = run_recipe(plan, {"roomId": "r2"}, call=call, store=store, cache=cache)
+
+    assert calls.count(("get_room_health", "r1")) == 1  # `trace` is not part of the key
+    assert calls.count(("get_room_health", "r2")) == 1
+    assert [o.cached for o in second.result.steps] == [True, False]
+    assert second.result.state["status"] == "healthy"
+    assert (first.result.cache_hits, second.result.cache_hits, other_room.result.cache_hits) == (0, 1, 0)
+
+    steps = store.run_details(second.run_id)["steps"]
+    summary = next(sd for sd in steps if sd["phase"] == "cache")
+    assert summary["payload"]["hits"] == 1 and summary["payload"]["hit_rate"] == 1.0
+
+
+def test_callers_get_their_own_copies():
+    cache = StepCache()
+    key = ("mcp-zoom", "list_rooms", ["hq"])
+    rooms, _ = cache.get_or_call(key, 30, lambda: {"rooms": ["4A"]})
+    rooms["rooms"].append("4B")  # the caller's copy only
+    again, hit = cache.get_or_call(key, 30, lambda: pytest.fail("should be cached"))
+    assert hit and again == {"rooms": ["4A"]}
+    again["rooms"].clear()
+    assert cache.get_or_call(key, 30, lambda: None)[0] == {"rooms": ["4A"]}
+
+
+def test_dag_runs_record_cache_hits(store):
+    from core.workflow.dag import DagExecutor
+
+    cache = StepCache(store)
+    plan = compile_recipe(RECIPE)
+
+    def call(tool, action, params):
+        return {"status": "healthy"}
+
+    for trace in ("a", "b"):
+        with store.workflow_run(workflow_id="1", name="room-check", agent_id=None, recipe_id=None) as rec:
+            DagExecutor(plan, recorder=rec, cache=cache).run({"roomId": "r1", "trace": trace}, call=call)
+
+    summary = next(sd for sd in store.run_details(rec.run_id)["steps"] if sd["phase"] == "cache")
+    assert summary["payload"]["hits"] == 1 and summary["payload"]["cached_steps"] == ["health"]